@@ -0,0 +1,101 @@
+"""
+Measures the startup overhead of the command-line interface, i.e. how long
+`codebase <project> statuses` takes on top of starting the interpreter, with
+the statuses served from the response cache so that no request is made,
+and the same command through the daemon (see `codebase.daemon`):
+
+    python -m benchmarks.cli [--runs 20]
+
+Exits with an error if the median overhead is above the target.
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.payloads import STATUSES
+from codebase.cache import ResponseCache
+
+
+ROOT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROJECT = 'benchmark'
+
+# Median time of `codebase <project> statuses` above a bare interpreter.
+TARGET_OVERHEAD = 0.1
+
+
+def create_home():
+    """
+    Creates a home directory with credentials and cached statuses for the
+    CLI.
+    """
+    home = tempfile.mkdtemp(prefix='codebase-cli-')
+    with open(os.path.join(home, '.codebase'), 'w') as f:
+        json.dump({'CODEBASE_USERNAME': 'benchmark', 'CODEBASE_APIKEY': 'benchmark'}, f)
+
+    cache = ResponseCache(file_path=os.path.join(home, '.codebase_cache'))
+    cache.set(PROJECT, 'statuses', [
+        {'ticketing_status': {'id': i + 1, 'name': name, 'order': i + 1}}
+        for i, name in enumerate(STATUSES)
+    ])
+    return home
+
+
+def measure(command, env, runs):
+    durations = []
+    with open(os.devnull, 'w') as devnull:
+        for i in range(runs):
+            started_at = time.time()
+            subprocess.check_call(command, env=env, stdout=devnull)
+            durations.append(time.time() - started_at)
+    return sorted(durations)[len(durations) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--target', type=float, default=TARGET_OVERHEAD, help='Seconds')
+    args = parser.parse_args()
+
+    home = create_home()
+    try:
+        env = dict(os.environ, HOME=home, PYTHONPATH=ROOT_PATH)
+        script = os.path.join(ROOT_PATH, 'bin', 'codebase')
+        commands = [
+            ('interpreter', [sys.executable, '-c', 'pass']),
+            ('--help', [sys.executable, script, '--help']),
+            ('statuses', [sys.executable, script, PROJECT, 'statuses', '--cache']),
+            ('--daemon', [sys.executable, script, PROJECT, 'statuses', '--cache', '--daemon']),
+        ]
+        # Fills the command table cache and starts the daemon.
+        measure(commands[1][1], env, 1)
+        measure(commands[3][1], env, 1)
+
+        results = dict((name, measure(command, env, args.runs)) for name, command in commands)
+    finally:
+        subprocess.call(
+            [sys.executable, '-m', 'codebase.daemon', '--stop',
+             '--socket', os.path.join(home, '.codebase.sock')],
+            env=env,
+        )
+        shutil.rmtree(home)
+
+    print '{:<12} {:>12}'.format('command', 'median (ms)')
+    for name, command in commands:
+        print '{:<12} {:>12.1f}'.format(name, results[name] * 1000)
+
+    overhead = results['statuses'] - results['interpreter']
+    print 'statuses dispatch overhead: {:.1f}ms (target: {:.1f}ms)'.format(
+        overhead * 1000, args.target * 1000
+    )
+    if overhead > args.target:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
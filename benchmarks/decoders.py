@@ -0,0 +1,73 @@
+"""
+Compares the parse throughput of the available decoders on payloads shaped
+like `search` and `activity` responses:
+
+    python -m benchmarks.decoders [--pages 200] [--repeat 5]
+"""
+import argparse
+import importlib
+import json
+import timeit
+
+import xmltodict
+
+from benchmarks.payloads import make_activity_page, make_search_page
+from codebase.decoders import JSON_MODULES, Decoder, default_registry
+
+
+def get_json_decoders():
+    decoders = [Decoder('json', json.loads, json.load)]
+    for module_name in JSON_MODULES:
+        try:
+            module = importlib.import_module(module_name)
+        except ImportError:
+            continue
+        decoders.append(Decoder(module_name, module.loads))
+    return decoders
+
+
+def measure(decoder, content, repeat, number):
+    best = min(
+        timeit.repeat(lambda: decoder.decode(content), repeat=repeat, number=number)
+    )
+    return len(content) * number / best / 1024 / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--pages', type=int, default=100, help='Pages per payload')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    payloads = {
+        'search': make_search_page(size=20 * args.pages),
+        'activity': make_activity_page(size=20 * args.pages),
+    }
+
+    print 'Default JSON decoder: {}'.format(default_registry.get('json').name)
+    print '{:<10} {:<6} {:<12} {:>10} {:>10}'.format(
+        'payload', 'ctype', 'decoder', 'size (KB)', 'MB/s'
+    )
+    for payload_name, payload in sorted(payloads.items()):
+        contents = [
+            ('json', json.dumps(payload), get_json_decoders()),
+            (
+                'xml',
+                xmltodict.unparse({'items': {'item': payload}}),
+                [default_registry.get('xml')],
+            ),
+        ]
+        for ctype, content, decoders in contents:
+            for decoder in decoders:
+                throughput = measure(decoder, content, args.repeat, number=1)
+                print '{:<10} {:<6} {:<12} {:>10} {:>10.1f}'.format(
+                    payload_name,
+                    ctype,
+                    decoder.name,
+                    len(content) / 1024,
+                    throughput,
+                )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Compares filtering tickets with a linear scan against `TicketIndex`
+lookups:
+
+    python -m benchmarks.index [--tickets 100000]
+"""
+import argparse
+import json
+import time
+import timeit
+
+from benchmarks.payloads import USERS, make_search_page
+from codebase.index import TicketIndex
+from codebase.records import parse_datetime
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--tickets', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    items = json.loads(json.dumps(make_search_page(size=args.tickets)))
+    # Gives the tickets more varied milestones and assignees than the
+    # generated defaults.
+    for item in items:
+        ticket = item['ticket']
+        ticket['milestone'] = {'name': 'Sprint {}'.format(ticket['ticket_id'] % 50)}
+        ticket['assignee'] = '{}{}'.format(
+            USERS[ticket['ticket_id'] % len(USERS)],
+            ticket['ticket_id'] % 40,
+        )
+
+    started_at = time.time()
+    index = TicketIndex(items)
+    print 'Indexing {} tickets: {:.2f}s'.format(args.tickets, time.time() - started_at)
+
+    since = parse_datetime('2016-08-01T10:30:00+01:00')
+    queries = [
+        (
+            'status + assignee',
+            lambda: [
+                item for item in items
+                if item['ticket']['status']['name'] == 'New'
+                and item['ticket']['assignee'] == 'alice0'
+            ],
+            lambda: index.find(status='New', assignee='alice0'),
+        ),
+        (
+            'milestone + assignee + updated since',
+            lambda: [
+                item for item in items
+                if item['ticket']['milestone']['name'] == 'Sprint 5'
+                and item['ticket']['assignee'] == 'alice5'
+                and parse_datetime(item['ticket']['updated_at']) >= since
+            ],
+            lambda: index.find(
+                milestone='Sprint 5', assignee='alice5', updated_at__gte=since
+            ),
+        ),
+        (
+            'ticket id',
+            lambda: [item for item in items if item['ticket']['ticket_id'] == 4242],
+            lambda: index.get(4242),
+        ),
+        (
+            'status counts',
+            lambda: len([
+                item for item in items
+                if item['ticket']['status']['name'] == 'Completed'
+            ]),
+            lambda: index.count(status='Completed'),
+        ),
+    ]
+
+    print '{:<40} {:>12} {:>12}'.format('query', 'scan (ms)', 'index (us)')
+    for name, scan, lookup in queries:
+        scan_time = min(timeit.repeat(scan, repeat=args.repeat, number=1))
+        lookup_time = min(timeit.repeat(lookup, repeat=args.repeat, number=100)) / 100
+        print '{:<40} {:>12.2f} {:>12.1f}'.format(
+            name, scan_time * 1000, lookup_time * 1000000
+        )
+
+    started_at = time.time()
+    for item in items[:1000]:
+        index.add(item)
+    print 'Re-indexing 1000 updated tickets: {:.3f}s'.format(time.time() - started_at)
+
+
+if __name__ == '__main__':
+    main()
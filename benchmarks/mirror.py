@@ -0,0 +1,101 @@
+"""
+Compares refreshing a report with a full `search_all` against an
+incremental `TicketMirror.sync`, on a simulated API with a fixed latency
+per request:
+
+    python -m benchmarks.mirror [--tickets 2000] [--updated 15] [--latency 0.05]
+"""
+import argparse
+import copy
+import threading
+import time
+import urllib2
+import urlparse
+
+from benchmarks.payloads import make_search_page
+from codebase.client import CodeBaseAPI
+from codebase.mirror import TicketMirror
+
+
+class SimulatedAPI(CodeBaseAPI):
+    """
+    Serves generated tickets, 20 per page, instead of calling Codebase.
+    """
+    PAGE_SIZE = 20
+
+    def __init__(self, tickets, latency):
+        super(SimulatedAPI, self).__init__(
+            project='benchmark',
+            username='benchmark',
+            apikey='benchmark',
+        )
+        self.tickets = tickets
+        self.latency = latency
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def get(self, url, ctype=None):
+        time.sleep(self.latency)
+        with self._lock:
+            self.requests += 1
+
+        url = urlparse.urlsplit(url)
+        if not url.path.endswith('/tickets'):
+            # Notes, statuses and milestones.
+            return []
+
+        params = urlparse.parse_qs(url.query, keep_blank_values=True)
+        tickets = self.tickets
+        if 'sort:"updated"' in params['query'][0]:
+            tickets = sorted(
+                tickets,
+                key=lambda item: item['ticket']['updated_at'],
+                reverse=True,
+            )
+
+        page = int(params.get('page', ['1'])[0])
+        tickets = tickets[(page - 1) * self.PAGE_SIZE:page * self.PAGE_SIZE]
+        if not tickets:
+            raise urllib2.HTTPError(url, 404, 'Not Found', None, None)
+        return copy.deepcopy(tickets)
+
+
+def measure(api, func):
+    api.requests = 0
+    started_at = time.time()
+    func()
+    return time.time() - started_at, api.requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--tickets', type=int, default=2000)
+    parser.add_argument('--updated', type=int, default=15, help='Tickets updated between refreshes')
+    parser.add_argument('--latency', type=float, default=0.05, help='Seconds per request')
+    parser.add_argument('--notes', action='store_true', help='Mirror the notes too')
+    args = parser.parse_args()
+
+    api = SimulatedAPI(make_search_page(size=args.tickets), args.latency)
+    mirror = TicketMirror(api, with_notes=args.notes)
+
+    print 'Initial sync: {:.2f}s, {} requests'.format(*measure(api, mirror.sync))
+
+    for item in api.tickets[:args.updated]:
+        item['ticket']['updated_at'] = '2016-09-01T10:00:00+01:00'
+
+    print 'After {} updates:'.format(args.updated)
+    print '  search_all:       {:.2f}s, {} requests'.format(
+        *measure(api, api.search_all)
+    )
+    print '  incremental sync: {:.2f}s, {} requests'.format(
+        *measure(api, mirror.sync)
+    )
+
+    started_at = time.time()
+    for status in ['New', 'Accepted', 'In Progress']:
+        mirror.tickets(status=status, order_by='-updated_at')
+    print '  local queries:    {:.4f}s'.format(time.time() - started_at)
+
+
+if __name__ == '__main__':
+    main()
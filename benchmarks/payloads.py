@@ -0,0 +1,88 @@
+"""
+Generates payloads shaped like the Codebase API responses, for the
+benchmarks.
+"""
+import random
+
+
+STATUSES = ['New', 'Accepted', 'In Progress', 'Code Complete', 'Completed']
+PRIORITIES = ['Critical', 'High', 'Normal', 'Low']
+USERS = ['alice', 'bob', 'carol', 'dave', 'erin']
+
+
+def make_ticket(ticket_id, rand=random):
+    status = rand.choice(STATUSES)
+    priority = rand.choice(PRIORITIES)
+    assignee = rand.choice(USERS)
+    reporter = rand.choice(USERS)
+    return {
+        'ticket': {
+            'ticket_id': ticket_id,
+            'summary': u'Ticket {} summary, with a few words in it'.format(ticket_id),
+            'ticket_type': 'Bug',
+            'reporter_id': USERS.index(reporter) + 1,
+            'reporter': reporter,
+            'assignee_id': USERS.index(assignee) + 1,
+            'assignee': assignee,
+            'category_id': 3,
+            'category': {'id': 3, 'name': 'General'},
+            'priority_id': PRIORITIES.index(priority) + 1,
+            'priority': {
+                'id': PRIORITIES.index(priority) + 1,
+                'name': priority,
+                'colour': 'orange',
+                'default': priority == 'Normal',
+                'position': PRIORITIES.index(priority) + 1,
+            },
+            'status_id': STATUSES.index(status) + 1,
+            'status': {
+                'id': STATUSES.index(status) + 1,
+                'name': status,
+                'colour': 'green',
+                'order': STATUSES.index(status) + 1,
+                'treat_as_closed': status == 'Completed',
+            },
+            'milestone_id': 12,
+            'milestone': {'id': 12, 'name': 'Sprint 12'},
+            'tags': 'backend api',
+            'estimated_time': 120,
+            'total_time_spent': rand.randint(0, 600),
+            'updated_at': '2016-08-01T10:{:02d}:00+01:00'.format(ticket_id % 60),
+            'created_at': '2016-07-01T09:{:02d}:00+01:00'.format(ticket_id % 60),
+        }
+    }
+
+
+def make_event(event_id, rand=random):
+    user = rand.choice(USERS)
+    return {
+        'event': {
+            'id': event_id,
+            'type': 'ticketing_note',
+            'title': u'{} updated ticket #{}'.format(user, event_id % 500),
+            'html_title': u'<a href="/users/{0}">{0}</a> updated a ticket'.format(user),
+            'html_text': u'<p>{}</p>'.format(u'Some note text. ' * rand.randint(1, 20)),
+            'timestamp': '2016-08-01T10:{:02d}:00+01:00'.format(event_id % 60),
+            'user_id': USERS.index(user) + 1,
+            'actor_name': user,
+            'actor_email': '{}@example.com'.format(user),
+            'deleted': False,
+            'project_id': 42,
+            'raw_properties': {
+                'number': event_id % 500,
+                'subject': u'Ticket {}'.format(event_id % 500),
+                'changes': {'status_id': [1, 2]},
+                'content': u'Some note text.',
+            },
+        }
+    }
+
+
+def make_search_page(size=20, seed=0):
+    rand = random.Random(seed)
+    return [make_ticket(i + 1, rand) for i in range(size)]
+
+
+def make_activity_page(size=20, seed=0):
+    rand = random.Random(seed)
+    return [make_event(i + 1, rand) for i in range(size)]
@@ -0,0 +1,96 @@
+"""
+Compares the memory used by tickets held as plain dicts and as
+`codebase.records.Ticket` records, and the cost of reading their fields:
+
+    python -m benchmarks.records [--tickets 100000]
+"""
+import argparse
+import gc
+import json
+import sys
+import timeit
+
+from benchmarks.payloads import make_search_page
+from codebase.records import Ticket
+
+
+def get_deep_size(obj, seen=None):
+    """
+    Returns the size in bytes of `obj` and of everything it references,
+    counting shared objects once.
+    """
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(
+            get_deep_size(key, seen) + get_deep_size(value, seen)
+            for key, value in obj.iteritems()
+        )
+    elif isinstance(obj, (list, tuple)):
+        size += sum(get_deep_size(item, seen) for item in obj)
+    elif hasattr(obj, '__slots__'):
+        for cls in type(obj).__mro__:
+            for slot in getattr(cls, '__slots__', ()):
+                size += get_deep_size(getattr(obj, slot, None), seen)
+    return size
+
+
+def read_dicts(items):
+    for item in items:
+        item['ticket']['ticket_id']
+        item['ticket']['summary']
+        item['ticket']['status']['name']
+        item['ticket']['assignee']
+
+
+def read_records(tickets):
+    for ticket in tickets:
+        ticket.ticket_id
+        ticket.summary
+        ticket.status
+        ticket.assignee
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--tickets', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    # Decoded from JSON, like the API responses.
+    items = json.loads(json.dumps(make_search_page(size=args.tickets)))
+    gc.collect()
+    tickets = Ticket.from_response(items)
+
+    dicts_size = get_deep_size(items)
+    records_size = get_deep_size(tickets)
+    print 'Memory for {} tickets:'.format(args.tickets)
+    print '  dicts:   {:>8.1f} MB'.format(dicts_size / 1024.0 / 1024)
+    print '  records: {:>8.1f} MB ({:.0%} of the dicts)'.format(
+        records_size / 1024.0 / 1024,
+        float(records_size) / dicts_size,
+    )
+
+    print 'Reading 4 fields of every ticket:'
+    for name, func, objects in [
+        ('dicts', read_dicts, items),
+        ('records', read_records, tickets),
+    ]:
+        best = min(timeit.repeat(
+            lambda: func(objects), repeat=args.repeat, number=1
+        ))
+        print '  {:<8} {:>8.1f} ms'.format(name + ':', best * 1000)
+
+    conversion = min(timeit.repeat(
+        lambda: Ticket.from_response(items), repeat=args.repeat, number=1
+    ))
+    print 'Converting the dicts into records: {:.1f} ms'.format(conversion * 1000)
+
+
+if __name__ == '__main__':
+    main()
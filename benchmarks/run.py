@@ -0,0 +1,399 @@
+"""
+Runs the benchmark scenarios against a local stand-in of the Codebase API
+(see `benchmarks.server`) and prints their metrics as JSON:
+
+    python -m benchmarks.run [--scenario search_all ...] [--output results.json]
+
+Each scenario runs in its own process, and the stand-in server in another
+one, so that the peak memory of the scenario is measured on its own.
+Compare the output of two runs to catch regressions.
+"""
+import argparse
+import collections
+import json
+import os
+import platform
+import resource
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks import cli
+from codebase.export import TicketExporter
+from codebase.metrics import REQUEST_FINISHED
+from codebase.multiproject import MultiProjectAPI
+from codebase.ratelimit import RateLimiter
+from codebase.retry import RetryPolicy
+from codebase.snapshot import SnapshotFile
+from codebase.transport import ConnectionPool
+from codebase.utils import CodeBaseAPIUtils
+
+
+ROOT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIOS = collections.OrderedDict()
+
+
+def scenario(name, needs_server=True):
+    def decorator(func):
+        func.needs_server = needs_server
+        SCENARIOS[name] = func
+        return func
+    return decorator
+
+
+class ServerProcess(object):
+    """
+    Runs the stand-in server (see `benchmarks.server`) in its own process.
+    """
+
+    def __init__(self, args):
+        self.command = [
+            sys.executable, '-m', 'benchmarks.server',
+            '--port', '0',
+            '--tickets', str(args.tickets),
+            '--page-size', str(args.page_size),
+            '--notes-per-ticket', str(args.notes_per_ticket),
+            '--note-size', str(args.note_size),
+            '--latency', str(args.latency),
+        ]
+        if args.compress:
+            self.command.append('--compress')
+
+        self.url = None
+        self.requests = None
+        self._process = None
+
+    def start(self):
+        self._process = subprocess.Popen(
+            self.command, cwd=ROOT_PATH, stdout=subprocess.PIPE
+        )
+        # "Serving on <url>"
+        line = self._process.stdout.readline()
+        if not line:
+            self._process.wait()
+            raise RuntimeError('The stand-in server did not start')
+        self.url = line.split()[-1]
+        return self
+
+    def stop(self):
+        self._process.send_signal(signal.SIGINT)
+        # "Served <n> requests"
+        output = self._process.communicate()[0]
+        self.requests = int(output.split()[1])
+
+
+class LatencyRecorder(object):
+    """
+    A request listener keeping the duration of every request.
+    """
+
+    def __init__(self):
+        self.durations = []
+
+    def __call__(self, event, request_info):
+        if event == REQUEST_FINISHED and request_info.duration is not None:
+            self.durations.append(request_info.duration)
+
+    def get_percentiles(self):
+        durations = sorted(self.durations)
+        if not durations:
+            return None
+
+        def percentile(percent):
+            i = int(round(percent / 100.0 * (len(durations) - 1)))
+            return durations[i]
+
+        return {
+            'p50': percentile(50),
+            'p90': percentile(90),
+            'p99': percentile(99),
+            'max': durations[-1],
+        }
+
+
+def create_client(server, recorder, workers):
+    client = CodeBaseAPIUtils(
+        project='benchmark',
+        username='benchmark',
+        apikey='benchmark',
+        transport=ConnectionPool(pool_size=workers),
+        retry_policy=RetryPolicy(max_retries=0),
+        listeners=[recorder],
+    )
+    client.API_ENDPOINT = server.url
+    return client
+
+
+@scenario('search_all')
+def run_search_all(server, recorder, args):
+    client = create_client(server, recorder, args.workers)
+    return len(client.search_all())
+
+
+@scenario('search_all_concurrent')
+def run_search_all_concurrent(server, recorder, args):
+    client = create_client(server, recorder, args.workers)
+    return len(client.search_all(concurrency=args.workers))
+
+
+@scenario('multi_project_search')
+def run_multi_project_search(server, recorder, args):
+    multi = MultiProjectAPI(
+        ['project{}'.format(i) for i in range(args.projects)],
+        username='benchmark',
+        apikey='benchmark',
+        workers=args.workers,
+        rate_limiter=RateLimiter(rate=1000),
+        retry_policy=RetryPolicy(max_retries=0),
+        listeners=[recorder],
+    )
+    for client in multi.clients.values():
+        client.API_ENDPOINT = server.url
+    return sum(1 for item in multi.iter_items('search_all'))
+
+
+@scenario('bulk_notes')
+def run_bulk_notes(server, recorder, args):
+    client = create_client(server, recorder, args.workers)
+    ticket_ids = range(1, args.tickets + 1)
+    return sum(
+        len(notes)
+        for ticket_id, notes in client.notes_many(ticket_ids, workers=args.workers)
+    )
+
+
+@scenario('bulk_update_ticket_statuses')
+def run_bulk_update_ticket_statuses(server, recorder, args):
+    client = create_client(server, recorder, args.workers)
+    # The method prints every updated ticket.
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w')
+    try:
+        return len(client.bulk_update_ticket_statuses('New', 'Completed'))
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+
+@scenario('bulk_create_tickets')
+def run_bulk_create_tickets(server, recorder, args):
+    client = create_client(server, recorder, args.workers)
+    tickets = (
+        {
+            'ticket': {
+                'summary': 'Imported ticket {}'.format(i),
+                'ticket-type': 'Bug',
+                'status-id': 1,
+                'priority-id': 2,
+                'assignee': 'alice',
+            }
+        }
+        for i in range(args.tickets)
+    )
+    return sum(
+        1 for result in client.create_tickets(tickets, workers=args.workers)
+        if result.error is None
+    )
+
+
+@scenario('follow_quiet_activity')
+def run_follow_quiet_activity(server, recorder, args):
+    client = create_client(server, recorder, args.workers)
+    polls = [0]
+
+    class Done(Exception):
+        pass
+
+    def sleep(interval):
+        if polls[0] == args.polls:
+            raise Done()
+        polls[0] += 1
+
+    # The feed doesn't change, so nothing is ever yielded.
+    try:
+        for event in client.follow_activity(sleep=sleep):
+            pass
+    except Done:
+        pass
+    return polls[0]
+
+
+@scenario('snapshot_diff')
+def run_snapshot_diff(server, recorder, args):
+    client = create_client(server, recorder, args.workers)
+    tickets = client.search_all()
+    directory = tempfile.mkdtemp()
+    try:
+        snapshots = SnapshotFile(os.path.join(directory, 'tickets.snapshot'))
+        snapshots.write(tickets)
+        # One ticket in a hundred changed since the previous run.
+        for item in tickets[::100]:
+            item['ticket']['summary'] += ' (edited)'
+        snapshots.update(tickets)
+    finally:
+        shutil.rmtree(directory)
+    return len(tickets)
+
+
+@scenario('export_ndjson')
+def run_export_ndjson(server, recorder, args):
+    client = create_client(server, recorder, args.workers)
+    directory = tempfile.mkdtemp()
+    try:
+        exporter = TicketExporter(client, workers=args.workers)
+        return exporter.export(os.path.join(directory, 'tickets.ndjson'))
+    finally:
+        shutil.rmtree(directory)
+
+
+@scenario('cli_startup', needs_server=False)
+def run_cli_startup(server, recorder, args):
+    # `codebase <project> statuses`, served from the response cache, with
+    # a temporary home directory (see `benchmarks.cli`).
+    home = cli.create_home()
+    try:
+        env = dict(os.environ, HOME=home, PYTHONPATH=ROOT_PATH)
+        command = [
+            sys.executable, os.path.join(ROOT_PATH, 'bin', 'codebase'),
+            cli.PROJECT, 'statuses', '--cache',
+        ]
+        # Fills the command table cache.
+        cli.measure(command, env, 1)
+        for i in range(args.cli_runs):
+            recorder.durations.append(cli.measure(command, env, 1))
+    finally:
+        shutil.rmtree(home)
+    return args.cli_runs
+
+
+def get_peak_memory_kb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS, and in kilobytes elsewhere.
+    if sys.platform == 'darwin':
+        peak //= 1024
+    return peak
+
+
+def run_scenario(name, args):
+    func = SCENARIOS[name]
+    recorder = LatencyRecorder()
+
+    server = None
+    if func.needs_server:
+        server = ServerProcess(args).start()
+
+    try:
+        started_at = time.time()
+        items = func(server, recorder, args)
+        duration = time.time() - started_at
+    finally:
+        if server is not None:
+            server.stop()
+
+    requests = server.requests if server is not None else len(recorder.durations)
+    return collections.OrderedDict([
+        ('scenario', name),
+        ('duration', duration),
+        ('requests', requests),
+        ('items', items),
+        ('requests_per_second', requests / duration if duration else None),
+        ('items_per_second', items / duration if duration else None),
+        ('latency', recorder.get_percentiles()),
+        ('peak_memory_kb', get_peak_memory_kb()),
+    ])
+
+
+def run_in_subprocess(name, argv):
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'benchmarks.run', '--child', '--scenario', name] + argv,
+        cwd=ROOT_PATH,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    stdout, stderr = process.communicate()
+    if process.returncode:
+        return collections.OrderedDict([
+            ('scenario', name),
+            ('error', stderr.strip().splitlines()[-1] if stderr.strip() else 'failed'),
+        ])
+    return json.loads(stdout, object_pairs_hook=collections.OrderedDict)[0]
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        '--scenario',
+        action='append',
+        choices=SCENARIOS.keys(),
+        help='Scenario to run (all of them by default), can be repeated',
+    )
+    parser.add_argument('--tickets', type=int, default=1000)
+    parser.add_argument('--page-size', type=int, default=20)
+    parser.add_argument('--notes-per-ticket', type=int, default=5)
+    parser.add_argument('--note-size', type=int, default=200, help='Characters per note')
+    parser.add_argument('--latency', type=float, default=0.005, help='Seconds per request')
+    parser.add_argument('--compress', action='store_true', help='Gzip the responses')
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--projects', type=int, default=10, help='For multi_project_search')
+    parser.add_argument('--cli-runs', type=int, default=5)
+    parser.add_argument('--polls', type=int, default=200, help='For follow_quiet_activity')
+    parser.add_argument('--output', help='Write the results to this file')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    return parser
+
+
+def get_child_argv(args):
+    argv = [
+        '--tickets', str(args.tickets),
+        '--page-size', str(args.page_size),
+        '--notes-per-ticket', str(args.notes_per_ticket),
+        '--note-size', str(args.note_size),
+        '--latency', str(args.latency),
+        '--workers', str(args.workers),
+        '--projects', str(args.projects),
+        '--cli-runs', str(args.cli_runs),
+        '--polls', str(args.polls),
+    ]
+    if args.compress:
+        argv.append('--compress')
+    return argv
+
+
+def main():
+    args = get_parser().parse_args()
+    names = args.scenario or SCENARIOS.keys()
+
+    if args.child:
+        results = [run_scenario(name, args) for name in names]
+    else:
+        results = [run_in_subprocess(name, get_child_argv(args)) for name in names]
+
+    if args.child:
+        print json.dumps(results, indent=2)
+        return
+
+    report = collections.OrderedDict([
+        ('python', platform.python_version()),
+        ('platform', platform.platform()),
+        ('options', collections.OrderedDict(
+            (name, getattr(args, name))
+            for name in (
+                'tickets', 'page_size', 'notes_per_ticket', 'note_size', 'latency',
+                'compress', 'workers', 'projects', 'cli_runs', 'polls',
+            )
+        )),
+        ('results', results),
+    ])
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    print output
+
+
+if __name__ == '__main__':
+    main()
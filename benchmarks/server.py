@@ -0,0 +1,251 @@
+"""
+A local stand-in for the Codebase API, serving generated tickets, notes,
+statuses and milestones with a configurable latency:
+
+    python -m benchmarks.server [--port 8000] [--tickets 1000] [--latency 0.02]
+
+Point a client at it with `client.API_ENDPOINT = server.url`.
+"""
+import BaseHTTPServer
+import SocketServer
+import argparse
+import gzip
+import json
+import re
+import sys
+import threading
+import time
+import urlparse
+from StringIO import StringIO
+
+import xmltodict
+
+from benchmarks.payloads import STATUSES, make_activity_page, make_search_page
+
+
+class StandInServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    # Room for a burst of concurrent connections.
+    request_queue_size = 128
+
+    def __init__(
+        self, port=0, tickets=1000, page_size=20, notes_per_ticket=5,
+        note_size=200, latency=0.0, compress=False
+    ):
+        BaseHTTPServer.HTTPServer.__init__(self, ('127.0.0.1', port), RequestHandler)
+
+        self.page_size = page_size
+        self.latency = latency
+        self.compress = compress
+        self.tickets = make_search_page(size=tickets)
+        self.notes_per_ticket = notes_per_ticket
+        self.note_content = u'Some note text. ' * (note_size // 16)
+        self.statuses = [
+            {'ticketing_status': {'id': i + 1, 'name': name, 'order': i + 1}}
+            for i, name in enumerate(STATUSES)
+        ]
+        # Most recent first, like the API.
+        self.activity = make_activity_page(size=page_size)[::-1]
+        self.milestones = [
+            {'ticketing_milestone': {'id': i + 1, 'name': 'Sprint {}'.format(i + 1)}}
+            for i in range(10)
+        ]
+
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self):
+        return 'http://{}:{}'.format(*self.server_address)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def count_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def get_page(self, page):
+        start = (page - 1) * self.page_size
+        return self.tickets[start:start + self.page_size]
+
+    def get_notes(self, ticket_id):
+        return [
+            {
+                'ticket_note': {
+                    'id': ticket_id * 1000 + i,
+                    'content': self.note_content,
+                    'user_id': 1,
+                    'created_at': '2016-08-01T10:{:02d}:00+01:00'.format(i % 60),
+                    'updated_at': '2016-08-01T10:{:02d}:00+01:00'.format(i % 60),
+                }
+            }
+            for i in range(self.notes_per_ticket)
+        ]
+
+
+class RequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    # Keeps the connections alive, like the real API.
+    protocol_version = 'HTTP/1.1'
+    # Otherwise the small writes of each response wait for a delayed ACK on
+    # a kept-alive connection, adding ~40ms to every request.
+    disable_nagle_algorithm = True
+
+    ROUTES = [
+        ('GET', re.compile(r'^/[^/]+/tickets$'), 'search'),
+        ('POST', re.compile(r'^/[^/]+/tickets$'), 'create_ticket'),
+        ('GET', re.compile(r'^/[^/]+/tickets/statuses$'), 'statuses'),
+        ('GET', re.compile(r'^/[^/]+/milestones$'), 'milestones'),
+        ('GET', re.compile(r'^(?:/[^/]+)?/activity$'), 'activity'),
+        ('GET', re.compile(r'^/[^/]+/tickets/(\d+)/notes$'), 'notes'),
+        ('POST', re.compile(r'^/[^/]+/tickets/(\d+)/notes$'), 'add_note'),
+    ]
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def _dispatch(self, method):
+        self.server.count_request()
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        url = urlparse.urlsplit(self.path)
+        params = urlparse.parse_qs(url.query)
+        for route_method, pattern, name in self.ROUTES:
+            match = pattern.match(url.path)
+            if route_method == method and match:
+                return getattr(self, name)(params, *match.groups())
+        self._send_error(404)
+
+    def search(self, params):
+        page = int(params.get('page', ['1'])[0])
+        tickets = self.server.get_page(page)
+        if not tickets:
+            return self._send_error(404)
+        self._send(tickets, 'tickets', 'ticket')
+
+    def statuses(self, params):
+        self._send(self.server.statuses, 'ticketing-statuses', 'ticketing-status')
+
+    def milestones(self, params):
+        self._send(self.server.milestones, 'ticketing-milestones', 'ticketing-milestone')
+
+    def activity(self, params):
+        # The feed never changes, so it can always be revalidated.
+        etag = '"activity"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self._send(self.server.activity, 'events', 'event', {'ETag': etag})
+
+    def notes(self, params, ticket_id):
+        self._send(self.server.get_notes(int(ticket_id)), 'ticket-notes', 'ticket-note')
+
+    def create_ticket(self, params):
+        self._read_body()
+        self._send(self.server.tickets[0], None, None)
+
+    def add_note(self, params, ticket_id):
+        self._read_body()
+        self._send(self.server.get_notes(int(ticket_id))[0], None, None)
+
+    def _read_body(self):
+        # Consumes the body so that the connection can be reused.
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+
+    def _send(self, items, list_name, item_name, headers=None):
+        if 'xml' in (self.headers.get('Accept') or ''):
+            if list_name is None:
+                body = xmltodict.unparse(items)
+            else:
+                body = xmltodict.unparse({list_name: {item_name: [
+                    item.values()[0] for item in items
+                ]}})
+            content_type = 'application/xml'
+        else:
+            body = json.dumps(items)
+            content_type = 'application/json'
+
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        accept_encoding = self.headers.get('Accept-Encoding') or ''
+        if self.server.compress and 'gzip' in accept_encoding:
+            body = self._gzip(body)
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _gzip(self, body):
+        buf = StringIO()
+        with gzip.GzipFile(fileobj=buf, mode='wb') as f:
+            f.write(body)
+        return buf.getvalue()
+
+    def _send_error(self, code):
+        body = 'Not Found'
+        self.send_response(code)
+        self.send_header('Content-Type', 'text/plain')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--tickets', type=int, default=1000)
+    parser.add_argument('--page-size', type=int, default=20)
+    parser.add_argument('--notes-per-ticket', type=int, default=5)
+    parser.add_argument('--note-size', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--compress', action='store_true')
+    args = parser.parse_args()
+
+    server = StandInServer(
+        port=args.port,
+        tickets=args.tickets,
+        page_size=args.page_size,
+        notes_per_ticket=args.notes_per_ticket,
+        note_size=args.note_size,
+        latency=args.latency,
+        compress=args.compress,
+    )
+    print 'Serving on {}'.format(server.url)
+    # Read by `benchmarks.run` through a pipe.
+    sys.stdout.flush()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+    print 'Served {} requests'.format(server.requests)
+
+
+if __name__ == '__main__':
+    main()
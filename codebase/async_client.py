@@ -0,0 +1,70 @@
+import functools
+import inspect
+
+from codebase.client import CodeBaseAPI
+from codebase.executor import WorkerPool
+from codebase.transport import ConnectionPool
+
+
+class AsyncCodeBaseAPI(object):
+    """
+    Non-blocking twin of `CodeBaseAPI`.
+
+    Every endpoint method of `CodeBaseAPI` is available with the same
+    arguments, but returns a `codebase.executor.Future` straight away instead
+    of blocking until the response arrives:
+
+        codebase = AsyncCodeBaseAPI(project='MyProject', concurrency=16)
+        futures = [codebase.notes(ticket_id) for ticket_id in ticket_ids]
+        notes = [future.result() for future in futures]
+
+    At most `concurrency` requests are in flight at any time, all sharing the
+    same keep-alive connection pool; extra calls are queued.
+    """
+    DEFAULT_CONCURRENCY = 8
+
+    def __init__(
+        self, project=None, username=None, apikey=None,
+        concurrency=DEFAULT_CONCURRENCY, transport=None, **kwargs
+    ):
+        # Closed with the client if created here.
+        self._own_transport = None
+        if transport is None:
+            # Keep one idle connection per worker around.
+            transport = self._own_transport = ConnectionPool(pool_size=concurrency)
+
+        self.client = CodeBaseAPI(
+            project=project,
+            username=username,
+            apikey=apikey,
+            transport=transport,
+            **kwargs
+        )
+        self.concurrency = concurrency
+        self._pool = WorkerPool(workers=concurrency)
+
+    def __getattr__(self, name):
+        method = getattr(CodeBaseAPI, name, None)
+        if name.startswith('_') or not callable(method):
+            raise AttributeError(name)
+
+        bound_method = getattr(self.client, name)
+        if inspect.isgeneratorfunction(method):
+            # Generators are already lazy, and run in the caller's thread.
+            return bound_method
+
+        @functools.wraps(bound_method)
+        def submit(*args, **kwargs):
+            return self._pool.submit(bound_method, *args, **kwargs)
+        return submit
+
+    def close(self):
+        self._pool.shutdown()
+        if self._own_transport is not None:
+            self._own_transport.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,186 @@
+import collections
+import json
+import os
+import threading
+import time
+
+from codebase import logger
+
+
+class ResponseCache(object):
+    """
+    A size-bounded LRU cache for endpoint responses, with per-endpoint TTLs.
+
+    Entries are keyed by (project, endpoint), e.g. ('myproject', 'statuses').
+    If `file_path` is given, the entries are loaded from that file on
+    creation and written back whenever they change, so that they survive
+    across processes (e.g. successive CLI runs).
+
+    Cached responses are shared between callers and must not be modified.
+    """
+    DEFAULT_FILE_PATH = '~/.codebase_cache'
+    DEFAULT_MAX_ENTRIES = 256
+    DEFAULT_TTL = 300
+    DEFAULT_TTLS = {
+        'statuses': 3600,
+        'priorities': 3600,
+        'categories': 3600,
+        'types': 3600,
+        'roles': 3600,
+        'milestones': 600,
+        'users': 600,
+    }
+
+    def __init__(self, ttls=None, max_entries=DEFAULT_MAX_ENTRIES, file_path=None):
+        self.ttls = dict(self.DEFAULT_TTLS, **(ttls or {}))
+        self.max_entries = max_entries
+        self.file_path = file_path and os.path.expanduser(file_path)
+
+        self._lock = threading.RLock()
+        self._entries = collections.OrderedDict()
+
+        if self.file_path:
+            self.load()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get_ttl(self, endpoint):
+        return self.ttls.get(endpoint, self.DEFAULT_TTL)
+
+    def get(self, project, endpoint):
+        """
+        Returns the cached response, or None if missing or expired.
+        """
+        key = (project, endpoint)
+        with self._lock:
+            try:
+                expires_at, value = self._entries.pop(key)
+            except KeyError:
+                return None
+
+            if expires_at <= time.time():
+                self._save()
+                return None
+
+            # Moves the entry back to the most recently used end.
+            self._entries[key] = (expires_at, value)
+            return value
+
+    def set(self, project, endpoint, value):
+        key = (project, endpoint)
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (time.time() + self.get_ttl(endpoint), value)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._save()
+
+    def invalidate(self, project=None, endpoint=None):
+        """
+        Drops the entries matching `project` and/or `endpoint` (all of them
+        if neither is given).
+        """
+        with self._lock:
+            for key in self._entries.keys():
+                if project is not None and key[0] != project:
+                    continue
+                if endpoint is not None and key[1] != endpoint:
+                    continue
+                del self._entries[key]
+            self._save()
+
+    def clear(self):
+        self.invalidate()
+
+    def load(self):
+        try:
+            with open(self.file_path, 'r') as f:
+                entries = json.loads(f.read())
+        except IOError:
+            return
+        except ValueError:
+            logger.warning(
+                u'Ignoring invalid cache file "{}"'.format(self.file_path)
+            )
+            return
+
+        now = time.time()
+        with self._lock:
+            for project, endpoint, expires_at, value in entries:
+                if expires_at > now:
+                    self._entries[(project, endpoint)] = (expires_at, value)
+
+    def _save(self):
+        if not self.file_path:
+            return
+
+        entries = [
+            [project, endpoint, expires_at, value]
+            for (project, endpoint), (expires_at, value)
+            in self._entries.iteritems()
+        ]
+        # Writes to a temporary file first so that concurrent processes never
+        # read a half-written cache.
+        tmp_file_path = '{}.{}.tmp'.format(self.file_path, os.getpid())
+        try:
+            with open(tmp_file_path, 'w') as f:
+                f.write(json.dumps(entries))
+            os.rename(tmp_file_path, self.file_path)
+        except (IOError, OSError) as e:
+            logger.warning(
+                u'Could not write cache file "{}": {}'.format(self.file_path, e)
+            )
+
+
+Validators = collections.namedtuple(
+    'Validators',
+    ['etag', 'last_modified', 'value'],
+)
+
+
+class RevalidationCache(object):
+    """
+    Keeps the HTTP validators (ETag / Last-Modified) of GET responses along
+    with their parsed content, so that unchanged resources can be
+    revalidated with a conditional request instead of being downloaded and
+    parsed again.
+
+    Only the `max_entries` most recently used responses are kept. Cached
+    responses are shared between callers and must not be modified.
+    """
+    DEFAULT_MAX_ENTRIES = 512
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """
+        Returns the `Validators` stored for `key`, or None.
+        """
+        with self._lock:
+            validators = self._entries.pop(key, None)
+            if validators is not None:
+                self._entries[key] = validators
+            return validators
+
+    def set(self, key, etag, last_modified, value):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = Validators(etag, last_modified, value)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
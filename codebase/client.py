@@ -1,14 +1,160 @@
 import base64
-import json
+import collections
+import functools
+import itertools
 import logging
+import time
 import urllib
 import urllib2
 import urlparse
 
-import xmltodict
-
 from codebase import logger
+from codebase.cache import RevalidationCache
+from codebase.decoders import default_registry, iter_xml_items
+from codebase.executor import DEFAULT_WORKERS, SingleFlight, imap
+from codebase.metrics import (
+    BODY_READ,
+    FIRST_BYTE,
+    REQUEST_FINISHED,
+    REQUEST_STARTED,
+    RESPONSE_PARSED,
+    CountingReader,
+    RequestInfo,
+    get_url_template,
+)
+from codebase.records import Milestone, Note, Status, Ticket, User, parse_datetime
+from codebase.retry import RetryPolicy, get_retry_after
+from codebase.serializers import default_xml_serializer
 from codebase.settings import Settings
+from codebase.transport import ConnectionPool, DecompressingReader
+
+
+# Shared by every client that is not given its own transport, so that all of
+# them reuse the same keep-alive connections.
+default_transport = ConnectionPool()
+
+# Coalesces the identical GET requests made at the same time by any client.
+default_single_flight = SingleFlight()
+
+# Seconds between two polls of `follow_activity`, growing by the backoff
+# factor after each poll which found no new event.
+ACTIVITY_MIN_INTERVAL = 5
+ACTIVITY_MAX_INTERVAL = 300
+ACTIVITY_BACKOFF_FACTOR = 1.5
+
+
+def cached(endpoint):
+    """
+    Serves the decorated endpoint method from the client's response cache,
+    if it has one.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if self.cache is None:
+                return method(self, *args, **kwargs)
+
+            response = self.cache.get(self.project, endpoint)
+            if response is None:
+                response = method(self, *args, **kwargs)
+                if response is not None:
+                    self.cache.set(self.project, endpoint, response)
+            return response
+        return wrapper
+    return decorator
+
+
+def typed(record_class):
+    """
+    Converts the response of the decorated endpoint method into
+    `record_class` records (see `codebase.records`) when the client was
+    created with `typed=True`.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            response = method(self, *args, **kwargs)
+            if not self.typed or response is None:
+                return response
+            return record_class.from_response(response)
+        return wrapper
+    return decorator
+
+
+class SearchError(Exception):
+    """
+    Raised when some pages of a search could not be fetched.
+
+    `tickets` holds the tickets of the pages fetched before the first failing
+    one and `errors` maps each failing page number to its error.
+    """
+
+    def __init__(self, term, tickets, errors):
+        super(SearchError, self).__init__(
+            u'Could not fetch page(s) {} while searching for "{}"'.format(
+                ', '.join(str(page) for page in sorted(errors)),
+                term,
+            )
+        )
+        self.tickets = tickets
+        self.errors = errors
+
+
+class BatchError(Exception):
+    """
+    Raised at the end of a batch fetch (e.g. `notes_many`) when some of the
+    tickets could not be fetched. `errors` maps their ids to their error.
+    """
+
+    def __init__(self, errors):
+        super(BatchError, self).__init__(
+            u'Could not fetch ticket(s) {}'.format(
+                ', '.join(str(ticket_id) for ticket_id in sorted(errors))
+            )
+        )
+        self.errors = errors
+
+
+class ActivityCursor(object):
+    """
+    The position of `follow_activity` in an activity feed: the time of the
+    most recent event seen, and the ids of the events seen at that time.
+    """
+
+    def __init__(self, since=None):
+        if isinstance(since, basestring):
+            since = parse_datetime(since)
+        self.timestamp = since
+        self.ids = set()
+
+    def is_new(self, event):
+        if self.timestamp is None:
+            return True
+        timestamp = get_event_time(event)
+        if timestamp == self.timestamp:
+            return event['event']['id'] not in self.ids
+        return timestamp > self.timestamp
+
+    def advance(self, event):
+        timestamp = get_event_time(event)
+        if self.timestamp is None or timestamp > self.timestamp:
+            self.timestamp = timestamp
+            self.ids = set()
+        if timestamp == self.timestamp:
+            self.ids.add(event['event']['id'])
+
+
+def get_event_time(event):
+    return parse_datetime(event['event']['timestamp'])
+
+
+def _encode(body):
+    # httplib sends a unicode body in a separate write from the headers,
+    # which stalls on a reused connection (Nagle and delayed ACKs), and
+    # can't send non-ASCII text at all.
+    if isinstance(body, unicode):
+        return body.encode('utf-8')
+    return body
 
 
 class Auth(object):
@@ -16,7 +162,11 @@ class Auth(object):
     CTYPE_XML = 'xml'
     API_ENDPOINT = 'https://api3.codebasehq.com'
 
-    def __init__(self, project=None, username=None, apikey=None, **kwargs):
+    def __init__(
+        self, project=None, username=None, apikey=None, transport=None,
+        revalidation_cache=None, retry_policy=None, rate_limiter=None,
+        listeners=None, decoders=None, coalesce_requests=False, **kwargs
+    ):
         super(Auth, self).__init__(**kwargs)
 
         if not (username or apikey):
@@ -28,6 +178,58 @@ class Auth(object):
         self.apikey = apikey
 
         self.project = project
+        self.transport = transport or default_transport
+
+        # An optional `codebase.cache.RevalidationCache`, used to make
+        # conditional GET requests.
+        self.revalidation_cache = revalidation_cache
+
+        # Use `RetryPolicy(max_retries=0)` to disable retries. The optional
+        # `codebase.ratelimit.RateLimiter` can be shared between clients.
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.rate_limiter = rate_limiter
+
+        # Callables notified of each step of every request, see `subscribe`.
+        self.listeners = list(listeners or [])
+
+        # A `codebase.decoders.DecoderRegistry`, to use other decoders than
+        # the default ones.
+        self.decoders = decoders or default_registry
+
+        # Whether concurrent identical GET requests share a single request,
+        # and its result, which must then not be modified.
+        self.coalesce_requests = coalesce_requests
+
+    def subscribe(self, listener):
+        """
+        Registers `listener` to be called as `listener(event, request_info)`
+        at each step of every request: `codebase.metrics.REQUEST_STARTED`,
+        `FIRST_BYTE`, `BODY_READ`, `RESPONSE_PARSED` and `REQUEST_FINISHED`.
+        `request_info` is the `codebase.metrics.RequestInfo` of the request.
+        Compressed and streamed bodies are read as they are parsed: their
+        `BODY_READ` comes with `RESPONSE_PARSED`, and `request_info.streamed`
+        is set.
+
+        Listeners are called from the thread making the request and should
+        return quickly. A GET request coalesced with a concurrent identical
+        one (see `coalesce_requests`) only emits `REQUEST_STARTED` and
+        `REQUEST_FINISHED` once it gets its result, with
+        `request_info.coalesced` set.
+        """
+        self.listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        self.listeners.remove(listener)
+
+    def _notify(self, event, request_info, timestamp_attr=None):
+        if timestamp_attr is not None:
+            setattr(request_info, timestamp_attr, time.time())
+
+        for listener in self.listeners:
+            try:
+                listener(event, request_info)
+            except Exception:
+                logger.exception(u'Request listener {!r} failed'.format(listener))
 
     def _get_settings(self):
         settings = Settings()
@@ -41,34 +243,59 @@ class Auth(object):
         return {
             'Content-type': 'application/{}'.format(ctype),
             'Accept': 'application/{}'.format(ctype),
+            'Accept-Encoding': 'gzip, deflate',
             'Authorization': base64.b64encode(
                 '{}:{}'.format(self.username, self.apikey)
             )
         }
 
     def get_data(self, raw_data, ctype):
+        if isinstance(raw_data, basestring):
+            # Already serialized.
+            return _encode(raw_data)
+
         if ctype == self.CTYPE_XML:
-            return xmltodict.unparse(raw_data)
+            return _encode(default_xml_serializer.serialize(raw_data))
 
         # Encodes the parameters by default (i.e. using json).
         return urllib.urlencode(raw_data)
 
-    def _handle_response(self, response, ctype):
+    def _handle_response(self, response, ctype, request_info=None):
         try:
+            if request_info is not None and self.listeners:
+                response = CountingReader(response, request_info)
+
             status_code = response.getcode()
-            content = response.read()
+            encoding = response.info().getheader('Content-Encoding')
+            if encoding in DecompressingReader.ENCODINGS:
+                # The body is decompressed while being parsed.
+                content = DecompressingReader(response, encoding)
+                if request_info is not None:
+                    request_info.streamed = True
+            else:
+                content = response.read()
+                if request_info is not None:
+                    self._notify(BODY_READ, request_info, 'body_read_at')
             logger.debug('{} returned status code {}'.format(
                 response.url,
                 status_code
             ))
 
-            if ctype == self.CTYPE_XML:
-                return xmltodict.parse(content)
-            return json.loads(content)
+            decoder = self.decoders.get(ctype) or self.decoders.get(self.CTYPE_JSON)
+            parsed = decoder.decode(content)
+
+            if request_info is not None:
+                if request_info.streamed:
+                    # Read as it was parsed.
+                    self._notify(BODY_READ, request_info, 'body_read_at')
+                self._notify(RESPONSE_PARSED, request_info, 'parsed_at')
+            return parsed
         except Exception as e:
+            if request_info is not None:
+                request_info.error = e
             logging.exception('%s: %s', e.__class__.__name__, e.message)
 
-    def _send_request(self, url, ctype=None, data=None):
+    def _send_request(self, url, ctype=None, data=None, revalidation_cache=None):
         if not ctype:
             ctype = self.CTYPE_JSON
 
@@ -82,17 +309,210 @@ class Auth(object):
             data = self.get_data(data, ctype)
             req_params['data'] = data
 
+        if revalidation_cache is None:
+            revalidation_cache = self.revalidation_cache
+        cache_key = None
+        validators = None
+        if revalidation_cache is not None and not data:
+            cache_key = (self.username, absolute_url, ctype)
+            validators = revalidation_cache.get(cache_key)
+            if validators is not None:
+                headers.update(self._get_conditional_headers(validators))
+
         request = urllib2.Request(**req_params)
-        logging.info('Making request to {} with headers {}'.format(
+        logger.info('Making request to {} with headers {}'.format(
             request.get_full_url(),
-            request.headers,
+            self._get_loggable_headers(request.headers),
         ))
 
-        response = urllib2.urlopen(request)
-        return self._handle_response(response, ctype)
+        request_info = RequestInfo(
+            request.get_method(),
+            absolute_url,
+            get_url_template(url, self.project),
+            ctype,
+        )
+        request_info.bytes_sent = len(data) if data else 0
+        self._notify(REQUEST_STARTED, request_info, 'started_at')
+        try:
+            return self._fetch(
+                request, ctype, revalidation_cache, cache_key, validators, request_info
+            )
+        except Exception as e:
+            request_info.error = e
+            request_info.status = getattr(e, 'code', None)
+            raise
+        finally:
+            self._notify(REQUEST_FINISHED, request_info, 'finished_at')
+
+    def _fetch(
+        self, request, ctype, revalidation_cache, cache_key, validators, request_info
+    ):
+        try:
+            response = self._open(request)
+        except urllib2.HTTPError as e:
+            # urllib2 based transports treat 304 as an error.
+            if validators is not None and e.code == 304:
+                request_info.status = e.code
+                return validators.value
+            raise
+
+        request_info.status = response.getcode()
+        self._notify(FIRST_BYTE, request_info, 'first_byte_at')
+
+        if validators is not None and response.getcode() == 304:
+            logger.debug('{} not modified'.format(request.get_full_url()))
+            response.close()
+            return validators.value
+
+        content = self._handle_response(response, ctype, request_info)
+        if cache_key is not None and content is not None:
+            self._store_validators(revalidation_cache, cache_key, response, content)
+        return content
+
+    def _get_loggable_headers(self, headers):
+        return dict(
+            (name, '<redacted>' if name.lower() == 'authorization' else value)
+            for name, value in headers.iteritems()
+        )
+
+    def _open(self, request):
+        """
+        Sends the request through the transport, applying the rate limiter
+        and retrying according to the retry policy.
+        """
+        attempt = 0
+        while True:
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+
+            try:
+                response = self.transport.open(request)
+            except urllib2.URLError as e:
+                if self.rate_limiter is not None and getattr(e, 'code', None) == 429:
+                    self.rate_limiter.throttled(get_retry_after(e))
+
+                delay = self.retry_policy.get_delay(
+                    attempt, request.get_method(), e
+                )
+                if delay is None:
+                    raise
+
+                attempt += 1
+                logger.warning(
+                    u'Request to {} failed ({}), retry {} in {:.2f}s'.format(
+                        request.get_full_url(), e, attempt, delay
+                    )
+                )
+                time.sleep(delay)
+                continue
+
+            if self.rate_limiter is not None:
+                self.rate_limiter.succeeded()
+            return response
+
+    def _get_conditional_headers(self, validators):
+        headers = {}
+        if validators.etag:
+            headers['If-None-Match'] = validators.etag
+        if validators.last_modified:
+            headers['If-Modified-Since'] = validators.last_modified
+        return headers
+
+    def _store_validators(self, revalidation_cache, cache_key, response, content):
+        etag = response.info().getheader('ETag')
+        last_modified = response.info().getheader('Last-Modified')
+        if etag or last_modified:
+            revalidation_cache.set(cache_key, etag, last_modified, content)
+        else:
+            revalidation_cache.invalidate(cache_key)
+
+    def iter_xml(self, url, item_depth=2):
+        """
+        Yields the elements of the XML response of a GET request found at
+        `item_depth` (see `codebase.decoders.iter_xml_items`) while the
+        response is still being received, so that large lists don't have to
+        be held in memory all at once.
+
+        The request is sent when the iteration starts.
+        """
+        absolute_url = self.get_absolute_url(url)
+        request = urllib2.Request(
+            url=absolute_url,
+            headers=self.get_headers(self.CTYPE_XML),
+        )
+        request_info = RequestInfo(
+            'GET',
+            absolute_url,
+            get_url_template(url, self.project),
+            self.CTYPE_XML,
+        )
+        self._notify(REQUEST_STARTED, request_info, 'started_at')
+
+        response = None
+        try:
+            response = self._open(request)
+            request_info.status = response.getcode()
+            self._notify(FIRST_BYTE, request_info, 'first_byte_at')
+
+            request_info.streamed = True
+            content = CountingReader(response, request_info)
+            encoding = response.info().getheader('Content-Encoding')
+            if encoding in DecompressingReader.ENCODINGS:
+                content = DecompressingReader(content, encoding)
+
+            for item in iter_xml_items(content, item_depth):
+                yield item
+
+            self._notify(BODY_READ, request_info, 'body_read_at')
+            self._notify(RESPONSE_PARSED, request_info, 'parsed_at')
+        except Exception as e:
+            request_info.error = e
+            request_info.status = getattr(e, 'code', request_info.status)
+            raise
+        finally:
+            if response is not None:
+                response.close()
+            self._notify(REQUEST_FINISHED, request_info, 'finished_at')
 
     def get(self, url, ctype=None):
-        return self._send_request(url, ctype=ctype)
+        if not self.coalesce_requests:
+            return self._send_request(url, ctype=ctype)
+
+        ctype = ctype or self.CTYPE_JSON
+        absolute_url = self.get_absolute_url(url)
+        # Only the calls which would make the same request and handle its
+        # response the same way are coalesced.
+        key = (
+            absolute_url,
+            ctype,
+            self.username,
+            self.apikey,
+            self.decoders,
+            self.revalidation_cache,
+        )
+        sent = []
+
+        def send_request():
+            sent.append(True)
+            return self._send_request(url, ctype=ctype)
+
+        request_info = RequestInfo(
+            'GET', absolute_url, get_url_template(url, self.project), ctype
+        )
+        request_info.coalesced = True
+        request_info.started_at = time.time()
+        try:
+            return default_single_flight.do(key, send_request)
+        except Exception as e:
+            request_info.error = e
+            request_info.status = getattr(e, 'code', None)
+            raise
+        finally:
+            if not sent:
+                # The request was made by another caller, whose listeners
+                # were notified of its steps.
+                self._notify(REQUEST_STARTED, request_info)
+                self._notify(REQUEST_FINISHED, request_info, 'finished_at')
 
     def post(self, url, data, ctype=None):
         return self._send_request(url, data=data, ctype=ctype)
@@ -100,25 +520,78 @@ class Auth(object):
 
 class CodeBaseAPI(Auth):
 
+    def __init__(
+        self, project=None, username=None, apikey=None, cache=None,
+        typed=False, **kwargs
+    ):
+        super(CodeBaseAPI, self).__init__(
+            project=project,
+            username=username,
+            apikey=apikey,
+            **kwargs
+        )
+
+        # An optional `codebase.cache.ResponseCache` for the project metadata
+        # endpoints, which rarely change.
+        self.cache = cache
+
+        # Return compact `codebase.records` objects instead of dicts for
+        # tickets, notes, statuses, milestones and users.
+        self.typed = typed
+
     def projects(self):
         return self.get('/projects')
 
+    @typed(Status)
+    @cached('statuses')
     def statuses(self):
         return self.get('/%s/tickets/statuses' % self.project)
 
+    @cached('priorities')
     def priorities(self):
         return self.get('/%s/tickets/priorities' % self.project)
 
+    @cached('categories')
     def categories(self):
         return self.get('/%s/tickets/categories' % self.project)
 
+    @cached('types')
     def types(self):
         return self.get('/%s/tickets/types' % self.project)
 
+    @typed(Milestone)
+    @cached('milestones')
     def milestones(self):
         return self.get('/%s/milestones' % self.project)
 
+    @typed(Ticket)
     def search(self, term=None, page=None, **kwargs):
+        return self.get(self._get_search_url(term=term, page=page, **kwargs))
+
+    def stream_search(self, term=None, **kwargs):
+        """
+        Yields the tickets of all the result pages, parsing the XML responses
+        as they are received: only a few tickets are held in memory at a
+        time. The tickets are shaped like the XML responses, i.e.
+        `{'ticket': {'ticket-id': {'@type': 'integer', '#text': '1'}, ...}}`.
+        """
+        for page in itertools.count(1):
+            url = self._get_search_url(term=term, page=page, **kwargs)
+            found = False
+            try:
+                for ticket in self.iter_xml(url):
+                    found = True
+                    yield ticket
+            except urllib2.HTTPError as e:
+                # Codebase answers with a 404 once there are no more results.
+                if e.code == 404 and not found:
+                    return
+                raise
+
+            if not found:
+                return
+
+    def _get_search_url(self, term=None, page=None, **kwargs):
         queries = []
         if term:
             queries.append(term.strip())
@@ -132,19 +605,39 @@ class CodeBaseAPI(Auth):
         if page and page > 1 and type(page) is int:
             params['page'] = page
 
-        url = '/{}/tickets?{}'.format(self.project, urllib.urlencode(params))
-        return self.get(url)
+        return '/{}/tickets?{}'.format(self.project, urllib.urlencode(params))
+
+    def search_all(self, term=None, concurrency=None, **kwargs):
+        """
+        Returns the tickets of all the result pages.
+
+        By default the pages are fetched one after the other. If
+        `concurrency` is given, the pages following the first one are fetched
+        in parallel by up to `concurrency` threads, and the results keep the
+        page order.
+
+        A `SearchError`, holding the tickets fetched so far, is raised if a
+        page still fails with a connection, rate limiting or server error
+        once retried.
+        """
+        if concurrency:
+            return self._search_all_concurrent(term, concurrency, **kwargs)
 
-    def search_all(self, term=None, **kwargs):
         page = 1
         tickets = []
         while True:
             try:
                 tickets.extend(self.search(term=term, page=page, **kwargs))
                 page += 1
-            except urllib2.HTTPError:
+            except urllib2.HTTPError as e:
+                # Running out of pages ends with an HTTP error as well, but
+                # these ones mean that results are missing.
+                if e.code in RetryPolicy.RETRY_STATUSES:
+                    raise SearchError(term, tickets, {page: e})
                 page -= 1
                 break
+            except urllib2.URLError as e:
+                raise SearchError(term, tickets, {page: e})
             except Exception, e:
                 logger.error(
                     u'An error occured while searching for "%s" '
@@ -155,9 +648,148 @@ class CodeBaseAPI(Auth):
 
         return tickets
 
+    def iter_search(self, term=None, **kwargs):
+        """
+        Yields the tickets of all the result pages, one page at a time.
+
+        The next page is fetched in the background while the tickets of the
+        current one are being consumed, and only these two pages are held in
+        memory.
+        """
+        pages = self.iter_search_pages(term=term, **kwargs)
+        try:
+            for page, tickets in pages:
+                for ticket in tickets:
+                    yield ticket
+        finally:
+            pages.close()
+
+    def iter_search_pages(self, term=None, first_page=1, **kwargs):
+        """
+        Yields `(page, tickets)` for each result page from `first_page` on,
+        fetching the next page in the background like `iter_search`.
+        """
+        def fetch(page):
+            return self._search_page(page, term=term, **kwargs)
+
+        # With two pending pages, the next page is always in flight while the
+        # current one is being consumed.
+        results = imap(fetch, itertools.count(first_page), workers=1, max_pending=2)
+        try:
+            for page, tickets, error in results:
+                if error is not None:
+                    raise error
+                if tickets is None:
+                    return
+                yield page, tickets
+        finally:
+            results.close()
+
+    def _fetch_many(self, method, ticket_ids, workers, progress, errors):
+        seen = set()
+        unique_ids = []
+        for ticket_id in ticket_ids:
+            if ticket_id not in seen:
+                seen.add(ticket_id)
+                unique_ids.append(ticket_id)
+
+        raise_errors = errors is None
+        if raise_errors:
+            errors = {}
+
+        results = imap(method, unique_ids, workers=workers, ordered=False)
+        try:
+            for done, (ticket_id, value, error) in enumerate(results, 1):
+                if error is not None:
+                    logger.warning(
+                        u'Could not fetch ticket {}: {}'.format(ticket_id, error)
+                    )
+                    errors[ticket_id] = error
+                if progress is not None:
+                    progress(done, len(unique_ids))
+                if error is None:
+                    yield ticket_id, value
+        finally:
+            results.close()
+
+        if raise_errors and errors:
+            raise BatchError(errors)
+
+    def _search_page(self, page, term=None, **kwargs):
+        """
+        Returns the tickets of one result page, or None past the last page.
+        """
+        try:
+            tickets = self.search(term=term, page=page, **kwargs)
+        except urllib2.HTTPError as e:
+            # Codebase answers with a 404 once there are no more results.
+            if e.code == 404:
+                return None
+            raise
+
+        if tickets is None:
+            raise ValueError(u'Page {} could not be decoded'.format(page))
+        return tickets or None
+
+    def _search_all_concurrent(self, term, concurrency, **kwargs):
+        first_page = self._search_page(1, term=term, **kwargs)
+        if first_page is None:
+            return []
+        # Copied, since responses can be shared with other callers (see
+        # `coalesce_requests` and `revalidation_cache`).
+        tickets = list(first_page)
+
+        # The number of pages is unknown, so keep `concurrency` pages in
+        # flight until one of them turns out to be past the last page.
+        state = {'done': False}
+
+        def next_pages():
+            page = 2
+            while not state['done']:
+                yield page
+                page += 1
+
+        def fetch(page):
+            return self._search_page(page, term=term, **kwargs)
+
+        errors = {}
+        results = imap(
+            fetch, next_pages(), workers=concurrency, max_pending=concurrency
+        )
+        try:
+            for page, page_tickets, error in results:
+                if error is not None:
+                    # Stop queueing pages, but let the ones in flight finish
+                    # so that every failure gets reported.
+                    state['done'] = True
+                    errors[page] = error
+                elif page_tickets is None:
+                    break
+                elif not errors:
+                    tickets.extend(page_tickets)
+        finally:
+            results.close()
+
+        if errors:
+            raise SearchError(term, tickets, errors)
+        return tickets
+
     def watchers(self, ticket_id):
         return self.get('/%s/tickets/%s/watchers' % (self.project, ticket_id))
 
+    def watchers_many(
+        self, ticket_ids, workers=DEFAULT_WORKERS, progress=None, errors=None
+    ):
+        """
+        Yields `(ticket_id, watchers)` for each ticket, see `notes_many`.
+        """
+        results = self._fetch_many(self.watchers, ticket_ids, workers, progress, errors)
+        try:
+            for result in results:
+                yield result
+        finally:
+            results.close()
+
     def project_groups(self):
         return self.get('/project_groups')
 
@@ -173,9 +805,90 @@ class CodeBaseAPI(Auth):
     def project_activity(self):
         return self.get('/%s/activity' % self.project)
 
+    def follow_activity(
+        self, project_only=False, since=None, min_interval=ACTIVITY_MIN_INTERVAL,
+        max_interval=ACTIVITY_MAX_INTERVAL, max_pages=5, sleep=time.sleep
+    ):
+        """
+        Polls the activity feed of the account, or of the project with
+        `project_only`, and yields each new event once, oldest first. Never
+        returns: break out of the loop to stop.
+
+        By default only the events which happen after the first poll are
+        yielded, otherwise the ones from `since` (a timestamp or UTC
+        datetime) on.
+
+        The feed is polled every `min_interval` seconds while it is busy,
+        and less and less often, up to every `max_interval` seconds, while
+        it is quiet. Polls are conditional requests, so an unchanged feed is
+        neither downloaded nor parsed again. When a whole page of events is
+        new, the following pages are fetched too, up to `max_pages`.
+        """
+        url = '/%s/activity' % self.project if project_only else '/activity'
+        revalidation_cache = self.revalidation_cache or RevalidationCache(
+            max_entries=max_pages
+        )
+        cursor = ActivityCursor(since)
+        # A revalidated page is the same object as before.
+        last_first_page = None
+        if since is None:
+            # Starts from the most recent event.
+            last_first_page = self._get_activity_page(url, 1, revalidation_cache)
+            for event in last_first_page or ():
+                cursor.advance(event)
+
+        interval = min_interval
+        while True:
+            sleep(interval)
+            events = []
+            try:
+                first_page = self._get_activity_page(url, 1, revalidation_cache)
+                if first_page is not last_first_page:
+                    events = self._get_new_activity(
+                        url, first_page, cursor, revalidation_cache, max_pages
+                    )
+                last_first_page = first_page
+            except urllib2.URLError as e:
+                logger.warning(u'Could not poll {}: {}'.format(url, e))
+
+            for event in events:
+                cursor.advance(event)
+                yield event
+
+            if events:
+                interval = min_interval
+            else:
+                interval = min(max_interval, interval * ACTIVITY_BACKOFF_FACTOR)
+
+    def _get_activity_page(self, url, page, revalidation_cache):
+        if page > 1:
+            url = '{}?page={}'.format(url, page)
+        return self._send_request(url, revalidation_cache=revalidation_cache)
+
+    def _get_new_activity(self, url, first_page, cursor, revalidation_cache, max_pages):
+        """
+        Returns the events of the feed after `cursor`, oldest first.
+        """
+        events = collections.OrderedDict()
+        page_events = first_page or []
+        for page in range(1, max_pages + 1):
+            if page > 1:
+                page_events = self._get_activity_page(url, page, revalidation_cache) or []
+            new_events = [event for event in page_events if cursor.is_new(event)]
+            for event in new_events:
+                events[event['event']['id']] = event
+            # The feed is sorted from the most recent event, so the pages
+            # after the first already seen event hold no new ones.
+            if not new_events or len(new_events) < len(page_events):
+                break
+        return sorted(events.values(), key=get_event_time)
+
+    @typed(User)
+    @cached('users')
     def users(self):
         return self.get('/users')
 
+    @cached('roles')
     def roles(self):
         return self.get('/roles')
 
@@ -194,6 +907,27 @@ class CodeBaseAPI(Auth):
             ctype=self.CTYPE_XML,
         )
 
+    def create_tickets(self, tickets, workers=DEFAULT_WORKERS):
+        """
+        Creates each ticket of the `tickets` iterable (see `create_ticket`),
+        `workers` at a time, and yields a `codebase.executor.Result(item,
+        value, error)` for each of them in input order.
+
+        Only a few tickets are taken from `tickets` ahead of the results, so
+        it can be a generator reading a large import. Failures are yielded
+        with their error rather than raised.
+        """
+        results = imap(self.create_ticket, tickets, workers=workers)
+        try:
+            for result in results:
+                if result.error is not None:
+                    logger.warning(
+                        u'Could not create ticket {!r}: {}'.format(result.item, result.error)
+                    )
+                yield result
+        finally:
+            results.close()
+
     def create_discussion(self, data):
         return self.post('/%s/discussions' % self.project, data)
 
@@ -203,9 +937,31 @@ class CodeBaseAPI(Auth):
     def createpost_in_discussion(self, discussion_permalink, data):
         return self.post('/%s/discussions/%s/posts' % (self.project, discussion_permalink), data)
 
+    @typed(Note)
     def notes(self, ticket_id):
         return self.get('/%s/tickets/%s/notes' % (self.project, ticket_id))
 
+    def notes_many(
+        self, ticket_ids, workers=DEFAULT_WORKERS, progress=None, errors=None
+    ):
+        """
+        Yields `(ticket_id, notes)` for each ticket as soon as its notes are
+        fetched, `workers` tickets at a time. Duplicate ids are fetched once.
+
+        `progress`, if given, is called with the number of tickets done so
+        far and the total after each ticket. The tickets which could not be
+        fetched are skipped: if `errors` is a dict, their ids are mapped to
+        their error in it, otherwise a `BatchError` is raised once all the
+        other tickets have been yielded.
+        """
+        results = self._fetch_many(self.notes, ticket_ids, workers, progress, errors)
+        try:
+            for result in results:
+                yield result
+        finally:
+            results.close()
+
+    @typed(Note)
     def note(self, ticket_id, note_id):
         return self.get('/%s/tickets/%s/notes/%s' % (self.project, ticket_id, note_id))
 
@@ -0,0 +1,324 @@
+"""
+A long-lived local worker for the command-line interface.
+
+The daemon reads the settings once and keeps one client per project, with
+their warm connection pool and response cache, and serves the CLI commands
+over a Unix socket, one JSON request and response per line:
+
+    {"project": "myproject", "command": "statuses", "args": [], "kwargs": {}}
+    {"result": [...]}  or  {"error": "..."}
+
+Start it in the foreground with `python -m codebase.daemon`, or let
+`codebase --daemon ...` start it in the background. It exits after
+`idle_timeout` seconds without requests, or on `python -m codebase.daemon
+--stop`. Restart it after changing the settings.
+"""
+import SocketServer
+import argparse
+import errno
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import types
+
+from codebase import logger
+from codebase.cache import ResponseCache
+from codebase.settings import Settings
+
+
+DEFAULT_SOCKET_PATH = '~/.codebase.sock'
+DEFAULT_IDLE_TIMEOUT = 3600
+
+# Seconds to wait for a daemon started in the background.
+START_TIMEOUT = 5
+
+# Seconds to wait for the result of a command.
+DEFAULT_CALL_TIMEOUT = 600
+
+# The commands yielding results forever, which cannot be sent back as one
+# response.
+UNBOUNDED_COMMANDS = frozenset(['follow_activity'])
+
+
+class DaemonError(Exception):
+    """
+    Raised when the daemon could not run a command.
+    """
+
+
+class DaemonUnavailable(DaemonError):
+    """
+    Raised when no daemon is listening on the socket.
+    """
+
+
+def get_socket_path(socket_path=None):
+    return os.path.expanduser(socket_path or DEFAULT_SOCKET_PATH)
+
+
+class RequestHandler(SocketServer.StreamRequestHandler):
+
+    def handle(self):
+        # A connection can send several requests.
+        for line in iter(self.rfile.readline, ''):
+            if not line.strip():
+                continue
+            response = self.server.handle_line(line)
+            self.wfile.write(json.dumps(response) + '\n')
+            self.wfile.flush()
+
+
+class DaemonServer(SocketServer.ThreadingMixIn, SocketServer.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(
+        self, socket_path=None, idle_timeout=DEFAULT_IDLE_TIMEOUT,
+        cache_file_path=None
+    ):
+        self.socket_path = get_socket_path(socket_path)
+        if os.path.exists(self.socket_path):
+            try:
+                _connect(self.socket_path, timeout=1).close()
+            except DaemonUnavailable:
+                # Left behind by a daemon which did not exit cleanly.
+                os.unlink(self.socket_path)
+            else:
+                raise DaemonError(
+                    u'A daemon is already listening on {}'.format(self.socket_path)
+                )
+
+        # Only the current user can connect, as the daemon holds their
+        # credentials.
+        umask = os.umask(0o077)
+        try:
+            SocketServer.UnixStreamServer.__init__(
+                self, self.socket_path, RequestHandler
+            )
+        finally:
+            os.umask(umask)
+
+        self.idle_timeout = idle_timeout
+        self.last_request_at = time.time()
+        self._clients = {}
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+
+        settings = Settings()
+        settings.import_settings()
+        self.username = settings.username
+        self.apikey = settings.apikey
+
+        self.cache = ResponseCache(file_path=cache_file_path)
+
+    def get_client(self, project):
+        with self._lock:
+            client = self._clients.get(project)
+            if client is None:
+                # Imported here so that the CLI doesn't import the client
+                # just to talk to the daemon.
+                from codebase.client import CodeBaseAPI
+
+                client = CodeBaseAPI(
+                    project=project,
+                    username=self.username,
+                    apikey=self.apikey,
+                    cache=self.cache,
+                )
+                self._clients[project] = client
+            return client
+
+    def handle_line(self, line):
+        self.last_request_at = time.time()
+        try:
+            request = json.loads(line)
+            if request.get('stop'):
+                self.stop()
+                return {'result': None}
+            return {'result': self.run(
+                request['project'],
+                request['command'],
+                request.get('args', []),
+                request.get('kwargs', {}),
+            )}
+        except Exception as e:
+            logger.exception(u'Could not handle the request {!r}'.format(line))
+            return {'error': u'{}: {}'.format(e.__class__.__name__, e)}
+
+    def run(self, project, command, args, kwargs):
+        if command.startswith('_'):
+            raise ValueError(u'Unknown command "{}"'.format(command))
+        if command in UNBOUNDED_COMMANDS:
+            raise ValueError(
+                u'"{}" never ends, run it without the daemon'.format(command)
+            )
+        client = self.get_client(project)
+        method = getattr(client, command, None)
+        if not callable(method):
+            raise ValueError(u'Unknown command "{}"'.format(command))
+
+        result = method(*args, **dict(
+            (str(name), value) for name, value in kwargs.iteritems()
+        ))
+        if isinstance(result, types.GeneratorType):
+            result = list(result)
+        return result
+
+    def serve(self):
+        """
+        Handles the requests until `stop` is called or the daemon has been
+        idle for `idle_timeout` seconds.
+        """
+        self.timeout = 1
+        try:
+            while not self._stopping.is_set():
+                self.handle_request()
+                if (
+                    self.idle_timeout is not None and
+                    time.time() - self.last_request_at > self.idle_timeout
+                ):
+                    logger.info(u'Stopping the idle daemon')
+                    break
+        finally:
+            self.close()
+
+    def stop(self):
+        self._stopping.set()
+
+    def close(self):
+        self.server_close()
+        try:
+            os.unlink(self.socket_path)
+        except OSError:
+            pass
+
+
+def _connect(socket_path, timeout):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(socket_path)
+    except socket.error as e:
+        sock.close()
+        if e.errno in (errno.ENOENT, errno.ECONNREFUSED):
+            raise DaemonUnavailable(socket_path)
+        raise
+    return sock
+
+
+def _send(socket_path, request, timeout=None):
+    sock = _connect(socket_path, timeout)
+    try:
+        sock.sendall(json.dumps(request) + '\n')
+        line = sock.makefile('rb').readline()
+    except socket.timeout:
+        raise DaemonError(u'No response from the daemon after {}s'.format(timeout))
+    finally:
+        sock.close()
+
+    if not line:
+        raise DaemonError(u'The daemon closed the connection')
+    response = json.loads(line)
+    if 'error' in response:
+        raise DaemonError(response['error'])
+    return response['result']
+
+
+def start(socket_path=None, idle_timeout=DEFAULT_IDLE_TIMEOUT, cache_file_path=None):
+    """
+    Starts a daemon in the background and waits until it accepts
+    connections.
+    """
+    socket_path = get_socket_path(socket_path)
+    command = [
+        sys.executable, '-m', 'codebase.daemon',
+        '--socket', socket_path,
+        '--idle-timeout', str(idle_timeout),
+    ]
+    if cache_file_path:
+        command += ['--cache-file', cache_file_path]
+
+    with open(os.devnull, 'r+') as devnull:
+        subprocess.Popen(
+            command,
+            stdin=devnull,
+            stdout=devnull,
+            stderr=devnull,
+            close_fds=True,
+            # Keeps the daemon running when the terminal is closed.
+            preexec_fn=os.setsid,
+        )
+
+    deadline = time.time() + START_TIMEOUT
+    while time.time() < deadline:
+        try:
+            _connect(socket_path, timeout=1).close()
+            return
+        except DaemonUnavailable:
+            time.sleep(0.05)
+    raise DaemonUnavailable(socket_path)
+
+
+def call(project, command, args=(), kwargs=None, socket_path=None,
+         timeout=DEFAULT_CALL_TIMEOUT, autostart=False, **start_kwargs):
+    """
+    Runs `command` (a `CodeBaseAPI` method) in the daemon and returns its
+    result, as decoded from JSON. Raises `DaemonUnavailable` if no daemon is
+    running and `autostart` is False, or `DaemonError` if the command
+    failed or did not return within `timeout` seconds.
+    """
+    socket_path = get_socket_path(socket_path)
+    request = {
+        'project': project,
+        'command': command,
+        'args': list(args),
+        'kwargs': kwargs or {},
+    }
+    try:
+        return _send(socket_path, request, timeout)
+    except DaemonUnavailable:
+        if not autostart:
+            raise
+    start(socket_path, **start_kwargs)
+    return _send(socket_path, request, timeout)
+
+
+def stop(socket_path=None):
+    """
+    Stops the daemon, if one is running.
+    """
+    try:
+        _send(get_socket_path(socket_path), {'stop': True}, timeout=5)
+    except DaemonUnavailable:
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Codebase CLI daemon')
+    parser.add_argument('--socket', default=DEFAULT_SOCKET_PATH)
+    parser.add_argument(
+        '--idle-timeout',
+        type=float,
+        default=DEFAULT_IDLE_TIMEOUT,
+        help='Seconds without requests before exiting',
+    )
+    parser.add_argument('--cache-file', help='Persist the response cache in this file')
+    parser.add_argument('--stop', action='store_true', help='Stop the running daemon')
+    args = parser.parse_args()
+
+    if args.stop:
+        stop(args.socket)
+        return
+
+    DaemonServer(
+        args.socket,
+        idle_timeout=args.idle_timeout,
+        cache_file_path=args.cache_file,
+    ).serve()
+
+
+if __name__ == '__main__':
+    main()
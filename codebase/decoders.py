@@ -0,0 +1,154 @@
+import Queue
+import importlib
+import json
+import threading
+
+import xmltodict
+
+from codebase import logger
+
+
+# The JSON modules tried in turn, fastest first. The standard library module
+# is the fallback.
+JSON_MODULES = ('ujson', 'simplejson')
+
+
+class Decoder(object):
+    """
+    Decodes response bodies, given either as a string or as a file-like
+    object (when the body is decompressed on the fly).
+
+    `loads` takes a string. The optional `load` takes a file-like object;
+    without it the body is read into a string first.
+    """
+
+    def __init__(self, name, loads, load=None):
+        self.name = name
+        self.loads = loads
+        self.load = load
+
+    def __repr__(self):
+        return '<Decoder {}>'.format(self.name)
+
+    def decode(self, content):
+        if hasattr(content, 'read'):
+            if self.load is not None:
+                return self.load(content)
+            content = content.read()
+        return self.loads(content)
+
+
+def find_json_decoder(module_names=JSON_MODULES):
+    """
+    Returns a `Decoder` for the first of `module_names` that is installed, or
+    for the standard `json` module.
+    """
+    for module_name in module_names:
+        try:
+            module = importlib.import_module(module_name)
+        except ImportError:
+            continue
+        logger.debug('Decoding JSON with {}'.format(module_name))
+        return Decoder(module_name, module.loads, getattr(module, 'load', None))
+
+    return Decoder('json', json.loads, json.load)
+
+
+class DecoderRegistry(object):
+    """
+    Maps content types ('json', 'xml', ...) to the `Decoder` used to parse
+    the responses of that type.
+    """
+
+    def __init__(self):
+        self._decoders = {}
+
+    def register(self, ctype, loads, load=None, name=None):
+        """
+        Registers a decoder for `ctype`, replacing the current one, e.g.
+
+            registry.register('json', ujson.loads)
+        """
+        if isinstance(loads, Decoder):
+            decoder = loads
+        else:
+            decoder = Decoder(name or getattr(loads, '__module__', ctype), loads, load)
+        self._decoders[ctype] = decoder
+
+    def get(self, ctype):
+        return self._decoders.get(ctype)
+
+    def decode(self, ctype, content):
+        decoder = self._decoders.get(ctype)
+        if decoder is None:
+            raise ValueError('No decoder registered for "{}"'.format(ctype))
+        return decoder.decode(content)
+
+
+def create_default_registry():
+    registry = DecoderRegistry()
+    registry.register('json', find_json_decoder())
+    registry.register('xml', Decoder('xmltodict', xmltodict.parse, xmltodict.parse))
+    return registry
+
+
+# Used by every client that is not given its own registry.
+default_registry = create_default_registry()
+
+
+def iter_xml_items(fp, item_depth=2, max_pending=64):
+    """
+    Parses the XML document read from `fp` incrementally and yields each
+    element found at `item_depth` as soon as it is complete, as
+    `{name: value}`. With the default depth, `<tickets><ticket>...</ticket>
+    <ticket>...</ticket></tickets>` yields `{'ticket': ...}` twice.
+
+    Only the elements not consumed yet (up to `max_pending`) are held in
+    memory, instead of the whole document. The parsing happens in a
+    background thread, which stops when the generator is closed.
+    """
+    items = Queue.Queue(maxsize=max_pending)
+    stopped = threading.Event()
+
+    def put(entry):
+        # Gives up once the consumer is gone, instead of blocking forever.
+        while not stopped.is_set():
+            try:
+                items.put(entry, timeout=0.1)
+                return True
+            except Queue.Full:
+                pass
+        return False
+
+    def item_callback(path, item):
+        return put(('item', {path[-1][0]: item}))
+
+    def parse():
+        try:
+            xmltodict.parse(fp, item_depth=item_depth, item_callback=item_callback)
+        except xmltodict.ParsingInterrupted:
+            return
+        except Exception as e:
+            put(('error', e))
+            return
+        put(('end', None))
+
+    thread = threading.Thread(target=parse, name='codebase-xml-parser')
+    thread.daemon = True
+    thread.start()
+
+    try:
+        while True:
+            try:
+                kind, value = items.get(timeout=1)
+            except Queue.Empty:
+                # Waiting without a timeout blocks signals (e.g.
+                # KeyboardInterrupt) on Python 2, so poll instead.
+                continue
+            if kind == 'end':
+                return
+            if kind == 'error':
+                raise value
+            yield value
+    finally:
+        stopped.set()
@@ -0,0 +1,216 @@
+import Queue
+import collections
+import threading
+
+
+DEFAULT_WORKERS = 8
+
+Result = collections.namedtuple('Result', ['item', 'value', 'error'])
+
+
+class Future(object):
+    """
+    The pending result of a call submitted to a `WorkerPool`.
+    """
+
+    def __init__(self):
+        self._done = threading.Event()
+        self._callbacks = []
+        self._lock = threading.Lock()
+        self._value = None
+        self._error = None
+
+    def done(self):
+        return self._done.is_set()
+
+    def result(self, timeout=None):
+        self._wait(timeout)
+        if self._error is not None:
+            raise self._error
+        return self._value
+
+    def exception(self, timeout=None):
+        self._wait(timeout)
+        return self._error
+
+    def add_done_callback(self, fn):
+        with self._lock:
+            if not self.done():
+                self._callbacks.append(fn)
+                return
+        fn(self)
+
+    def _wait(self, timeout):
+        if timeout is not None:
+            if not self._done.wait(timeout):
+                raise RuntimeError('Timed out waiting for the result')
+            return
+
+        # Waiting without a timeout blocks signals (e.g. KeyboardInterrupt)
+        # on Python 2, so poll instead.
+        while not self._done.wait(1):
+            pass
+
+    def _set(self, value=None, error=None):
+        with self._lock:
+            self._value = value
+            self._error = error
+            self._done.set()
+            callbacks, self._callbacks = self._callbacks, []
+
+        for fn in callbacks:
+            fn(self)
+
+
+class WorkerPool(object):
+    """
+    A fixed set of daemon threads running submitted calls.
+
+    `workers` is the maximum number of calls running at the same time, e.g.
+    the maximum number of concurrent requests made to the Codebase API.
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS):
+        self.workers = workers
+
+        self._tasks = Queue.Queue()
+        self._threads = []
+        for i in range(workers):
+            thread = threading.Thread(target=self._work)
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def _work(self):
+        while True:
+            task = self._tasks.get()
+            if task is None:
+                return
+
+            future, fn, args, kwargs = task
+            try:
+                value = fn(*args, **kwargs)
+            except Exception as e:
+                future._set(error=e)
+            else:
+                future._set(value=value)
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        self._tasks.put((future, fn, args, kwargs))
+        return future
+
+    def cancel_pending(self):
+        """
+        Drops the calls which have been submitted but did not start yet.
+        """
+        while True:
+            try:
+                self._tasks.get_nowait()
+            except Queue.Empty:
+                return
+
+    def shutdown(self, wait=True):
+        for thread in self._threads:
+            self._tasks.put(None)
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown(wait=exc_info[0] is None)
+
+
+def imap(func, iterable, workers=DEFAULT_WORKERS, ordered=True, max_pending=None):
+    """
+    Applies `func` to every item of `iterable` on `workers` threads.
+
+    Yields a `Result(item, value, error)` for each item, in input order if
+    `ordered` is set or as soon as each call completes otherwise. Errors are
+    returned rather than raised so that one failing item does not prevent
+    the others from being processed.
+
+    At most `max_pending` items (twice the number of workers by default) are
+    taken from `iterable` ahead of the consumer, so that arbitrarily long
+    iterables can be processed with bounded memory. Leaving the loop early
+    cancels the calls which did not start yet.
+    """
+    if max_pending is None:
+        max_pending = 2 * workers
+
+    items = iter(iterable)
+    pending = collections.deque()
+    completed = Queue.Queue()
+    exhausted = False
+
+    pool = WorkerPool(workers=min(workers, max_pending))
+    try:
+        while True:
+            while not exhausted and len(pending) < max_pending:
+                try:
+                    item = next(items)
+                except StopIteration:
+                    exhausted = True
+                    break
+
+                future = pool.submit(func, item)
+                future.item = item
+                if not ordered:
+                    future.add_done_callback(completed.put)
+                pending.append(future)
+
+            if not pending:
+                return
+
+            if ordered:
+                future = pending.popleft()
+            else:
+                future = completed.get()
+                pending.remove(future)
+
+            error = future.exception()
+            yield Result(future.item, future._value, error)
+    finally:
+        pool.cancel_pending()
+        pool.shutdown(wait=False)
+
+
+class SingleFlight(object):
+    """
+    Coalesces concurrent calls sharing the same key: while a call is in
+    progress, the callers making the same call wait for it and get its
+    result (or its error) instead of making their own.
+
+    The result is shared between the callers and must not be modified.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, func, *args, **kwargs):
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+
+        if not leader:
+            return future.result()
+
+        value = None
+        error = None
+        try:
+            value = func(*args, **kwargs)
+            return value
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            # Calls made from now on are not coalesced with this one anymore.
+            with self._lock:
+                del self._calls[key]
+            future._set(value, error)
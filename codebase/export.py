@@ -0,0 +1,263 @@
+import collections
+import csv
+import json
+import os
+import tempfile
+
+from codebase import logger
+from codebase.executor import DEFAULT_WORKERS, Result, imap
+
+
+# The columns of CSV exports when none are selected. NDJSON exports have all
+# the ticket fields by default.
+DEFAULT_CSV_COLUMNS = (
+    'ticket_id',
+    'summary',
+    'ticket_type',
+    'status',
+    'priority',
+    'category',
+    'milestone',
+    'assignee',
+    'reporter',
+    'created_at',
+    'updated_at',
+    'notes',
+)
+
+# The number of tickets written between two checkpoints.
+DEFAULT_CHECKPOINT_INTERVAL = 100
+
+
+class NdjsonWriter(object):
+    """
+    Writes each ticket as a JSON object on its own line.
+    """
+
+    def __init__(self, f, columns):
+        self.f = f
+
+    def write_header(self):
+        pass
+
+    def write(self, row):
+        self.f.write(json.dumps(row) + '\n')
+
+
+class CsvWriter(object):
+    """
+    Writes a header line, then one line per ticket. Nested objects such as
+    the status are written as their name, other objects and lists (e.g. the
+    notes) as JSON, and text in UTF-8.
+    """
+
+    def __init__(self, f, columns):
+        self.writer = csv.writer(f)
+        self.columns = columns
+
+    def write_header(self):
+        self.writer.writerow(self.columns)
+
+    def write(self, row):
+        self.writer.writerow([_get_csv_value(row.get(column)) for column in self.columns])
+
+
+def _get_csv_value(value):
+    if isinstance(value, dict) and 'name' in value:
+        value = value['name']
+    if value is None:
+        return ''
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    if isinstance(value, unicode):
+        return value.encode('utf-8')
+    return value
+
+
+WRITERS = {
+    'ndjson': NdjsonWriter,
+    'csv': CsvWriter,
+}
+
+
+class TicketExporter(object):
+    """
+    Exports the tickets matching `search_terms` (see `CodeBaseAPI.search`),
+    with their notes, to an NDJSON or CSV file:
+
+        exporter = TicketExporter(CodeBaseAPI(project='MyProject'), status='open')
+        exporter.export('tickets.ndjson')
+        exporter.export('tickets.csv', columns=['ticket_id', 'summary', 'notes'])
+
+    Tickets are written as their result page comes in, while the notes of
+    the next `workers` tickets are fetched concurrently. At most
+    `max_pending` tickets (twice `workers` by default) and the next result
+    page are fetched ahead of the file, so memory use doesn't grow with the
+    number of tickets.
+
+    The progress is saved in `<path>.checkpoint` every `checkpoint_interval`
+    tickets and when the export fails or is interrupted: exporting to the
+    same file again resumes from there. This assumes that the search results
+    have not moved between the two runs.
+
+    `api` must not be created with `typed=True`.
+    """
+
+    def __init__(
+        self, api, workers=DEFAULT_WORKERS, max_pending=None,
+        checkpoint_interval=DEFAULT_CHECKPOINT_INTERVAL, **search_terms
+    ):
+        if getattr(api, 'typed', False):
+            raise ValueError('TicketExporter needs a client returning dicts')
+
+        self.api = api
+        self.workers = workers
+        self.max_pending = max_pending
+        self.checkpoint_interval = checkpoint_interval
+        self.search_terms = search_terms
+
+    def export(self, path, format=None, columns=None):
+        """
+        Writes the tickets to `path` and returns their number.
+
+        `format` is 'ndjson' or 'csv', from the extension of `path` by
+        default. Only the `columns` ticket fields are written, and notes are
+        only fetched if 'notes' is one of them. By default NDJSON exports
+        have all the fields and the notes, and CSV exports have the
+        `DEFAULT_CSV_COLUMNS`.
+        """
+        if format is None:
+            format = os.path.splitext(path)[1].lstrip('.').lower()
+        if format not in WRITERS:
+            raise ValueError(u'Unknown export format "{}"'.format(format))
+        if columns is None and format == 'csv':
+            columns = DEFAULT_CSV_COLUMNS
+        columns = list(columns) if columns is not None else None
+
+        checkpoint_path = path + '.checkpoint'
+        options = {
+            'format': format,
+            'columns': columns,
+            'search_terms': self.search_terms,
+        }
+        state = self._load_checkpoint(checkpoint_path, path, options)
+        if state is None:
+            state = dict(options, page=1, index=0, count=0, offset=0)
+            f = open(path, 'wb')
+            writer = WRITERS[format](f, columns)
+            writer.write_header()
+        else:
+            logger.info(
+                u'Resuming the export to {} after {} tickets'.format(path, state['count'])
+            )
+            f = open(path, 'r+b')
+            f.truncate(state['offset'])
+            f.seek(state['offset'])
+            writer = WRITERS[format](f, columns)
+
+        with f:
+            results = self._iter_results(state['page'], state['index'], columns)
+            try:
+                for (page, index, ticket), notes, error in results:
+                    if error is not None:
+                        raise error
+                    writer.write(self._get_row(ticket, notes, columns))
+
+                    state['page'] = page
+                    state['index'] = index + 1
+                    state['count'] += 1
+                    if state['count'] % self.checkpoint_interval == 0:
+                        self._save_checkpoint(checkpoint_path, f, state)
+            except:
+                self._save_checkpoint(checkpoint_path, f, state)
+                raise
+            finally:
+                results.close()
+
+        if os.path.exists(checkpoint_path):
+            os.unlink(checkpoint_path)
+        return state['count']
+
+    def _iter_tickets(self, first_page, skip):
+        """
+        Yields `(page, index, ticket)` for each ticket from the `skip` index
+        of `first_page` on.
+        """
+        pages = self.api.iter_search_pages(first_page=first_page, **self.search_terms)
+        try:
+            for page, tickets in pages:
+                start = skip if page == first_page else 0
+                for index in xrange(start, len(tickets)):
+                    yield page, index, tickets[index]
+        finally:
+            pages.close()
+
+    def _iter_results(self, first_page, skip, columns):
+        """
+        Yields a `Result((page, index, ticket), notes, error)` for each
+        ticket, in order.
+        """
+        tickets = self._iter_tickets(first_page, skip)
+        if columns is not None and 'notes' not in columns:
+            return (Result(item, None, None) for item in tickets)
+
+        def fetch_notes(item):
+            page, index, ticket = item
+            return self.api.notes(ticket['ticket']['ticket_id'])
+
+        # Ordered, so that a checkpoint is always after a run of written
+        # tickets.
+        return imap(
+            fetch_notes,
+            tickets,
+            workers=self.workers,
+            max_pending=self.max_pending,
+        )
+
+    def _get_row(self, ticket, notes, columns):
+        fields = ticket['ticket']
+        row = collections.OrderedDict()
+        for column in columns if columns is not None else sorted(fields) + ['notes']:
+            if column == 'notes':
+                row['notes'] = [note['ticket_note'] for note in notes or ()]
+            else:
+                row[column] = fields.get(column)
+        return row
+
+    def _load_checkpoint(self, checkpoint_path, path, options):
+        """
+        Returns the state saved by an interrupted export to `path`, or None.
+        """
+        if not os.path.exists(checkpoint_path):
+            return None
+        if not os.path.exists(path):
+            logger.warning(
+                u'Ignoring {}, {} does not exist anymore'.format(checkpoint_path, path)
+            )
+            return None
+
+        with open(checkpoint_path) as f:
+            state = json.load(f)
+        if any(state.get(name) != value for name, value in options.iteritems()):
+            raise ValueError(
+                u'{} was saved by an export with other options, delete it to '
+                u'start over'.format(checkpoint_path)
+            )
+        return state
+
+    def _save_checkpoint(self, checkpoint_path, f, state):
+        f.flush()
+        os.fsync(f.fileno())
+        state['offset'] = f.tell()
+
+        # Renamed over the previous checkpoint, so that it is never left half
+        # written.
+        directory = os.path.dirname(os.path.abspath(checkpoint_path))
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as checkpoint:
+                json.dump(state, checkpoint)
+            os.rename(temp_path, checkpoint_path)
+        except Exception:
+            os.unlink(temp_path)
+            raise
@@ -0,0 +1,304 @@
+import bisect
+import collections
+
+from codebase.records import Record, parse_datetime
+
+
+# The fields which are objects in the responses are indexed by name.
+NAMED_FIELDS = ('status', 'priority', 'category', 'milestone')
+
+DEFAULT_HASH_FIELDS = (
+    'status',
+    'priority',
+    'category',
+    'milestone',
+    'milestone_id',
+    'assignee',
+    'reporter',
+    'ticket_type',
+)
+DEFAULT_SORTED_FIELDS = ('ticket_id', 'created_at', 'updated_at')
+
+RANGE_OPERATORS = ('gt', 'gte', 'lt', 'lte')
+
+# Greater than any ticket id.
+_MAX_ID = float('inf')
+
+
+def get_ticket_field(item, field):
+    """
+    Returns a field of a ticket, given as a `search` result or as a
+    `codebase.records.Ticket`. Statuses, priorities, categories and
+    milestones are returned by name and timestamps as datetimes.
+    """
+    if isinstance(item, Record):
+        return getattr(item, field)
+
+    value = item['ticket'].get(field)
+    if field in NAMED_FIELDS and isinstance(value, dict):
+        return value.get('name')
+    if field.endswith('_at') and isinstance(value, basestring):
+        return parse_datetime(value)
+    return value
+
+
+def _to_key(field, value):
+    if field.endswith('_at') and isinstance(value, basestring):
+        return parse_datetime(value)
+    return value
+
+
+class TicketIndex(object):
+    """
+    Indexes a set of tickets (`search` results or `codebase.records.Ticket`
+    records) for fast lookups, instead of scanning the whole list:
+
+        index = TicketIndex(codebase.search_all(status='open'))
+        index.find(status='New', assignee=['alice', 'bob'])
+        index.find(milestone='Sprint 12', updated_at__gte='2016-08-01T00:00:00Z',
+                   order_by='-updated_at', limit=10)
+
+    Each of `hash_fields` can be matched against a value or a list of
+    values, and each of `sorted_fields` against a range with the `__gt`,
+    `__gte`, `__lt` and `__lte` suffixes. The criteria are combined, starting
+    with the most selective one.
+
+    Tickets can be added or replaced at any time, e.g. as new result pages
+    arrive.
+    """
+
+    def __init__(
+        self, items=(), hash_fields=DEFAULT_HASH_FIELDS,
+        sorted_fields=DEFAULT_SORTED_FIELDS
+    ):
+        self.hash_fields = tuple(hash_fields)
+        self.sorted_fields = tuple(sorted_fields)
+
+        self._items = {}
+        # field -> value -> ticket ids.
+        self._hashes = dict(
+            (field, collections.defaultdict(set)) for field in self.hash_fields
+        )
+        # field -> sorted [(key, ticket id)], and ticket id -> key.
+        self._sorted = dict((field, []) for field in self.sorted_fields)
+        self._keys = dict((field, {}) for field in self.sorted_fields)
+
+        self.update(items)
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, ticket_id):
+        return ticket_id in self._items
+
+    def __iter__(self):
+        return iter(self._items.itervalues())
+
+    def get(self, ticket_id):
+        return self._items.get(ticket_id)
+
+    def update(self, items):
+        """
+        Adds the tickets, replacing the ones already indexed.
+        """
+        if self._items:
+            for item in items:
+                self.add(item)
+            return
+
+        # Builds the sorted indexes in one go rather than one insertion at a
+        # time.
+        for item in items:
+            ticket_id = get_ticket_field(item, 'ticket_id')
+            if ticket_id in self._items:
+                self._remove(ticket_id)
+            self._items[ticket_id] = item
+            self._add_to_hashes(ticket_id, item)
+            for field in self.sorted_fields:
+                self._keys[field][ticket_id] = get_ticket_field(item, field)
+
+        for field in self.sorted_fields:
+            self._sorted[field] = sorted(
+                (key, ticket_id)
+                for ticket_id, key in self._keys[field].iteritems()
+                if key is not None
+            )
+
+    def add(self, item):
+        ticket_id = get_ticket_field(item, 'ticket_id')
+        if ticket_id in self._items:
+            self._remove(ticket_id)
+
+        self._items[ticket_id] = item
+        self._add_to_hashes(ticket_id, item)
+        for field in self.sorted_fields:
+            key = get_ticket_field(item, field)
+            self._keys[field][ticket_id] = key
+            if key is not None:
+                bisect.insort(self._sorted[field], (key, ticket_id))
+
+    def remove(self, ticket_id):
+        if ticket_id not in self._items:
+            raise KeyError(ticket_id)
+        self._remove(ticket_id)
+
+    def _add_to_hashes(self, ticket_id, item):
+        for field in self.hash_fields:
+            self._hashes[field][get_ticket_field(item, field)].add(ticket_id)
+
+    def _remove(self, ticket_id):
+        item = self._items.pop(ticket_id)
+
+        for field in self.hash_fields:
+            value = get_ticket_field(item, field)
+            ticket_ids = self._hashes[field][value]
+            ticket_ids.discard(ticket_id)
+            if not ticket_ids:
+                del self._hashes[field][value]
+
+        for field in self.sorted_fields:
+            key = self._keys[field].pop(ticket_id)
+            if key is None:
+                continue
+            entries = self._sorted[field]
+            i = bisect.bisect_left(entries, (key, ticket_id))
+            if i < len(entries) and entries[i] == (key, ticket_id):
+                del entries[i]
+
+    def find(self, order_by=None, limit=None, **criteria):
+        """
+        Returns the tickets matching all the `criteria`, ordered by one of
+        the sorted fields if `order_by` is given ('-updated_at' for the most
+        recent first).
+        """
+        ticket_ids = self._find_ids(criteria)
+
+        if order_by is not None:
+            reverse = order_by.startswith('-')
+            field = order_by.lstrip('-')
+            if field not in self.sorted_fields:
+                raise ValueError(u'Cannot order by "{}"'.format(field))
+            keys = self._keys[field]
+            # Tickets without a value come last either way.
+            ticket_ids = list(ticket_ids)
+            missing = [
+                ticket_id for ticket_id in ticket_ids if keys[ticket_id] is None
+            ]
+            ticket_ids = sorted(
+                [ticket_id for ticket_id in ticket_ids if keys[ticket_id] is not None],
+                key=keys.__getitem__,
+                reverse=reverse,
+            ) + missing
+
+        if limit is not None:
+            ticket_ids = list(ticket_ids)[:limit]
+        return [self._items[ticket_id] for ticket_id in ticket_ids]
+
+    def count(self, **criteria):
+        return len(self._find_ids(criteria))
+
+    def values(self, field):
+        """
+        Returns the number of tickets for each value of a hash field.
+        """
+        if field not in self.hash_fields:
+            raise ValueError(u'"{}" is not indexed'.format(field))
+        return dict(
+            (value, len(ticket_ids))
+            for value, ticket_ids in self._hashes[field].iteritems()
+        )
+
+    def _find_ids(self, criteria):
+        """
+        Returns the ids of the matching tickets. The result may be one of the
+        index sets and must not be modified.
+        """
+        candidates = []
+        ranges = collections.defaultdict(dict)
+
+        for name, value in criteria.iteritems():
+            field, _, operator = name.partition('__')
+            if operator:
+                if operator not in RANGE_OPERATORS or field not in self.sorted_fields:
+                    raise ValueError(u'Unknown criterion "{}"'.format(name))
+                ranges[field][operator] = _to_key(field, value)
+            elif field in self.hash_fields:
+                candidates.append(self._get_hash_ids(field, value))
+            elif field in self.sorted_fields:
+                ranges[field]['gte'] = ranges[field]['lte'] = _to_key(field, value)
+            else:
+                raise ValueError(u'"{}" is not indexed'.format(field))
+
+        # A range wider than the smallest hash match is cheaper to check
+        # ticket by ticket than to turn into a set.
+        smallest = min(len(ticket_ids) for ticket_ids in candidates) if candidates else None
+        filters = []
+        for field, bounds in ranges.iteritems():
+            start, end = self._get_range_slice(field, bounds)
+            if smallest is not None and end - start > smallest:
+                filters.append((field, bounds))
+            else:
+                candidates.append(set(
+                    ticket_id for _, ticket_id in self._sorted[field][start:end]
+                ))
+
+        if not candidates:
+            return self._items.viewkeys()
+
+        # Intersecting from the smallest set keeps the work proportional to
+        # the most selective criterion.
+        candidates.sort(key=len)
+        ticket_ids = candidates[0]
+        if len(candidates) > 1:
+            ticket_ids = set(ticket_ids)
+            for other in candidates[1:]:
+                if not ticket_ids:
+                    break
+                ticket_ids.intersection_update(other)
+
+        for field, bounds in filters:
+            keys = self._keys[field]
+            ticket_ids = set(
+                ticket_id for ticket_id in ticket_ids
+                if _in_bounds(keys[ticket_id], bounds)
+            )
+        return ticket_ids
+
+    def _get_hash_ids(self, field, value):
+        values = self._hashes[field]
+        if isinstance(value, (list, tuple, set, frozenset)):
+            ticket_ids = set()
+            for single_value in value:
+                ticket_ids.update(values.get(single_value, ()))
+            return ticket_ids
+        return values.get(value, frozenset())
+
+    def _get_range_slice(self, field, bounds):
+        entries = self._sorted[field]
+        start = 0
+        end = len(entries)
+        # (key,) sorts before all the entries with that key, and
+        # (key, _MAX_ID) after all of them.
+        if 'gte' in bounds:
+            start = max(start, bisect.bisect_left(entries, (bounds['gte'],)))
+        if 'gt' in bounds:
+            start = max(start, bisect.bisect_right(entries, (bounds['gt'], _MAX_ID)))
+        if 'lte' in bounds:
+            end = min(end, bisect.bisect_right(entries, (bounds['lte'], _MAX_ID)))
+        if 'lt' in bounds:
+            end = min(end, bisect.bisect_left(entries, (bounds['lt'],)))
+        return start, max(start, end)
+
+
+def _in_bounds(key, bounds):
+    if key is None:
+        return False
+    if 'gte' in bounds and key < bounds['gte']:
+        return False
+    if 'gt' in bounds and key <= bounds['gt']:
+        return False
+    if 'lte' in bounds and key > bounds['lte']:
+        return False
+    if 'lt' in bounds and key >= bounds['lt']:
+        return False
+    return True
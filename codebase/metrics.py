@@ -0,0 +1,201 @@
+import bisect
+import collections
+import re
+import threading
+import urlparse
+
+
+# The events emitted by `Auth` for every request, in order. Listeners are
+# called with the event name and the `RequestInfo` of the request.
+REQUEST_STARTED = 'request_started'
+FIRST_BYTE = 'first_byte'
+BODY_READ = 'body_read'
+RESPONSE_PARSED = 'response_parsed'
+REQUEST_FINISHED = 'request_finished'
+
+_ID_RE = re.compile(r'/\d+(?=/|$)')
+
+
+def get_url_template(path, project=None):
+    """
+    Returns the path of a request with its variable parts replaced, e.g.
+    '/myproject/tickets/12/notes?page=2' -> '/{project}/tickets/{id}/notes',
+    so that requests to the same endpoint can be grouped together.
+    """
+    path = urlparse.urlsplit(path).path
+    if project and (path + '/').startswith('/{}/'.format(project)):
+        path = '/{project}' + path[len(project) + 1:]
+    return _ID_RE.sub('/{id}', path)
+
+
+class RequestInfo(object):
+    """
+    What is known about a request at each step of its lifecycle. The
+    timestamps are set as the corresponding events are emitted.
+    """
+
+    def __init__(self, method, url, url_template, ctype):
+        self.method = method
+        self.url = url
+        self.url_template = url_template
+        self.ctype = ctype
+        # Whether the request got the result of a concurrent identical one
+        # instead of being sent.
+        self.coalesced = False
+        # Whether the body was parsed as it was read (compressed or
+        # streamed), so that the parse time is not known on its own.
+        self.streamed = False
+
+        self.status = None
+        self.error = None
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+        self.started_at = None
+        self.first_byte_at = None
+        self.body_read_at = None
+        self.parsed_at = None
+        self.finished_at = None
+
+    @property
+    def endpoint(self):
+        return '{} {}'.format(self.method, self.url_template)
+
+    @property
+    def duration(self):
+        if self.started_at is None or self.finished_at is None:
+            return None
+        return self.finished_at - self.started_at
+
+    @property
+    def parse_time(self):
+        if self.streamed or self.parsed_at is None or self.body_read_at is None:
+            return None
+        return self.parsed_at - self.body_read_at
+
+
+class CountingReader(object):
+    """
+    Wraps a response to count the bytes read from it.
+    """
+
+    def __init__(self, response, request_info):
+        self._response = response
+        self._request_info = request_info
+
+    def __getattr__(self, name):
+        return getattr(self._response, name)
+
+    def read(self, *args):
+        content = self._response.read(*args)
+        self._request_info.bytes_received += len(content)
+        return content
+
+
+class Histogram(object):
+    """
+    A latency histogram with exponential buckets, from 1ms to about 2 min.
+    Percentiles are estimated from the upper bound of their bucket.
+    """
+    BOUNDS = [0.001 * 2 ** i for i in range(18)]
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, value):
+        self.counts[bisect.bisect_left(self.BOUNDS, value)] += 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def percentile(self, percent):
+        if not self.count:
+            return None
+
+        rank = percent / 100.0 * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                if i == len(self.BOUNDS):
+                    return self.max
+                return min(self.BOUNDS[i], self.max)
+        return self.max
+
+
+class MetricsCollector(object):
+    """
+    An in-memory request metrics collector, grouping requests by endpoint:
+
+        metrics = MetricsCollector()
+        codebase = CodeBaseAPI(project='MyProject', listeners=[metrics])
+        ...
+        pprint.pprint(metrics.summary())
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._latencies = collections.defaultdict(Histogram)
+            self._parse_times = collections.defaultdict(Histogram)
+            self._errors = collections.Counter()
+            self._bytes_received = collections.Counter()
+
+    def __call__(self, event, request_info):
+        if event != REQUEST_FINISHED:
+            return
+
+        endpoint = request_info.endpoint
+        with self._lock:
+            if request_info.duration is not None:
+                self._latencies[endpoint].add(request_info.duration)
+            if request_info.parse_time is not None:
+                self._parse_times[endpoint].add(request_info.parse_time)
+            if request_info.error is not None:
+                self._errors[endpoint] += 1
+            self._bytes_received[endpoint] += request_info.bytes_received
+
+    def summary(self):
+        """
+        Returns the metrics of every endpoint, slowest in total first.
+        """
+        with self._lock:
+            endpoints = sorted(
+                self._latencies,
+                key=lambda endpoint: self._latencies[endpoint].total,
+                reverse=True,
+            )
+            return collections.OrderedDict(
+                (endpoint, self._get_endpoint_summary(endpoint))
+                for endpoint in endpoints
+            )
+
+    def _get_endpoint_summary(self, endpoint):
+        latencies = self._latencies[endpoint]
+        parse_times = self._parse_times.get(endpoint)
+        return {
+            'count': latencies.count,
+            'errors': self._errors[endpoint],
+            'bytes_received': self._bytes_received[endpoint],
+            'total': latencies.total,
+            'mean': latencies.mean,
+            'min': latencies.min,
+            'max': latencies.max,
+            'p50': latencies.percentile(50),
+            'p90': latencies.percentile(90),
+            'p99': latencies.percentile(99),
+            # Only bodies read before being parsed are timed.
+            'parse_total': parse_times.total if parse_times else None,
+        }
@@ -0,0 +1,443 @@
+import json
+import sqlite3
+import threading
+
+from codebase import logger
+from codebase.executor import DEFAULT_WORKERS, imap
+from codebase.records import parse_datetime
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tickets (
+    ticket_id INTEGER PRIMARY KEY,
+    summary TEXT,
+    status TEXT,
+    priority TEXT,
+    category TEXT,
+    milestone_id INTEGER,
+    assignee TEXT,
+    reporter TEXT,
+    updated_at TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tickets_status ON tickets (status);
+CREATE INDEX IF NOT EXISTS tickets_assignee ON tickets (assignee);
+CREATE INDEX IF NOT EXISTS tickets_milestone_id ON tickets (milestone_id);
+CREATE INDEX IF NOT EXISTS tickets_updated_at ON tickets (updated_at);
+
+CREATE TABLE IF NOT EXISTS notes (
+    id INTEGER PRIMARY KEY,
+    ticket_id INTEGER NOT NULL,
+    created_at TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS notes_ticket_id ON notes (ticket_id);
+
+CREATE TABLE IF NOT EXISTS pending_notes (
+    ticket_id INTEGER PRIMARY KEY
+);
+
+CREATE TABLE IF NOT EXISTS statuses (
+    id INTEGER PRIMARY KEY,
+    name TEXT,
+    data TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS milestones (
+    id INTEGER PRIMARY KEY,
+    name TEXT,
+    data TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS sync_state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# The ticket columns which can be filtered and sorted on.
+TICKET_COLUMNS = (
+    'ticket_id',
+    'summary',
+    'status',
+    'priority',
+    'category',
+    'milestone_id',
+    'assignee',
+    'reporter',
+    'updated_at',
+)
+
+
+def _get_name(value):
+    if isinstance(value, dict):
+        return value.get('name')
+    return value
+
+
+def _normalise_timestamp(value):
+    """
+    Converts an API timestamp into a UTC one, which sorts chronologically.
+    """
+    if not value:
+        return None
+    return parse_datetime(value).isoformat()
+
+
+class TicketMirror(object):
+    """
+    Mirrors the tickets of a project, with their notes, and the project
+    statuses and milestones into a SQLite database, so that reports can be
+    run locally instead of searching the API every time.
+
+        mirror = TicketMirror(CodeBaseAPI(project='MyProject'), 'tickets.db')
+        mirror.sync()
+        open_bugs = mirror.tickets(status='New', assignee='alice')
+
+    The first `sync` loads every ticket matching `search_terms` (e.g.
+    `status='open'`, see `CodeBaseAPI.search`). The following ones only
+    fetch the tickets updated since the previous sync, newest first, and
+    stop as soon as they reach a ticket which was already up to date. With
+    `search_terms`, the tickets updated since then are also searched without
+    them, to drop the ones which no longer match. Deleted tickets are only
+    noticed by `full_sync`.
+
+    The notes which could not be fetched are fetched again by the next
+    sync.
+
+    `api` must not be created with `typed=True`.
+    """
+
+    def __init__(
+        self, api, path=':memory:', with_notes=True, workers=DEFAULT_WORKERS,
+        **search_terms
+    ):
+        if getattr(api, 'typed', False):
+            raise ValueError('TicketMirror needs a client returning dicts')
+
+        self.api = api
+        self.path = path
+        self.with_notes = with_notes
+        self.workers = workers
+        self.search_terms = search_terms
+
+        self._lock = threading.RLock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    # Sync.
+
+    @property
+    def last_updated_at(self):
+        """
+        The most recent ticket update mirrored, in UTC, or None before the
+        first sync.
+        """
+        return self._get_state('last_updated_at')
+
+    def sync(self):
+        """
+        Brings the mirror up to date and returns the ids of the tickets
+        which were added or updated.
+        """
+        if self.last_updated_at is None:
+            return self.full_sync()
+        return self.incremental_sync()
+
+    def full_sync(self):
+        """
+        Downloads every ticket again, dropping the ones which no longer
+        match. The mirror is left as it was if the search fails.
+        """
+        tickets = list(self.api.iter_search(**self.search_terms))
+        with self._lock, self.db:
+            self.db.execute('DELETE FROM tickets')
+            self.db.execute('DELETE FROM notes')
+            self.db.execute('DELETE FROM pending_notes')
+            self._store_tickets(tickets)
+        self._sync_metadata()
+        self._sync_notes()
+        return [item['ticket']['ticket_id'] for item in tickets]
+
+    def incremental_sync(self):
+        last_updated_at = self.last_updated_at
+        updated = self._get_updated(last_updated_at, self.search_terms)
+        removed = []
+        if self.search_terms:
+            # Searched after the matching tickets, so that a ticket updated
+            # in between is at worst dropped and mirrored again next time.
+            matching = set(item['ticket']['ticket_id'] for item in updated)
+            removed = [
+                item['ticket']['ticket_id']
+                for item in self._get_updated(last_updated_at, {})
+                if item['ticket']['ticket_id'] not in matching
+            ]
+
+        with self._lock, self.db:
+            self._remove_tickets(removed)
+            self._store_tickets(updated)
+        self._sync_metadata()
+        self._sync_notes()
+        return [item['ticket']['ticket_id'] for item in updated]
+
+    def _get_updated(self, last_updated_at, search_terms):
+        updated = []
+        results = self.api.iter_search(sort='updated', order='desc', **search_terms)
+        try:
+            for item in results:
+                updated_at = _normalise_timestamp(item['ticket'].get('updated_at'))
+                # Tickets updated in the same second as the last sync are
+                # fetched again, in case some of them were missed.
+                if updated_at is not None and updated_at < last_updated_at:
+                    break
+                updated.append(item)
+        finally:
+            results.close()
+        return updated
+
+    def _remove_tickets(self, ticket_ids):
+        params = [(ticket_id,) for ticket_id in ticket_ids]
+        for table in ('tickets', 'notes', 'pending_notes'):
+            self.db.executemany(
+                'DELETE FROM {} WHERE ticket_id = ?'.format(table), params
+            )
+
+    def _store_tickets(self, items):
+        rows = []
+        last_updated_at = self.last_updated_at
+        for item in items:
+            ticket = item['ticket']
+            updated_at = _normalise_timestamp(ticket.get('updated_at'))
+            if updated_at is not None and (
+                last_updated_at is None or updated_at > last_updated_at
+            ):
+                last_updated_at = updated_at
+            rows.append((
+                ticket['ticket_id'],
+                ticket.get('summary'),
+                _get_name(ticket.get('status')),
+                _get_name(ticket.get('priority')),
+                _get_name(ticket.get('category')),
+                ticket.get('milestone_id'),
+                ticket.get('assignee'),
+                ticket.get('reporter'),
+                updated_at,
+                json.dumps(item),
+            ))
+
+        self.db.executemany(
+            'INSERT OR REPLACE INTO tickets ({}, data) VALUES ({})'.format(
+                ', '.join(TICKET_COLUMNS),
+                ', '.join('?' * (len(TICKET_COLUMNS) + 1)),
+            ),
+            rows,
+        )
+        if self.with_notes:
+            # Committed with the tickets, so that their notes are fetched
+            # even if this sync does not get to it.
+            self.db.executemany(
+                'INSERT OR REPLACE INTO pending_notes (ticket_id) VALUES (?)',
+                [(row[0],) for row in rows],
+            )
+        if last_updated_at is not None:
+            self._set_state('last_updated_at', last_updated_at)
+
+    def _sync_metadata(self):
+        statuses = self.api.statuses() or []
+        milestones = self.api.milestones() or []
+        with self._lock, self.db:
+            self.db.execute('DELETE FROM statuses')
+            self.db.executemany(
+                'INSERT INTO statuses (id, name, data) VALUES (?, ?, ?)',
+                [
+                    (
+                        status['ticketing_status']['id'],
+                        status['ticketing_status'].get('name'),
+                        json.dumps(status),
+                    )
+                    for status in statuses
+                ],
+            )
+            self.db.execute('DELETE FROM milestones')
+            self.db.executemany(
+                'INSERT INTO milestones (id, name, data) VALUES (?, ?, ?)',
+                [
+                    (
+                        milestone['ticketing_milestone']['id'],
+                        milestone['ticketing_milestone'].get('name'),
+                        json.dumps(milestone),
+                    )
+                    for milestone in milestones
+                ],
+            )
+
+    def _sync_notes(self):
+        if not self.with_notes:
+            return
+
+        with self._lock:
+            ticket_ids = [
+                ticket_id for ticket_id, in
+                self.db.execute('SELECT ticket_id FROM pending_notes').fetchall()
+            ]
+        results = imap(
+            self.api.notes, ticket_ids, workers=self.workers, ordered=False
+        )
+        for ticket_id, notes, error in results:
+            if error is not None or notes is None:
+                logger.warning(
+                    u'Could not mirror the notes of ticket {}, will retry: {}'.format(
+                        ticket_id, error
+                    )
+                )
+                continue
+
+            with self._lock, self.db:
+                self.db.execute(
+                    'DELETE FROM notes WHERE ticket_id = ?', (ticket_id,)
+                )
+                self.db.executemany(
+                    'INSERT OR REPLACE INTO notes (id, ticket_id, created_at, data) '
+                    'VALUES (?, ?, ?, ?)',
+                    [
+                        (
+                            note['ticket_note']['id'],
+                            ticket_id,
+                            _normalise_timestamp(
+                                note['ticket_note'].get('created_at')
+                            ),
+                            json.dumps(note),
+                        )
+                        for note in notes
+                    ],
+                )
+                self.db.execute(
+                    'DELETE FROM pending_notes WHERE ticket_id = ?', (ticket_id,)
+                )
+
+    def _get_state(self, key):
+        with self._lock:
+            row = self.db.execute(
+                'SELECT value FROM sync_state WHERE key = ?', (key,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def _set_state(self, key, value):
+        self.db.execute(
+            'INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)',
+            (key, value),
+        )
+
+    # Queries.
+
+    def tickets(self, order_by='ticket_id', limit=None, updated_since=None, **filters):
+        """
+        Returns the mirrored tickets, shaped like the `search` results,
+        matching all the `filters` (see `TICKET_COLUMNS`), e.g.
+        `mirror.tickets(status='New', order_by='-updated_at', limit=10)`.
+
+        A filter value can be a list to match any of its values.
+        """
+        where, params = self._get_where_clause(filters)
+        if updated_since is not None:
+            where.append('updated_at >= ?')
+            params.append(_normalise_timestamp(updated_since))
+
+        query = 'SELECT data FROM tickets'
+        if where:
+            query += ' WHERE ' + ' AND '.join(where)
+        query += ' ORDER BY {}'.format(self._get_order_clause(order_by))
+        if limit is not None:
+            query += ' LIMIT ?'
+            params.append(limit)
+
+        with self._lock:
+            rows = self.db.execute(query, params).fetchall()
+        return [json.loads(data) for data, in rows]
+
+    def ticket(self, ticket_id):
+        with self._lock:
+            row = self.db.execute(
+                'SELECT data FROM tickets WHERE ticket_id = ?', (ticket_id,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def count(self, **filters):
+        where, params = self._get_where_clause(filters)
+        query = 'SELECT COUNT(*) FROM tickets'
+        if where:
+            query += ' WHERE ' + ' AND '.join(where)
+        with self._lock:
+            return self.db.execute(query, params).fetchone()[0]
+
+    def count_by(self, column, **filters):
+        """
+        Returns the number of tickets per value of `column`, e.g.
+        `mirror.count_by('status')`.
+        """
+        self._check_column(column)
+        where, params = self._get_where_clause(filters)
+        query = 'SELECT {0}, COUNT(*) FROM tickets'.format(column)
+        if where:
+            query += ' WHERE ' + ' AND '.join(where)
+        query += ' GROUP BY {}'.format(column)
+        with self._lock:
+            return dict(self.db.execute(query, params).fetchall())
+
+    def notes(self, ticket_id):
+        with self._lock:
+            rows = self.db.execute(
+                'SELECT data FROM notes WHERE ticket_id = ? ORDER BY created_at, id',
+                (ticket_id,),
+            ).fetchall()
+        return [json.loads(data) for data, in rows]
+
+    def statuses(self):
+        return self._get_all('statuses')
+
+    def milestones(self):
+        return self._get_all('milestones')
+
+    def _get_all(self, table):
+        with self._lock:
+            rows = self.db.execute(
+                'SELECT data FROM {} ORDER BY id'.format(table)
+            ).fetchall()
+        return [json.loads(data) for data, in rows]
+
+    def _check_column(self, column):
+        if column not in TICKET_COLUMNS:
+            raise ValueError(u'Unknown ticket column "{}"'.format(column))
+
+    def _get_where_clause(self, filters):
+        where = []
+        params = []
+        for column, value in sorted(filters.items()):
+            self._check_column(column)
+            if isinstance(value, (list, tuple, set)):
+                value = list(value)
+                where.append('{} IN ({})'.format(column, ', '.join('?' * len(value))))
+                params.extend(value)
+            elif value is None:
+                where.append('{} IS NULL'.format(column))
+            else:
+                where.append('{} = ?'.format(column))
+                params.append(value)
+        return where, params
+
+    def _get_order_clause(self, order_by):
+        direction = 'ASC'
+        if order_by.startswith('-'):
+            order_by = order_by[1:]
+            direction = 'DESC'
+        self._check_column(order_by)
+        return '{} {}'.format(order_by, direction)
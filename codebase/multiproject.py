@@ -0,0 +1,158 @@
+import collections
+import types
+
+from codebase import logger
+from codebase.client import CodeBaseAPI
+from codebase.executor import DEFAULT_WORKERS, imap
+from codebase.ratelimit import RateLimiter
+from codebase.settings import Settings
+from codebase.transport import ConnectionPool
+
+
+ProjectResult = collections.namedtuple('ProjectResult', ['project', 'value', 'error'])
+
+
+class MultiProjectError(Exception):
+    """
+    Raised at the end of `MultiProjectAPI.iter_items` when some of the
+    projects failed. `errors` maps their names to their error.
+    """
+
+    def __init__(self, errors):
+        super(MultiProjectError, self).__init__(
+            u'Failed for project(s) {}'.format(', '.join(sorted(errors)))
+        )
+        self.errors = errors
+
+
+def get_project_name(project):
+    """
+    Returns the name used in the URLs (the permalink) of a project, given as
+    an item of the `projects` response or as a name.
+    """
+    if isinstance(project, dict):
+        return project['project']['permalink']
+    return project
+
+
+class MultiProjectAPI(object):
+    """
+    Calls the same `CodeBaseAPI` method on several projects concurrently,
+    e.g. to report across all the projects of an account:
+
+        multi = MultiProjectAPI.for_all_projects(CodeBaseAPI())
+        for project, ticket in multi.iter_items('search_all', status='open'):
+            ...
+        for project, statuses, error in multi.map('statuses'):
+            ...
+
+    The clients of all the projects share one connection pool and one rate
+    limiter, so that `workers` concurrent requests stay within the API quota
+    however many projects there are. Other keyword arguments are passed to
+    each `CodeBaseAPI` (e.g. a shared `cache`).
+    """
+
+    def __init__(
+        self, projects, username=None, apikey=None, workers=DEFAULT_WORKERS,
+        rate_limiter=None, transport=None, **kwargs
+    ):
+        if not (username or apikey):
+            # Read once rather than by each client.
+            settings = Settings()
+            settings.import_settings()
+            username = settings.username
+            apikey = settings.apikey
+
+        self.workers = workers
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.transport = transport or ConnectionPool(pool_size=workers)
+
+        self.clients = collections.OrderedDict()
+        for project in projects:
+            name = get_project_name(project)
+            self.clients[name] = CodeBaseAPI(
+                project=name,
+                username=username,
+                apikey=apikey,
+                transport=self.transport,
+                rate_limiter=self.rate_limiter,
+                **kwargs
+            )
+
+    @classmethod
+    def for_all_projects(cls, api, **kwargs):
+        """
+        Returns a `MultiProjectAPI` for all the projects visible to the
+        credentials of `api`.
+        """
+        return cls(
+            api.projects() or [],
+            username=api.username,
+            apikey=api.apikey,
+            **kwargs
+        )
+
+    @property
+    def projects(self):
+        return self.clients.keys()
+
+    def _call(self, method, args, kwargs):
+        def call(project):
+            result = getattr(self.clients[project], method)(*args, **kwargs)
+            if isinstance(result, types.GeneratorType):
+                # Consumed by the worker, so that generator methods (e.g.
+                # `iter_search`) run concurrently too.
+                result = list(result)
+            return result
+        return call
+
+    def map(self, method, *args, **kwargs):
+        """
+        Calls `method` with the given arguments for every project and yields
+        a `ProjectResult(project, value, error)` for each project as soon as
+        its call completes. Errors are yielded rather than raised.
+        """
+        results = imap(
+            self._call(method, args, kwargs),
+            self.projects,
+            workers=self.workers,
+            ordered=False,
+        )
+        try:
+            for project, value, error in results:
+                if error is not None:
+                    logger.warning(
+                        u'{} failed for project {}: {}'.format(method, project, error)
+                    )
+                yield ProjectResult(project, value, error)
+        finally:
+            results.close()
+
+    def iter_items(self, method, *args, **kwargs):
+        """
+        Calls `method`, which must return a list (e.g. `search_all`,
+        `milestones`), for every project and yields `(project, item)` for
+        each item of the results, project by project as they complete.
+
+        The projects which failed are skipped: pass an `errors` dict to have
+        their names mapped to their error in it, otherwise a
+        `MultiProjectError` is raised once the other ones have been yielded.
+        """
+        errors = kwargs.pop('errors', None)
+        raise_errors = errors is None
+        if raise_errors:
+            errors = {}
+
+        results = self.map(method, *args, **kwargs)
+        try:
+            for project, value, error in results:
+                if error is not None:
+                    errors[project] = error
+                    continue
+                for item in value or ():
+                    yield project, item
+        finally:
+            results.close()
+
+        if raise_errors and errors:
+            raise MultiProjectError(errors)
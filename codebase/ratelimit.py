@@ -0,0 +1,80 @@
+import threading
+import time
+
+
+class RateLimiter(object):
+    """
+    A thread-safe token bucket spacing out requests made to the API.
+
+    Up to `rate` requests per second are let through, with bursts of up to
+    `burst` requests. The limiter adapts to the server throttling: each
+    throttled (429) response halves the current rate (down to `min_rate`)
+    and pauses every request for the `Retry-After` delay, while each
+    successful request raises the rate back towards `rate` a little. Sharing
+    one limiter between concurrent workers keeps them just under the API
+    quota.
+    """
+    DEFAULT_RATE = 10
+    DEFAULT_MIN_RATE = 0.5
+    DECREASE_FACTOR = 0.5
+    INCREASE_FACTOR = 0.05
+
+    def __init__(self, rate=DEFAULT_RATE, burst=None, min_rate=DEFAULT_MIN_RATE):
+        self.max_rate = float(rate)
+        self.min_rate = min(float(min_rate), self.max_rate)
+        self.rate = self.max_rate
+        self.burst = burst or max(1, int(rate))
+
+        self._lock = threading.Lock()
+        self._tokens = float(self.burst)
+        self._updated_at = time.time()
+        self._paused_until = 0
+
+    def _refill(self, now):
+        elapsed = max(now - self._updated_at, 0)
+        self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+        self._updated_at = now
+
+    def acquire(self):
+        """
+        Blocks until a request can be made.
+        """
+        with self._lock:
+            now = time.time()
+            self._refill(now)
+
+            # Takes the token straight away, even if it is only available in
+            # the future: concurrent callers then queue up behind each other
+            # instead of competing for the next token.
+            self._tokens -= 1
+            wait = max(-self._tokens / self.rate, self._paused_until - now, 0)
+
+        if wait:
+            time.sleep(wait)
+
+    def throttled(self, retry_after=None):
+        """
+        To be called when the server answered with a 429 status.
+        """
+        with self._lock:
+            self._refill(time.time())
+            self.rate = max(self.min_rate, self.rate * self.DECREASE_FACTOR)
+            # Drops the burst allowance so that the workers slow down now.
+            self._tokens = min(self._tokens, 0)
+            if retry_after:
+                self._paused_until = max(
+                    self._paused_until,
+                    time.time() + retry_after,
+                )
+
+    def succeeded(self):
+        """
+        To be called when a request went through.
+        """
+        with self._lock:
+            if self.rate < self.max_rate:
+                self._refill(time.time())
+                self.rate = min(
+                    self.max_rate,
+                    self.rate + self.max_rate * self.INCREASE_FACTOR,
+                )
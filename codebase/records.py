@@ -0,0 +1,271 @@
+import datetime
+import itertools
+import re
+
+
+_DATETIME_RE = re.compile(
+    r'^(\d{4})-(\d\d)-(\d\d)[T ](\d\d):(\d\d):(\d\d)(?:\.\d+)?'
+    r'(Z|([+-])(\d\d):?(\d\d))?$'
+)
+_DATE_RE = re.compile(r'^(\d{4})-(\d\d)-(\d\d)$')
+
+
+def parse_datetime(value):
+    """
+    Parses an API timestamp such as '2016-08-01T10:00:00+01:00' into a
+    naive UTC datetime.
+    """
+    match = _DATETIME_RE.match(value)
+    if match is None:
+        raise ValueError(u'Invalid timestamp "{}"'.format(value))
+
+    parsed = datetime.datetime(*[int(part) for part in match.groups()[:6]])
+    if match.group(8):
+        offset = datetime.timedelta(
+            hours=int(match.group(9)),
+            minutes=int(match.group(10)),
+        )
+        if match.group(8) == '+':
+            parsed -= offset
+        else:
+            parsed += offset
+    return parsed
+
+
+def parse_date(value):
+    match = _DATE_RE.match(value)
+    if match is None:
+        return parse_datetime(value).date()
+    return datetime.date(*[int(part) for part in match.groups()])
+
+
+_field_counter = itertools.count()
+
+
+class Field(object):
+    """
+    A record field, read from `path` (by default the field name) in the API
+    response. The optional `decode` function converts the raw value the
+    first time the field is accessed.
+
+    Only the fields to decode remain descriptors on the record class, the
+    other ones are plain slots.
+    """
+
+    def __init__(self, path=None, decode=None):
+        self.path = path
+        self.decode = decode
+        self.name = None
+        self.slot = None
+        self.mask = 0
+        # Keeps the fields in declaration order.
+        self._order = next(_field_counter)
+
+    def extract(self, data):
+        value = data
+        for key in self.path:
+            if not isinstance(value, dict):
+                return None
+            value = value.get(key)
+        return value
+
+    def __get__(self, record, owner):
+        if record is None:
+            return self
+
+        value = getattr(record, self.slot)
+        if record._decoded & self.mask:
+            return value
+
+        if value is not None:
+            value = self.decode(value)
+        setattr(record, self.slot, value)
+        record._decoded |= self.mask
+        return value
+
+    def __set__(self, record, value):
+        setattr(record, self.slot, value)
+        record._decoded |= self.mask
+
+
+class RecordMeta(type):
+    """
+    Gives each record class a slot per `Field`, so that records don't carry
+    a `__dict__`.
+    """
+
+    def __new__(mcs, name, bases, attrs):
+        own_fields = sorted(
+            [
+                (field_name, field)
+                for field_name, field in attrs.items()
+                if isinstance(field, Field)
+            ],
+            key=lambda item: item[1]._order,
+        )
+        for field_name, field in own_fields:
+            field.name = field_name
+            field.path = field.path or (field_name,)
+            if field.decode is None:
+                # Nothing to decode: the slot itself is the attribute, which
+                # is as fast to read as a dict item.
+                field.slot = field_name
+                del attrs[field_name]
+            else:
+                field.slot = '_' + field_name
+        attrs.setdefault('__slots__', tuple(field.slot for _, field in own_fields))
+
+        cls = super(RecordMeta, mcs).__new__(mcs, name, bases, attrs)
+
+        cls.fields = tuple(getattr(cls, 'fields', ())) + tuple(
+            field for _, field in own_fields
+        )
+        for i, field in enumerate(cls.fields):
+            field.mask = 1 << i
+        cls.field_names = frozenset(field.name for field in cls.fields)
+        return cls
+
+
+class Record(object):
+    """
+    A compact, read-only representation of an API object.
+
+    Only the fields declared on the class are kept, in slots, and their
+    values are decoded (e.g. timestamps into datetimes) on first access.
+    For compatibility with code written against the plain responses,
+    `record['ticket']['summary']` works as well as `record.summary`.
+    """
+    __metaclass__ = RecordMeta
+    __slots__ = ('_decoded',)
+
+    # The key wrapping each object in the API responses.
+    key = None
+
+    def __init__(self, **values):
+        self._decoded = 0
+        for field in self.fields:
+            setattr(self, field.slot, None)
+        for name, value in values.iteritems():
+            if name not in self.field_names:
+                raise TypeError(u'Unknown field "{}"'.format(name))
+            # Values given here are already decoded.
+            setattr(self, name, value)
+
+    @classmethod
+    def from_dict(cls, data):
+        if cls.key in data:
+            data = data[cls.key]
+
+        record = cls.__new__(cls)
+        record._decoded = 0
+        for field in cls.fields:
+            setattr(record, field.slot, field.extract(data))
+        return record
+
+    @classmethod
+    def from_response(cls, response):
+        """
+        Converts a response, either one object or a list of them.
+        """
+        if isinstance(response, list):
+            return [cls.from_dict(item) for item in response]
+        return cls.from_dict(response)
+
+    def to_dict(self):
+        return dict(
+            (field.name, getattr(self, field.name)) for field in self.fields
+        )
+
+    def __getitem__(self, key):
+        if key == self.key:
+            return self
+        if key in self.field_names:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.to_dict() == other.to_dict()
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        first_field = self.fields[0].name
+        return '<{} {}={!r}>'.format(
+            self.__class__.__name__,
+            first_field,
+            getattr(self, first_field),
+        )
+
+
+class Ticket(Record):
+    key = 'ticket'
+
+    ticket_id = Field()
+    summary = Field()
+    ticket_type = Field()
+    status_id = Field()
+    status = Field(('status', 'name'))
+    priority_id = Field()
+    priority = Field(('priority', 'name'))
+    category_id = Field()
+    category = Field(('category', 'name'))
+    milestone_id = Field()
+    milestone = Field(('milestone', 'name'))
+    reporter_id = Field()
+    reporter = Field()
+    assignee_id = Field()
+    assignee = Field()
+    tags = Field()
+    estimated_time = Field()
+    total_time_spent = Field()
+    created_at = Field(decode=parse_datetime)
+    updated_at = Field(decode=parse_datetime)
+
+
+class Note(Record):
+    key = 'ticket_note'
+
+    id = Field()
+    content = Field()
+    user_id = Field()
+    time_added = Field()
+    updates = Field()
+    created_at = Field(decode=parse_datetime)
+    updated_at = Field(decode=parse_datetime)
+
+
+class Status(Record):
+    key = 'ticketing_status'
+
+    id = Field()
+    name = Field()
+    colour = Field()
+    order = Field()
+    treat_as_closed = Field()
+
+
+class Milestone(Record):
+    key = 'ticketing_milestone'
+
+    id = Field()
+    identifier = Field()
+    name = Field()
+    description = Field()
+    status = Field()
+    parent_id = Field()
+    responsible_user_id = Field()
+    estimated_time = Field()
+    start_at = Field(decode=parse_date)
+    deadline = Field(decode=parse_date)
+
+
+class User(Record):
+    key = 'user'
+
+    id = Field()
+    username = Field()
+    first_name = Field()
+    last_name = Field()
+    email_address = Field()
+    company = Field()
@@ -0,0 +1,94 @@
+import email.utils
+import random
+import time
+import urllib2
+
+
+def get_retry_after(error):
+    """
+    Returns the number of seconds the server asked to wait for through the
+    `Retry-After` header of an `urllib2.HTTPError`, or None.
+    """
+    headers = getattr(error, 'hdrs', None)
+    if headers is None:
+        return None
+
+    value = headers.get('Retry-After')
+    if not value:
+        return None
+
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+
+    # The header can also be an HTTP date.
+    date = email.utils.parsedate_tz(value)
+    if date is None:
+        return None
+    return max(email.utils.mktime_tz(date) - time.time(), 0)
+
+
+class RetryPolicy(object):
+    """
+    Decides whether, and after how long, a failed request is retried.
+
+    Connection errors and 429/5xx responses are retried up to `max_retries`
+    times, with an exponential backoff (`backoff`, then twice as long, and
+    so on, up to `max_backoff` seconds) randomised with full jitter so that
+    concurrent workers don't retry in lockstep. A `Retry-After` header sent
+    by the server takes precedence over the backoff.
+
+    Requests other than GET are only retried when the server made it clear
+    that it did not process them (429 and 503), so that e.g. a note is never
+    posted twice.
+    """
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+    NOT_PROCESSED_STATUSES = (429, 503)
+
+    DEFAULT_MAX_RETRIES = 3
+    DEFAULT_BACKOFF = 0.5
+    DEFAULT_MAX_BACKOFF = 30
+    DEFAULT_MAX_RETRY_AFTER = 120
+
+    def __init__(
+        self, max_retries=DEFAULT_MAX_RETRIES, backoff=DEFAULT_BACKOFF,
+        max_backoff=DEFAULT_MAX_BACKOFF, max_retry_after=DEFAULT_MAX_RETRY_AFTER
+    ):
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_retry_after = max_retry_after
+
+    def get_delay(self, attempt, method, error):
+        """
+        Returns the number of seconds to wait before retrying a request which
+        failed with `error` after `attempt` retries, or None if it must not
+        be retried.
+        """
+        if attempt >= self.max_retries:
+            return None
+
+        if isinstance(error, urllib2.HTTPError):
+            if error.code not in self.RETRY_STATUSES:
+                return None
+            if method != 'GET' and error.code not in self.NOT_PROCESSED_STATUSES:
+                return None
+
+            retry_after = get_retry_after(error)
+            if retry_after is not None:
+                if retry_after > self.max_retry_after:
+                    return None
+                return retry_after
+        elif isinstance(error, urllib2.URLError):
+            # The request may have reached the server before the connection
+            # failed.
+            if method != 'GET':
+                return None
+        else:
+            return None
+
+        return random.uniform(
+            0,
+            min(self.max_backoff, self.backoff * 2 ** attempt),
+        )
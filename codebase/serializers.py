@@ -0,0 +1,81 @@
+from xml.sax.saxutils import escape
+
+import xmltodict
+
+
+XML_DECLARATION = u'<?xml version="1.0" encoding="utf-8"?>\n'
+
+DEFAULT_MAX_TEMPLATES = 128
+
+
+class XmlSerializer(object):
+    """
+    Serializes request bodies exactly like `xmltodict.unparse`, but faster
+    for flat objects such as `{'ticket': {'summary': ..., 'status-id': ...}}`,
+    which make up most requests: the markup around the values is built once
+    per set of fields and reused, and only the values are escaped.
+
+    Anything else (attributes, nested or repeated elements) is passed to
+    `xmltodict.unparse`.
+    """
+
+    def __init__(self, max_templates=DEFAULT_MAX_TEMPLATES):
+        self.max_templates = max_templates
+        # (root, field names) -> format string.
+        self._templates = {}
+
+    def serialize(self, data):
+        values = self._get_flat_values(data)
+        if values is None:
+            return xmltodict.unparse(data)
+
+        root, fields = data.items()[0]
+        names = tuple(fields.keys())
+        template = self._templates.get((root, names))
+        if template is None:
+            template = self._add_template(root, names)
+        return template % tuple(values)
+
+    def _get_flat_values(self, data):
+        """
+        Returns the text of each field of a flat object, or None if the
+        object needs the full serializer.
+        """
+        if not isinstance(data, dict) or len(data) != 1:
+            return None
+        root, fields = data.items()[0]
+        if not isinstance(fields, dict) or not _is_element_name(root):
+            return None
+
+        values = []
+        for name, value in fields.iteritems():
+            if not _is_element_name(name) or isinstance(value, (dict, list, tuple)):
+                return None
+            if value is None:
+                values.append(u'')
+            elif isinstance(value, bool):
+                values.append(u'true' if value else u'false')
+            else:
+                values.append(escape(unicode(value)))
+        return values
+
+    def _add_template(self, root, names):
+        if len(self._templates) >= self.max_templates:
+            self._templates.clear()
+
+        # The names are part of a %-format string.
+        root_tag = root.replace('%', '%%')
+        parts = [XML_DECLARATION, u'<{}>'.format(root_tag)]
+        for name in names:
+            parts.append(u'<{0}>%s</{0}>'.format(name.replace('%', '%%')))
+        parts.append(u'</{}>'.format(root_tag))
+        template = self._templates[(root, names)] = u''.join(parts)
+        return template
+
+
+def _is_element_name(name):
+    # Keys starting with '@' or '#' are attributes and text for xmltodict.
+    return isinstance(name, basestring) and name[:1] not in ('', '@', '#')
+
+
+default_xml_serializer = XmlSerializer()
@@ -0,0 +1,226 @@
+import collections
+import hashlib
+import json
+import os
+import tempfile
+
+from codebase.records import Record
+
+
+FORMAT_VERSION = 'codebase-snapshot 1'
+
+# In hexadecimal digits.
+TICKET_HASH_LENGTH = 16
+FIELD_HASH_LENGTH = 8
+
+# `added` and `removed` are lists of ticket ids, and `changed` maps the id of
+# each changed ticket to its changed fields and their new values (None for a
+# field which was removed).
+SnapshotDiff = collections.namedtuple('SnapshotDiff', ['added', 'removed', 'changed'])
+
+
+def get_ticket_fields(item):
+    """
+    Returns the fields of a ticket, given as a `search` result or as a
+    `codebase.records.Ticket`.
+    """
+    if isinstance(item, Record):
+        return item.to_dict()
+    return item['ticket']
+
+
+def get_ticket_id(fields):
+    """
+    Returns the id of a ticket, as an int if it is a number given as a
+    string (e.g. in XML results), so that it matches the ids read back from
+    a file.
+    """
+    return _normalise_ticket_id(fields['ticket_id'])
+
+
+def _normalise_ticket_id(ticket_id):
+    if isinstance(ticket_id, basestring) and ticket_id.isdigit():
+        return int(ticket_id)
+    return ticket_id
+
+
+def hash_fields(fields):
+    return dict(
+        (
+            name,
+            hashlib.md5(
+                json.dumps(value, sort_keys=True, default=unicode)
+            ).hexdigest()[:FIELD_HASH_LENGTH],
+        )
+        for name, value in fields.iteritems()
+    )
+
+
+def hash_ticket(field_hashes):
+    return hashlib.md5(''.join(
+        '{}={};'.format(name, field_hashes[name]) for name in sorted(field_hashes)
+    )).hexdigest()[:TICKET_HASH_LENGTH]
+
+
+class Snapshot(object):
+    """
+    The content hashes of a set of tickets: one for each ticket and one for
+    each of its fields, keyed by ticket id. Comparing a snapshot with later
+    `search_all` results tells which tickets were added, removed or changed,
+    and which of their fields changed, in linear time:
+
+        snapshot = Snapshot(codebase.search_all())
+        ...
+        diff = snapshot.diff(codebase.search_all())
+
+    Only the hashes are kept, so the changed fields come with their new
+    values only. See `SnapshotFile` to keep a snapshot between runs.
+    """
+
+    def __init__(self, items=()):
+        # ticket id -> (ticket hash, field name -> field hash).
+        self.entries = {}
+        for item in items:
+            self.add(item)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, ticket_id):
+        return _normalise_ticket_id(ticket_id) in self.entries
+
+    def add(self, item):
+        fields = get_ticket_fields(item)
+        field_hashes = hash_fields(fields)
+        self.entries[get_ticket_id(fields)] = (hash_ticket(field_hashes), field_hashes)
+
+    def diff(self, items):
+        """
+        Returns the `SnapshotDiff` from this snapshot to the `items` tickets.
+        """
+        return _diff(self.entries.iteritems(), items)[0]
+
+
+class SnapshotFile(object):
+    """
+    A `Snapshot` stored on disk, one line of short hashes per ticket, which
+    is read line by line when compared with new tickets rather than loaded
+    in memory:
+
+        snapshots = SnapshotFile('tickets.snapshot')
+        diff = snapshots.update(codebase.search_all())
+
+    A missing file is an empty snapshot.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def __iter__(self):
+        """
+        Yields `(ticket_id, (ticket_hash, field_hashes))` for each ticket.
+        """
+        try:
+            f = open(self.path)
+        except IOError:
+            return
+
+        with f:
+            version = f.readline().rstrip('\n')
+            if version != FORMAT_VERSION:
+                raise ValueError(
+                    u'{} is not a snapshot file (found "{}")'.format(self.path, version)
+                )
+            names = f.readline().rstrip('\n').split('\t')
+            for line in f:
+                values = line.rstrip('\n').split('\t')
+                yield _normalise_ticket_id(values[0]), (values[1], dict(
+                    (name, field_hash)
+                    for name, field_hash in zip(names, values[2:])
+                    if field_hash
+                ))
+
+    def diff(self, items):
+        """
+        Returns the `SnapshotDiff` from the stored snapshot to the `items`
+        tickets.
+        """
+        return _diff(iter(self), items)[0]
+
+    def write(self, items):
+        """
+        Replaces the stored snapshot with one of the `items` tickets (or a
+        `Snapshot`).
+        """
+        snapshot = items if isinstance(items, Snapshot) else Snapshot(items)
+        names = sorted(set(
+            name
+            for ticket_hash, field_hashes in snapshot.entries.itervalues()
+            for name in field_hashes
+        ))
+
+        # Written next to the previous snapshot and renamed over it, so that
+        # it is never left half written.
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(FORMAT_VERSION + '\n')
+                f.write('\t'.join(names) + '\n')
+                for ticket_id in sorted(snapshot.entries):
+                    ticket_hash, field_hashes = snapshot.entries[ticket_id]
+                    f.write('{}\t{}\t{}\n'.format(
+                        ticket_id,
+                        ticket_hash,
+                        '\t'.join(field_hashes.get(name, '') for name in names),
+                    ))
+            os.rename(temp_path, self.path)
+        except Exception:
+            os.unlink(temp_path)
+            raise
+
+    def update(self, items):
+        """
+        Stores a snapshot of the `items` tickets and returns the
+        `SnapshotDiff` from the previous one.
+        """
+        diff, snapshot = _diff(iter(self), items)
+        self.write(snapshot)
+        return diff
+
+
+def _diff(old_entries, items):
+    """
+    Returns the `SnapshotDiff` from the `(ticket_id, (ticket_hash,
+    field_hashes))` entries to the `items` tickets, and the `Snapshot` of
+    the tickets.
+    """
+    snapshot = Snapshot()
+    new_fields = {}
+    for item in items:
+        fields = get_ticket_fields(item)
+        new_fields[get_ticket_id(fields)] = fields
+        snapshot.add(item)
+
+    removed = []
+    changed = {}
+    matched = set()
+    for ticket_id, (ticket_hash, field_hashes) in old_entries:
+        entry = snapshot.entries.get(ticket_id)
+        if entry is None:
+            removed.append(ticket_id)
+            continue
+
+        matched.add(ticket_id)
+        new_ticket_hash, new_field_hashes = entry
+        if new_ticket_hash == ticket_hash:
+            continue
+        fields = new_fields[ticket_id]
+        changed[ticket_id] = dict(
+            (name, fields.get(name))
+            for name in set(field_hashes) | set(new_field_hashes)
+            if field_hashes.get(name) != new_field_hashes.get(name)
+        )
+
+    added = [ticket_id for ticket_id in snapshot.entries if ticket_id not in matched]
+    return SnapshotDiff(sorted(added), sorted(removed), changed), snapshot
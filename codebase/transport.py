@@ -0,0 +1,310 @@
+import Queue
+import httplib
+import socket
+import threading
+import urllib
+import urllib2
+import urlparse
+import zlib
+from StringIO import StringIO
+
+from codebase import logger
+
+
+class ConnectionPool(object):
+    """
+    A thread-safe pool of persistent (keep-alive) HTTP(S) connections.
+
+    Idle connections are kept per (scheme, host) so that consecutive requests
+    to the same host reuse the TCP/TLS session instead of opening a new one.
+    At most `pool_size` idle connections are kept for each host: extra
+    connections opened by concurrent requests are closed once released.
+
+    Like `urllib2.urlopen`, redirects of GET requests are followed. Requests
+    to be sent through a proxy (see `urllib.getproxies`) are made with
+    `urllib2.urlopen`, without keep-alive.
+    """
+    DEFAULT_POOL_SIZE = 10
+    DEFAULT_TIMEOUT = 60
+
+    REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+    # As many as `urllib2` follows.
+    MAX_REDIRECTS = 10
+
+    # The methods which are safe to send again when a reused connection
+    # fails after the request was sent.
+    IDEMPOTENT_METHODS = frozenset(['GET', 'HEAD', 'PUT', 'DELETE', 'OPTIONS'])
+
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT):
+        self.pool_size = pool_size
+        self.timeout = timeout
+
+        self._lock = threading.Lock()
+        self._pools = {}
+
+    def _get_pool(self, key):
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                # LIFO so that the most recently used (and most likely still
+                # alive) connection is picked first.
+                pool = self._pools[key] = Queue.LifoQueue(self.pool_size)
+            return pool
+
+    def _new_connection(self, key):
+        scheme, host = key
+        if scheme == 'https':
+            return httplib.HTTPSConnection(host, timeout=self.timeout)
+        if scheme == 'http':
+            return httplib.HTTPConnection(host, timeout=self.timeout)
+        raise urllib2.URLError('unknown url type: {}'.format(scheme))
+
+    def _get_connection(self, key):
+        try:
+            return self._get_pool(key).get_nowait(), True
+        except Queue.Empty:
+            return self._new_connection(key), False
+
+    def _release_connection(self, key, connection):
+        try:
+            self._get_pool(key).put_nowait(connection)
+        except Queue.Full:
+            connection.close()
+
+    def _send(self, connection, request):
+        headers = dict(request.header_items())
+        headers['Connection'] = 'keep-alive'
+        connection.request(
+            request.get_method(),
+            request.get_selector(),
+            request.get_data(),
+            headers,
+        )
+
+    def _request(self, connection, request):
+        self._send(connection, request)
+        return connection.getresponse()
+
+    def open(self, request):
+        """
+        Sends a `urllib2.Request` and returns a file-like response.
+
+        As with `urllib2.urlopen`, a `urllib2.HTTPError` is raised for error
+        status codes and a `urllib2.URLError` for connection failures.
+        """
+        if self._uses_proxy(request):
+            return urllib2.urlopen(request, timeout=self.timeout)
+
+        for i in range(self.MAX_REDIRECTS + 1):
+            response = self._open(request)
+            if response.code not in self.REDIRECT_STATUSES:
+                return response
+
+            location = response.headers.getheader('location')
+            content = response.read()
+            if not location or request.get_method() != 'GET':
+                # Resending a POST as a GET, as urllib2 does, would drop
+                # its body.
+                raise urllib2.HTTPError(
+                    response.url, response.code, response.msg,
+                    response.headers, StringIO(content),
+                )
+            request = urllib2.Request(
+                urlparse.urljoin(response.url, location),
+                headers=dict(request.header_items()),
+            )
+
+        raise urllib2.HTTPError(
+            response.url, response.code, 'Too many redirects',
+            response.headers, StringIO(content),
+        )
+
+    def _uses_proxy(self, request):
+        return (
+            request.get_type() in urllib.getproxies() and
+            not urllib.proxy_bypass(request.get_host())
+        )
+
+    def _open(self, request):
+        key = (request.get_type(), request.get_host())
+        connection, reused = self._get_connection(key)
+
+        sent = False
+        try:
+            self._send(connection, request)
+            sent = True
+            response = connection.getresponse()
+        except (httplib.HTTPException, socket.error) as e:
+            connection.close()
+            if not reused:
+                raise urllib2.URLError(e)
+            if sent and request.get_method() not in self.IDEMPOTENT_METHODS:
+                # The server may have processed the request before dropping
+                # the connection, e.g. posted a note: sending it again could
+                # do it twice.
+                raise urllib2.URLError(e)
+
+            # The server may have dropped an idle keep-alive connection, so
+            # try once more on a fresh one.
+            logger.debug('Stale connection to {}, reconnecting'.format(key[1]))
+            connection = self._new_connection(key)
+            try:
+                response = self._request(connection, request)
+            except (httplib.HTTPException, socket.error) as e:
+                connection.close()
+                raise urllib2.URLError(e)
+
+        pooled_response = PooledResponse(
+            self, key, connection, response, request.get_full_url()
+        )
+        if pooled_response.code >= 400:
+            content = pooled_response.read()
+            raise urllib2.HTTPError(
+                pooled_response.url,
+                pooled_response.code,
+                response.reason,
+                response.msg,
+                StringIO(content),
+            )
+        return pooled_response
+
+    def close(self):
+        with self._lock:
+            pools, self._pools = self._pools, {}
+
+        for pool in pools.values():
+            while True:
+                try:
+                    pool.get_nowait().close()
+                except Queue.Empty:
+                    break
+
+
+class PooledResponse(object):
+    """
+    Wraps an `httplib.HTTPResponse` with the `urllib2` response interface.
+
+    The underlying connection is handed back to the pool as soon as the body
+    has been read entirely, or closed if the response is discarded early.
+    """
+    # The statuses of the responses which never have a body.
+    EMPTY_STATUSES = (204, 304)
+
+    def __init__(self, pool, key, connection, response, url):
+        self._pool = pool
+        self._key = key
+        self._connection = connection
+        self._response = response
+
+        self.url = url
+        self.code = response.status
+        self.msg = response.reason
+        self.headers = response.msg
+
+    def getcode(self):
+        return self.code
+
+    def geturl(self):
+        return self.url
+
+    def info(self):
+        return self.headers
+
+    def read(self, amt=None):
+        if self._connection is None:
+            return ''
+
+        content = self._response.read(amt)
+        if amt is None or not content or self._response.isclosed():
+            self._release()
+        return content
+
+    def close(self):
+        if self._connection is not None and not self._response.isclosed():
+            if self.code in self.EMPTY_STATUSES or self._response.length == 0:
+                # There is no body (e.g. a 304 to a conditional request), but
+                # httplib only marks the response closed once it is read.
+                self._response.read()
+            else:
+                # The rest of the body is still on the wire, so the
+                # connection cannot be reused.
+                self._connection.close()
+                self._connection = None
+        self._release()
+
+    def _release(self):
+        connection, self._connection = self._connection, None
+        if connection is None:
+            return
+
+        if self._response.will_close:
+            connection.close()
+        else:
+            self._pool._release_connection(self._key, connection)
+
+
+class DecompressingReader(object):
+    """
+    A file-like object decompressing a gzip or deflate encoded response as
+    it is read.
+
+    Only reads of a given size, as made by the streaming XML parser
+    (`iter_xml`), decompress the body chunk by chunk without ever holding
+    it as a whole. A full `read()`, as made by `json.load`, returns the
+    whole decompressed body: the rest of the compressed body is read at
+    once and decompressed in a single call rather than chunk by chunk and
+    joined, but the decompressed body is still in memory.
+    """
+    CHUNK_SIZE = 16 * 1024
+    ENCODINGS = ('gzip', 'deflate')
+
+    def __init__(self, fp, encoding):
+        self._fp = fp
+        self._encoding = encoding
+        self._buffer = ''
+        self._eof = False
+        self._first_chunk = True
+
+        if encoding == 'gzip':
+            # 16 + MAX_WBITS expects a gzip header and trailer.
+            self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        else:
+            self._decompressor = zlib.decompressobj()
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            content = ''
+            if not self._eof:
+                self._eof = True
+                content = self._decompress(self._fp.read())
+                rest = self._decompressor.flush()
+                if rest:
+                    content += rest
+            if self._buffer:
+                content = self._buffer + content
+                self._buffer = ''
+            return content
+
+        while len(self._buffer) < size and not self._eof:
+            self._buffer += self._read_chunk()
+        content, self._buffer = self._buffer[:size], self._buffer[size:]
+        return content
+
+    def _read_chunk(self):
+        compressed = self._fp.read(self.CHUNK_SIZE)
+        if not compressed:
+            self._eof = True
+            return self._decompressor.flush()
+        return self._decompress(compressed)
+
+    def _decompress(self, compressed):
+        if self._first_chunk and self._encoding == 'deflate' and compressed:
+            self._first_chunk = False
+            try:
+                return self._decompressor.decompress(compressed)
+            except zlib.error:
+                # Some servers send raw deflate data, without the zlib
+                # header.
+                self._decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+
+        return self._decompressor.decompress(compressed)
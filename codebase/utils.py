@@ -2,6 +2,41 @@ import sys
 
 from codebase import logger
 from codebase.client import CodeBaseAPI
+from codebase.executor import DEFAULT_WORKERS, imap
+
+
+class BulkUpdateSummary(object):
+    """
+    The outcome of a bulk update.
+
+    `planned` lists the tickets to update (or, for a dry run, which would
+    have been updated), `succeeded` the ones updated successfully, `failed`
+    maps the ones which could not be updated to their error and `skipped`
+    lists the ones left alone because a previous run already updated them.
+    """
+
+    def __init__(self, dry_run=False):
+        self.dry_run = dry_run
+        self.planned = []
+        self.succeeded = []
+        self.failed = {}
+        self.skipped = []
+
+    @property
+    def ok(self):
+        return not self.failed
+
+    def __repr__(self):
+        return (
+            '<BulkUpdateSummary dry_run={} planned={} succeeded={} '
+            'failed={} skipped={}>'.format(
+                self.dry_run,
+                len(self.planned),
+                len(self.succeeded),
+                len(self.failed),
+                len(self.skipped),
+            )
+        )
 
 
 class CodeBaseAPIUtils(CodeBaseAPI):
@@ -22,23 +57,8 @@ class CodeBaseAPIUtils(CodeBaseAPI):
         codebase_utils.bulk_update_ticket_statuses(current_status_name, target_status_name)
         """
 
-        # get the status ids because Codebase search doesn't support searching on status id
-        new_status_id = None
-        statuses = self.statuses()
-
-        for status in statuses:
-            if status['ticketing_status']['name'] == target_status_name:
-                new_status_id = status['ticketing_status']['id']
-
-        # exit if the ticket status was not found
+        new_status_id = self._get_status_id(target_status_name)
         if new_status_id is None:
-            status_names = ', '.join([
-                status['ticketing_status']['name'] for status in statuses
-            ])
-            logger.info(
-                u'Status "{}" not found in project statuses. '
-                u'Options are: {}'.format(target_status_name, status_names)
-            )
             return
 
         # update the tickets
@@ -65,3 +85,96 @@ class CodeBaseAPIUtils(CodeBaseAPI):
             updated.append(ticket_id)
 
         return updated
+
+    def update_ticket_statuses(
+        self, current_status_name, target_status_name,
+        workers=DEFAULT_WORKERS, dry_run=False, resume=None
+    ):
+        """
+        Concurrent version of `bulk_update_ticket_statuses`, returning a
+        `BulkUpdateSummary` instead of printing the updated tickets.
+
+        Up to `workers` tickets are updated at the same time. With `dry_run`
+        nothing is posted, and the summary only lists the planned updates.
+        Pass the summary of a previous run as `resume` to retry its failures
+        without posting again the tickets it already updated.
+        """
+        new_status_id = self._get_status_id(target_status_name)
+        if new_status_id is None:
+            return
+
+        ticket_ids = [
+            item['ticket']['ticket_id']
+            for item in self.search_all(status=current_status_name)
+        ]
+        data = {
+            'ticket_note': {
+                u'changes': {
+                    u'status_id': unicode(new_status_id),
+                },
+            },
+        }
+        return self.bulk_add_notes(
+            ticket_ids,
+            data,
+            workers=workers,
+            dry_run=dry_run,
+            resume=resume,
+        )
+
+    def bulk_add_notes(
+        self, ticket_ids, data, workers=DEFAULT_WORKERS, dry_run=False,
+        resume=None
+    ):
+        """
+        Adds the same note to every ticket, `workers` tickets at a time, and
+        returns a `BulkUpdateSummary` (see `update_ticket_statuses`).
+        """
+        summary = BulkUpdateSummary(dry_run=dry_run)
+        already_updated = set(resume.succeeded if resume is not None else [])
+
+        for ticket_id in ticket_ids:
+            if ticket_id in already_updated:
+                summary.skipped.append(ticket_id)
+            else:
+                summary.planned.append(ticket_id)
+
+        if dry_run:
+            return summary
+
+        def add_note(ticket_id):
+            return self.add_note(ticket_id, data)
+
+        results = imap(add_note, summary.planned, workers=workers, ordered=False)
+        for ticket_id, response, error in results:
+            if error is not None:
+                logger.error(
+                    u'Could not update ticket {}: {}'.format(ticket_id, error)
+                )
+                summary.failed[ticket_id] = error
+            else:
+                logger.info(u'Updated ticket {}'.format(ticket_id))
+                summary.succeeded.append(ticket_id)
+
+        if resume is not None:
+            # Carries the previous successes over, so that the summary can be
+            # used to resume again.
+            summary.succeeded = resume.succeeded + summary.succeeded
+        return summary
+
+    def _get_status_id(self, status_name):
+        # get the status ids because Codebase search doesn't support searching on status id
+        statuses = self.statuses()
+
+        for status in statuses:
+            if status['ticketing_status']['name'] == status_name:
+                return status['ticketing_status']['id']
+
+        # the ticket status was not found
+        status_names = ', '.join([
+            status['ticketing_status']['name'] for status in statuses
+        ])
+        logger.info(
+            u'Status "{}" not found in project statuses. '
+            u'Options are: {}'.format(status_name, status_names)
+        )
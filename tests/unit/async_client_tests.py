@@ -0,0 +1,108 @@
+from unittest import TestCase
+import threading
+import time
+
+from mock import Mock, patch
+
+from codebase.async_client import AsyncCodeBaseAPI
+from codebase.executor import Future
+
+
+class AsyncCodeBaseAPITestCase(TestCase):
+
+    def setUp(self):
+        super(AsyncCodeBaseAPITestCase, self).setUp()
+
+        self.api_client = AsyncCodeBaseAPI(
+            project='project',
+            username='some/body',
+            apikey='bees',
+            concurrency=2,
+        )
+
+    def tearDown(self):
+        self.api_client.close()
+        super(AsyncCodeBaseAPITestCase, self).tearDown()
+
+    def test_init(self):
+        self.assertEqual(self.api_client.client.project, 'project')
+        self.assertEqual(self.api_client.client.username, 'some/body')
+        self.assertEqual(self.api_client.client.apikey, 'bees')
+        self.assertEqual(self.api_client.client.transport.pool_size, 2)
+
+    def test_close(self):
+        transport = self.api_client.client.transport
+        transport._release_connection(('https', 'api3.codebasehq.com'), Mock())
+
+        self.api_client.close()
+
+        # The idle connections of the pool it created are closed.
+        self.assertEqual(transport._pools, {})
+
+    def test_close_keeps_given_transport(self):
+        transport = Mock()
+        api_client = AsyncCodeBaseAPI(
+            project='project', username='some/body', apikey='bees', transport=transport
+        )
+
+        api_client.close()
+
+        transport.close.assert_not_called()
+
+    @patch('codebase.client.CodeBaseAPI.get')
+    def test_endpoint_returns_future(self, get_mock):
+        get_mock.return_value = [{'ticketing_status': {'id': 1}}]
+
+        future = self.api_client.statuses()
+
+        self.assertIsInstance(future, Future)
+        self.assertEqual(future.result(), get_mock.return_value)
+        get_mock.assert_called_once_with('/project/tickets/statuses')
+
+    @patch('codebase.client.CodeBaseAPI.post')
+    def test_endpoint_arguments(self, post_mock):
+        data = {'ticket_note': {'content': 'Hello'}}
+
+        self.api_client.add_note(12, data=data).result()
+
+        post_mock.assert_called_once_with('/project/tickets/12/notes', data)
+
+    @patch('codebase.client.CodeBaseAPI.get')
+    def test_endpoint_error(self, get_mock):
+        get_mock.side_effect = ValueError('boom')
+
+        future = self.api_client.notes(12)
+
+        self.assertRaises(ValueError, future.result)
+
+    @patch('codebase.client.CodeBaseAPI.get')
+    def test_concurrency(self, get_mock):
+        lock = threading.Lock()
+        running = {'current': 0, 'max': 0}
+
+        def get(url):
+            with lock:
+                running['current'] += 1
+                running['max'] = max(running['max'], running['current'])
+            time.sleep(0.01)
+            with lock:
+                running['current'] -= 1
+
+        get_mock.side_effect = get
+
+        futures = [self.api_client.notes(i) for i in range(10)]
+        for future in futures:
+            future.result()
+
+        self.assertEqual(running['max'], 2)
+
+    def test_generators_not_wrapped(self):
+        self.assertEqual(
+            self.api_client.iter_search.__name__,
+            'iter_search',
+        )
+        self.assertNotIsInstance(self.api_client.iter_search(), Future)
+
+    def test_unknown_attribute(self):
+        self.assertRaises(AttributeError, getattr, self.api_client, 'foo')
+        self.assertRaises(AttributeError, getattr, self.api_client, '_send_request')
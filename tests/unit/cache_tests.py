@@ -0,0 +1,171 @@
+from unittest import TestCase
+import json
+import os
+import shutil
+import tempfile
+
+from mock import patch
+
+from codebase.cache import ResponseCache, RevalidationCache
+
+
+class ResponseCacheTestCase(TestCase):
+
+    def setUp(self):
+        super(ResponseCacheTestCase, self).setUp()
+
+        self.cache = ResponseCache(ttls={'statuses': 10}, max_entries=3)
+        self.statuses = [{'ticketing_status': {'name': 'New', 'id': 1}}]
+
+    @patch('codebase.cache.time.time', return_value=1000)
+    def test_get_set(self, time_mock):
+        self.assertIsNone(self.cache.get('project', 'statuses'))
+
+        self.cache.set('project', 'statuses', self.statuses)
+
+        self.assertEqual(self.cache.get('project', 'statuses'), self.statuses)
+        self.assertIsNone(self.cache.get('other-project', 'statuses'))
+        self.assertIsNone(self.cache.get('project', 'milestones'))
+
+    @patch('codebase.cache.time.time', return_value=1000)
+    def test_ttl(self, time_mock):
+        self.cache.set('project', 'statuses', self.statuses)
+        self.cache.set('project', 'milestones', [])
+
+        time_mock.return_value = 1009
+        self.assertEqual(self.cache.get('project', 'statuses'), self.statuses)
+
+        # Statuses use the custom TTL, milestones the default one.
+        time_mock.return_value = 1010
+        self.assertIsNone(self.cache.get('project', 'statuses'))
+        self.assertEqual(self.cache.get('project', 'milestones'), [])
+        self.assertEqual(len(self.cache), 1)
+
+        time_mock.return_value = 1000 + ResponseCache.DEFAULT_TTLS['milestones']
+        self.assertIsNone(self.cache.get('project', 'milestones'))
+
+    def test_lru_eviction(self):
+        for project in ('a', 'b', 'c'):
+            self.cache.set(project, 'statuses', self.statuses)
+
+        # Using 'a' makes 'b' the least recently used entry.
+        self.cache.get('a', 'statuses')
+        self.cache.set('d', 'statuses', self.statuses)
+
+        self.assertEqual(len(self.cache), 3)
+        self.assertIsNone(self.cache.get('b', 'statuses'))
+        for project in ('a', 'c', 'd'):
+            self.assertIsNotNone(self.cache.get(project, 'statuses'))
+
+    def test_invalidate(self):
+        for project in ('a', 'b'):
+            for endpoint in ('statuses', 'milestones'):
+                self.cache.set(project, endpoint, [])
+
+        self.cache.invalidate(project='a', endpoint='statuses')
+        self.assertIsNone(self.cache.get('a', 'statuses'))
+        self.assertEqual(len(self.cache), 3)
+
+        self.cache.invalidate(endpoint='milestones')
+        self.assertEqual(len(self.cache), 1)
+        self.assertIsNotNone(self.cache.get('b', 'statuses'))
+
+        self.cache.clear()
+        self.assertEqual(len(self.cache), 0)
+
+
+class ResponseCacheFileTestCase(TestCase):
+
+    def setUp(self):
+        super(ResponseCacheFileTestCase, self).setUp()
+
+        self.tmp_dir = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.tmp_dir, 'cache')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+        super(ResponseCacheFileTestCase, self).tearDown()
+
+    def test_persistence(self):
+        cache = ResponseCache(file_path=self.file_path)
+        cache.set('project', 'statuses', [{'id': 1}])
+
+        other_cache = ResponseCache(file_path=self.file_path)
+
+        self.assertEqual(other_cache.get('project', 'statuses'), [{'id': 1}])
+
+    @patch('codebase.cache.time.time', return_value=1000)
+    def test_expired_entries_not_loaded(self, time_mock):
+        cache = ResponseCache(file_path=self.file_path)
+        cache.set('project', 'statuses', [{'id': 1}])
+
+        time_mock.return_value = 1000 + ResponseCache.DEFAULT_TTLS['statuses']
+        other_cache = ResponseCache(file_path=self.file_path)
+
+        self.assertEqual(len(other_cache), 0)
+
+    def test_missing_file(self):
+        cache = ResponseCache(file_path=self.file_path)
+        self.assertEqual(len(cache), 0)
+
+    @patch('codebase.cache.logger')
+    def test_invalid_file(self, logger_mock):
+        with open(self.file_path, 'w') as f:
+            f.write('not json')
+
+        cache = ResponseCache(file_path=self.file_path)
+
+        self.assertEqual(len(cache), 0)
+        logger_mock.warning.assert_called_once_with(
+            u'Ignoring invalid cache file "{}"'.format(self.file_path)
+        )
+
+    def test_file_content(self):
+        cache = ResponseCache(file_path=self.file_path)
+        cache.set('project', 'statuses', [{'id': 1}])
+
+        with open(self.file_path, 'r') as f:
+            entries = json.loads(f.read())
+
+        self.assertEqual(len(entries), 1)
+        self.assertEqual(entries[0][:2], ['project', 'statuses'])
+        self.assertEqual(entries[0][3], [{'id': 1}])
+
+
+class RevalidationCacheTestCase(TestCase):
+
+    def setUp(self):
+        super(RevalidationCacheTestCase, self).setUp()
+
+        self.cache = RevalidationCache(max_entries=2)
+
+    def test_get_set(self):
+        self.assertIsNone(self.cache.get('url'))
+
+        self.cache.set('url', '"abc"', 'Mon, 01 Aug 2016', [1])
+
+        validators = self.cache.get('url')
+        self.assertEqual(validators.etag, '"abc"')
+        self.assertEqual(validators.last_modified, 'Mon, 01 Aug 2016')
+        self.assertEqual(validators.value, [1])
+
+    def test_lru_eviction(self):
+        self.cache.set('a', '"a"', None, [])
+        self.cache.set('b', '"b"', None, [])
+        self.cache.get('a')
+        self.cache.set('c', '"c"', None, [])
+
+        self.assertIsNone(self.cache.get('b'))
+        self.assertIsNotNone(self.cache.get('a'))
+        self.assertIsNotNone(self.cache.get('c'))
+
+    def test_invalidate(self):
+        self.cache.set('a', '"a"', None, [])
+        self.cache.set('b', '"b"', None, [])
+
+        self.cache.invalidate('a')
+        self.assertIsNone(self.cache.get('a'))
+        self.assertEqual(len(self.cache), 1)
+
+        self.cache.clear()
+        self.assertEqual(len(self.cache), 0)
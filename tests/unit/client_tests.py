@@ -1,14 +1,45 @@
 from unittest import TestCase
 import base64
+import itertools
 import json
+import threading
+import time
 import urllib
 import urllib2
 import urlparse
+import zlib
+from StringIO import StringIO
 
-from mock import Mock, call, patch
+from mock import ANY, Mock, call, patch
 import xmltodict
 
-from codebase.client import Auth, CodeBaseAPI
+from codebase.cache import ResponseCache, RevalidationCache
+from codebase.client import (
+    Auth,
+    BatchError,
+    CodeBaseAPI,
+    SearchError,
+    default_transport,
+)
+from codebase.decoders import DecoderRegistry, default_registry
+from codebase.metrics import MetricsCollector
+from codebase.records import Status, Ticket
+from codebase.retry import RetryPolicy
+from codebase.transport import ConnectionPool
+
+
+def _create_fake_response(content='', code=200, headers=None):
+    """
+    Returns a fake transport response with the given body and headers.
+    """
+    headers = headers or {}
+    return Mock(
+        getcode=Mock(return_value=code),
+        read=Mock(side_effect=StringIO(content).read),
+        info=Mock(return_value=Mock(getheader=headers.get)),
+        url='http://theurl.com',
+    )
+
 
 
 class AuthInitTestCase(TestCase):
@@ -72,6 +103,24 @@ class AuthInitTestCase(TestCase):
         self.assertEqual(auth.username, 'foo')
         self.assertEqual(auth.apikey, 'bar')
 
+    def test_init_default_transport(self):
+        auth = Auth(project='project', username='some/body', apikey='bees')
+        other_auth = Auth(project='other', username='some/body', apikey='bees')
+
+        self.assertIs(auth.transport, default_transport)
+        self.assertIs(other_auth.transport, default_transport)
+
+    def test_init_custom_transport(self):
+        transport = ConnectionPool(pool_size=2)
+        auth = Auth(
+            project='project',
+            username='some/body',
+            apikey='bees',
+            transport=transport,
+        )
+
+        self.assertIs(auth.transport, transport)
+
 
 class AuthTestCase(TestCase):
 
@@ -85,21 +134,6 @@ class AuthTestCase(TestCase):
             apikey='bees',
         )
 
-    def _create_fake_response(self, data, ctype=None, code=200):
-        # Does not change the data if ctype is different than json or xml
-        # (useful if we want to throw an error).
-        content = data
-        if ctype == 'xml':
-            content = xmltodict.unparse(data)
-        elif ctype == 'json':
-            content = json.dumps(data)
-
-        return Mock(
-            getcode=Mock(return_value=code),
-            read=Mock(return_value=content),
-            url='http://theurl.com',
-        )
-
     def test_get_absolute_url(self):
         path = '/the/resource/'
         expected_url = urlparse.urljoin(self.base_api_url, path)
@@ -110,6 +144,7 @@ class AuthTestCase(TestCase):
             expected_headers = {
                 'Content-type': 'application/{}'.format(ctype),
                 'Accept': 'application/{}'.format(ctype),
+                'Accept-Encoding': 'gzip, deflate',
                 'Authorization': base64.b64encode('{}:{}'.format(
                     self.auth_client.username, self.auth_client.apikey
                 )),
@@ -137,10 +172,27 @@ class AuthTestCase(TestCase):
             xmltodict.unparse(data),
         )
 
+    def test_get_data_serialized(self):
+        data = '<ticket><summary>Already serialized</summary></ticket>'
+        self.assertEqual(self.auth_client.get_data(data, 'xml'), data)
+        self.assertEqual(self.auth_client.get_data(data, 'json'), data)
+
+    def test_get_data_encoded(self):
+        data = {'ticket': {'summary': u'Caf\xe9'}}
+
+        body = self.auth_client.get_data(data, 'xml')
+
+        self.assertIsInstance(body, str)
+        self.assertIn('<summary>Caf\xc3\xa9</summary>', body)
+        self.assertEqual(
+            self.auth_client.get_data(u'<summary>Caf\xe9</summary>', 'xml'),
+            '<summary>Caf\xc3\xa9</summary>',
+        )
+
     @patch('codebase.client.logger')
     def test_handle_response_json(self, logger_mock):
         data = {'something': 'to send', 'to': 'codebase'}
-        response = self._create_fake_response(data, ctype='json')
+        response = _create_fake_response(json.dumps(data))
 
         handled_response = self.auth_client._handle_response(response, 'json')
 
@@ -154,7 +206,7 @@ class AuthTestCase(TestCase):
     @patch('codebase.client.logger')
     def test_handle_response_xml(self, logger_mock):
         data = {'theroot': {'something': 'to send', 'to': 'codebase'}}
-        response = self._create_fake_response(data, ctype='xml')
+        response = _create_fake_response(xmltodict.unparse(data))
 
         handled_response = self.auth_client._handle_response(response, 'xml')
 
@@ -165,11 +217,54 @@ class AuthTestCase(TestCase):
             'http://theurl.com returned status code 200'
         )
 
+    def _create_compressed_response(self, content, encoding):
+        if encoding == 'gzip':
+            compressor = zlib.compressobj(9, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        else:
+            compressor = zlib.compressobj()
+        compressed = StringIO(compressor.compress(content) + compressor.flush())
+
+        return Mock(
+            getcode=Mock(return_value=200),
+            read=compressed.read,
+            info=Mock(return_value=Mock(
+                getheader={'Content-Encoding': encoding}.get
+            )),
+            url='http://theurl.com',
+        )
+
+    def test_handle_response_gzip_json(self):
+        data = {'something': 'to send', 'to': 'codebase'}
+        response = self._create_compressed_response(json.dumps(data), 'gzip')
+
+        handled_response = self.auth_client._handle_response(response, 'json')
+
+        self.assertEqual(handled_response, data)
+
+    def test_handle_response_gzip_xml(self):
+        data = {'theroot': {'something': 'to send', 'to': 'codebase'}}
+        response = self._create_compressed_response(
+            xmltodict.unparse(data),
+            'gzip',
+        )
+
+        handled_response = self.auth_client._handle_response(response, 'xml')
+
+        self.assertEqual(handled_response, data)
+
+    def test_handle_response_deflate(self):
+        data = {'something': 'to send', 'to': 'codebase'}
+        response = self._create_compressed_response(json.dumps(data), 'deflate')
+
+        handled_response = self.auth_client._handle_response(response, 'json')
+
+        self.assertEqual(handled_response, data)
+
     @patch('codebase.client.logging')
     @patch('codebase.client.logger')
     def test_handle_response_error(self, logger_mock, logging_mock):
         data = 'this is not a valid json'
-        response = self._create_fake_response(data)
+        response = _create_fake_response(data)
 
         handled_response = self.auth_client._handle_response(response, 'json')
 
@@ -183,87 +278,107 @@ class AuthTestCase(TestCase):
             '%s: %s', 'ValueError', 'No JSON object could be decoded'
         )
 
-    @patch('codebase.client.urllib2.urlopen')
+    def test_default_decoders(self):
+        self.assertIs(self.auth_client.decoders, default_registry)
+
+    def test_handle_response_custom_decoder(self):
+        decoders = DecoderRegistry()
+        decoders.register('json', Mock(return_value={'decoded': True}), name='fast')
+        auth_client = Auth(
+            project='some-project',
+            username='some/body',
+            apikey='bees',
+            decoders=decoders,
+        )
+        response = _create_fake_response('{}')
+
+        self.assertEqual(
+            auth_client._handle_response(response, 'json'),
+            {'decoded': True},
+        )
+        decoders.get('json').loads.assert_called_once_with('{}')
+
+    @patch('codebase.client.ConnectionPool.open')
     @patch('codebase.client.urllib2.Request')
-    def test_send_request_default(self, urllib_req_mock, urllib_urlopen_mock):
+    def test_send_request_default(self, urllib_req_mock, transport_open_mock):
         response_data = {'data': 1}
-        response_fake = self._create_fake_response(response_data, ctype='json')
-        urllib_urlopen_mock.return_value = response_fake
+        response_fake = _create_fake_response(json.dumps(response_data))
+        transport_open_mock.return_value = response_fake
         resource_path = 'the/url/to/the/resource'
 
         response = self.auth_client._send_request(resource_path)
 
         self.assertEqual(response, response_data)
-        urllib_urlopen_mock.assert_called_once_with(urllib_req_mock.return_value)
+        transport_open_mock.assert_called_once_with(urllib_req_mock.return_value)
         urllib_req_mock.assert_called_once_with(
             url=urlparse.urljoin(self.base_api_url, resource_path),
             headers=self.auth_client.get_headers('json'),
         )
 
-    @patch('codebase.client.urllib2.urlopen')
+    @patch('codebase.client.ConnectionPool.open')
     @patch('codebase.client.urllib2.Request')
-    def test_send_request_json(self, urllib_req_mock, urllib_urlopen_mock):
+    def test_send_request_json(self, urllib_req_mock, transport_open_mock):
         response_data = {'data': 1}
-        response_fake = self._create_fake_response(response_data, ctype='json')
-        urllib_urlopen_mock.return_value = response_fake
+        response_fake = _create_fake_response(json.dumps(response_data))
+        transport_open_mock.return_value = response_fake
         resource_path = 'the/url/to/the/resource'
 
         response = self.auth_client._send_request(resource_path, ctype='json')
 
         self.assertEqual(response, response_data)
-        urllib_urlopen_mock.assert_called_once_with(urllib_req_mock.return_value)
+        transport_open_mock.assert_called_once_with(urllib_req_mock.return_value)
         urllib_req_mock.assert_called_once_with(
             url=urlparse.urljoin(self.base_api_url, resource_path),
             headers=self.auth_client.get_headers('json'),
         )
 
-    @patch('codebase.client.urllib2.urlopen')
+    @patch('codebase.client.ConnectionPool.open')
     @patch('codebase.client.urllib2.Request')
-    def test_send_request_xml(self, urllib_req_mock, urllib_urlopen_mock):
+    def test_send_request_xml(self, urllib_req_mock, transport_open_mock):
         response_data = {'root': 'the value'}
-        response_fake = self._create_fake_response(response_data, ctype='xml')
-        urllib_urlopen_mock.return_value = response_fake
+        response_fake = _create_fake_response(xmltodict.unparse(response_data))
+        transport_open_mock.return_value = response_fake
         resource_path = 'the/url/to/the/resource'
 
         response = self.auth_client._send_request(resource_path, ctype='xml')
 
         self.assertEqual(dict(response), response_data)
-        urllib_urlopen_mock.assert_called_once_with(urllib_req_mock.return_value)
+        transport_open_mock.assert_called_once_with(urllib_req_mock.return_value)
         urllib_req_mock.assert_called_once_with(
             url=urlparse.urljoin(self.base_api_url, resource_path),
             headers=self.auth_client.get_headers('xml'),
         )
 
-    @patch('codebase.client.urllib2.urlopen')
+    @patch('codebase.client.ConnectionPool.open')
     @patch('codebase.client.urllib2.Request')
-    def test_send_request_error(self, urllib_req_mock, urllib_urlopen_mock):
+    def test_send_request_error(self, urllib_req_mock, transport_open_mock):
         response_data = 'invalid xml'
-        response_fake = self._create_fake_response(response_data)
-        urllib_urlopen_mock.return_value = response_fake
+        response_fake = _create_fake_response(response_data)
+        transport_open_mock.return_value = response_fake
         resource_path = 'the/url/to/the/resource'
 
         response = self.auth_client._send_request(resource_path, ctype='xml')
 
         self.assertIsNone(response)
-        urllib_urlopen_mock.assert_called_once_with(urllib_req_mock.return_value)
+        transport_open_mock.assert_called_once_with(urllib_req_mock.return_value)
         urllib_req_mock.assert_called_once_with(
             url=urlparse.urljoin(self.base_api_url, resource_path),
             headers=self.auth_client.get_headers('xml'),
         )
 
-    @patch('codebase.client.urllib2.urlopen')
+    @patch('codebase.client.ConnectionPool.open')
     @patch('codebase.client.urllib2.Request')
-    def test_send_request_data(self, urllib_req_mock, urllib_urlopen_mock):
+    def test_send_request_data(self, urllib_req_mock, transport_open_mock):
         response_data = {'response': 1}
         request_data = {'request': 2}
-        response_fake = self._create_fake_response(response_data, ctype='json')
-        urllib_urlopen_mock.return_value = response_fake
+        response_fake = _create_fake_response(json.dumps(response_data))
+        transport_open_mock.return_value = response_fake
         resource_path = 'the/url/to/the/resource'
 
         response = self.auth_client._send_request(resource_path, data=request_data)
 
         self.assertEqual(response, response_data)
-        urllib_urlopen_mock.assert_called_once_with(urllib_req_mock.return_value)
+        transport_open_mock.assert_called_once_with(urllib_req_mock.return_value)
         urllib_req_mock.assert_called_once_with(
             url=urlparse.urljoin(self.base_api_url, resource_path),
             headers=self.auth_client.get_headers('json'),
@@ -325,6 +440,513 @@ class AuthTestCase(TestCase):
         )
 
 
+@patch('codebase.client.ConnectionPool.open')
+class AuthRevalidationTestCase(TestCase):
+
+    def setUp(self):
+        super(AuthRevalidationTestCase, self).setUp()
+
+        self.revalidation_cache = RevalidationCache()
+        self.auth_client = Auth(
+            project='project',
+            username='some/body',
+            apikey='bees',
+            revalidation_cache=self.revalidation_cache,
+        )
+        self.absolute_url = 'https://api3.codebasehq.com/project/activity'
+
+    def _get_sent_headers(self, transport_open_mock):
+        request = transport_open_mock.call_args[0][0]
+        return dict(request.header_items())
+
+    def test_validators_stored(self, transport_open_mock):
+        transport_open_mock.return_value = _create_fake_response(
+            json.dumps([{'event': 1}]),
+            headers={'ETag': '"abc"', 'Last-Modified': 'Mon, 01 Aug 2016'},
+        )
+
+        response = self.auth_client.get('/project/activity')
+
+        self.assertEqual(response, [{'event': 1}])
+        self.assertEqual(
+            self.revalidation_cache.get(('some/body', self.absolute_url, 'json')),
+            ('"abc"', 'Mon, 01 Aug 2016', [{'event': 1}]),
+        )
+
+    def test_no_validators(self, transport_open_mock):
+        transport_open_mock.side_effect = [
+            _create_fake_response('[1]'),
+            _create_fake_response('[1]'),
+        ]
+
+        self.auth_client.get('/project/activity')
+        self.auth_client.get('/project/activity')
+
+        self.assertEqual(len(self.revalidation_cache), 0)
+        sent_headers = self._get_sent_headers(transport_open_mock)
+        self.assertNotIn('If-none-match', sent_headers)
+        self.assertNotIn('If-modified-since', sent_headers)
+
+    def test_not_modified(self, transport_open_mock):
+        transport_open_mock.return_value = _create_fake_response(
+            json.dumps([{'event': 1}]),
+            headers={'ETag': '"abc"', 'Last-Modified': 'Mon, 01 Aug 2016'},
+        )
+        not_modified_response = _create_fake_response(code=304)
+        json_loads_mock = Mock(side_effect=json.loads)
+        self.auth_client.decoders = DecoderRegistry()
+        self.auth_client.decoders.register('json', json_loads_mock, name='json')
+
+        first_response = self.auth_client.get('/project/activity')
+
+        transport_open_mock.return_value = not_modified_response
+        second_response = self.auth_client.get('/project/activity')
+
+        # The cached object is returned without parsing the response again.
+        self.assertIs(second_response, first_response)
+        self.assertEqual(json_loads_mock.call_count, 1)
+        not_modified_response.read.assert_not_called()
+        not_modified_response.close.assert_called_once_with()
+
+        sent_headers = self._get_sent_headers(transport_open_mock)
+        self.assertEqual(sent_headers['If-none-match'], '"abc"')
+        self.assertEqual(sent_headers['If-modified-since'], 'Mon, 01 Aug 2016')
+
+    def test_not_modified_http_error(self, transport_open_mock):
+        self.revalidation_cache.set(
+            ('some/body', self.absolute_url, 'json'),
+            '"abc"',
+            None,
+            [{'event': 1}],
+        )
+        transport_open_mock.side_effect = urllib2.HTTPError(
+            self.absolute_url, 304, 'Not Modified', None, None
+        )
+
+        response = self.auth_client.get('/project/activity')
+
+        self.assertEqual(response, [{'event': 1}])
+
+    def test_modified(self, transport_open_mock):
+        key = ('some/body', self.absolute_url, 'json')
+        self.revalidation_cache.set(key, '"abc"', None, [{'event': 1}])
+        transport_open_mock.return_value = _create_fake_response(
+            json.dumps([{'event': 2}]),
+            headers={'ETag': '"def"'},
+        )
+
+        response = self.auth_client.get('/project/activity')
+
+        self.assertEqual(response, [{'event': 2}])
+        self.assertEqual(
+            self.revalidation_cache.get(key),
+            ('"def"', None, [{'event': 2}]),
+        )
+
+    def test_post_not_conditional(self, transport_open_mock):
+        transport_open_mock.return_value = _create_fake_response(
+            json.dumps({'ticket_note': {}}),
+            headers={'ETag': '"abc"'},
+        )
+
+        self.auth_client.post('/project/tickets/1/notes', {'some': 'data'})
+
+        self.assertEqual(len(self.revalidation_cache), 0)
+
+
+@patch('codebase.client.time.sleep')
+@patch('codebase.client.ConnectionPool.open')
+class AuthRetryTestCase(TestCase):
+
+    def setUp(self):
+        super(AuthRetryTestCase, self).setUp()
+
+        self.rate_limiter = Mock()
+        self.auth_client = Auth(
+            project='project',
+            username='some/body',
+            apikey='bees',
+            retry_policy=RetryPolicy(max_retries=2, backoff=1),
+            rate_limiter=self.rate_limiter,
+        )
+        self.response = Mock(
+            getcode=Mock(return_value=200),
+            read=Mock(return_value='[1]'),
+            url='http://theurl.com',
+        )
+
+    def _create_http_error(self, code, headers=None):
+        return urllib2.HTTPError('http://theurl.com', code, 'Error', headers, None)
+
+    def test_default_policy(self, transport_open_mock, sleep_mock):
+        auth = Auth(project='project', username='some/body', apikey='bees')
+
+        self.assertIsInstance(auth.retry_policy, RetryPolicy)
+        self.assertIsNone(auth.rate_limiter)
+
+    @patch('codebase.retry.random.uniform', return_value=0.5)
+    def test_retried(self, uniform_mock, transport_open_mock, sleep_mock):
+        transport_open_mock.side_effect = [
+            self._create_http_error(502),
+            urllib2.URLError('connection reset'),
+            self.response,
+        ]
+
+        self.assertEqual(self.auth_client.get('/project/activity'), [1])
+
+        self.assertEqual(transport_open_mock.call_count, 3)
+        self.assertEqual(sleep_mock.call_args_list, [call(0.5), call(0.5)])
+        self.assertEqual(self.rate_limiter.acquire.call_count, 3)
+        self.rate_limiter.succeeded.assert_called_once_with()
+
+    def test_retries_exhausted(self, transport_open_mock, sleep_mock):
+        error = self._create_http_error(503)
+        transport_open_mock.side_effect = error
+
+        with self.assertRaises(urllib2.HTTPError) as ctx:
+            self.auth_client.get('/project/activity')
+
+        self.assertIs(ctx.exception, error)
+        self.assertEqual(transport_open_mock.call_count, 3)
+
+    def test_not_retried(self, transport_open_mock, sleep_mock):
+        transport_open_mock.side_effect = self._create_http_error(404)
+
+        self.assertRaises(
+            urllib2.HTTPError,
+            self.auth_client.get,
+            '/project/activity',
+        )
+        transport_open_mock.assert_called_once_with(ANY)
+        sleep_mock.assert_not_called()
+
+    def test_throttled(self, transport_open_mock, sleep_mock):
+        transport_open_mock.side_effect = [
+            self._create_http_error(429, {'Retry-After': '4'}),
+            self.response,
+        ]
+
+        self.assertEqual(self.auth_client.get('/project/activity'), [1])
+
+        self.rate_limiter.throttled.assert_called_once_with(4)
+        sleep_mock.assert_called_once_with(4)
+
+
+@patch('codebase.client.ConnectionPool.open')
+class AuthListenersTestCase(TestCase):
+
+    def setUp(self):
+        super(AuthListenersTestCase, self).setUp()
+
+        self.events = []
+        self.auth_client = Auth(
+            project='project',
+            username='some/body',
+            apikey='bees',
+            retry_policy=RetryPolicy(max_retries=0),
+            listeners=[self._listener],
+        )
+
+    def _listener(self, event, request_info):
+        self.events.append((event, request_info))
+
+    def test_events(self, transport_open_mock):
+        transport_open_mock.return_value = _create_fake_response('[1, 2]')
+
+        self.auth_client.get('/project/tickets/12/notes?page=2')
+
+        self.assertEqual(
+            [event for event, request_info in self.events],
+            [
+                'request_started',
+                'first_byte',
+                'body_read',
+                'response_parsed',
+                'request_finished',
+            ],
+        )
+        request_info = self.events[-1][1]
+        self.assertEqual(request_info.method, 'GET')
+        self.assertEqual(
+            request_info.url,
+            'https://api3.codebasehq.com/project/tickets/12/notes?page=2',
+        )
+        self.assertEqual(request_info.url_template, '/{project}/tickets/{id}/notes')
+        self.assertEqual(request_info.status, 200)
+        self.assertEqual(request_info.bytes_received, 6)
+        self.assertIsNone(request_info.error)
+        self.assertLessEqual(request_info.started_at, request_info.first_byte_at)
+        self.assertLessEqual(request_info.body_read_at, request_info.parsed_at)
+        self.assertLessEqual(request_info.parsed_at, request_info.finished_at)
+        self.assertFalse(request_info.streamed)
+        self.assertIsNotNone(request_info.parse_time)
+
+    def test_compressed_body(self, transport_open_mock):
+        compressor = zlib.compressobj(9, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        content = compressor.compress('[1, 2]') + compressor.flush()
+        transport_open_mock.return_value = _create_fake_response(
+            content,
+            headers={'Content-Encoding': 'gzip'},
+        )
+
+        self.assertEqual(self.auth_client.get('/project/activity'), [1, 2])
+
+        request_info = self.events[-1][1]
+        # Counts the bytes received, not the decompressed ones.
+        self.assertEqual(request_info.bytes_received, len(content))
+        self.assertIsNotNone(request_info.body_read_at)
+        # Decompressed while parsed, so the parse time is unknown rather
+        # than 0.
+        self.assertTrue(request_info.streamed)
+        self.assertIsNone(request_info.parse_time)
+
+        metrics = MetricsCollector()
+        for event, request_info in self.events:
+            metrics(event, request_info)
+        self.assertIsNone(metrics.summary()['GET /{project}/activity']['parse_total'])
+
+    def test_post(self, transport_open_mock):
+        transport_open_mock.return_value = _create_fake_response('{}')
+
+        self.auth_client.post('/project/tickets/3/notes', {'some': 'data'})
+
+        request_info = self.events[-1][1]
+        self.assertEqual(request_info.method, 'POST')
+        self.assertEqual(request_info.bytes_sent, len('some=data'))
+
+    def test_error(self, transport_open_mock):
+        error = urllib2.HTTPError('http://theurl.com', 404, 'Not Found', None, None)
+        transport_open_mock.side_effect = error
+
+        self.assertRaises(
+            urllib2.HTTPError,
+            self.auth_client.get,
+            '/project/tickets/12',
+        )
+
+        self.assertEqual(
+            [event for event, request_info in self.events],
+            ['request_started', 'request_finished'],
+        )
+        request_info = self.events[-1][1]
+        self.assertIs(request_info.error, error)
+        self.assertEqual(request_info.status, 404)
+        self.assertIsNotNone(request_info.duration)
+
+    @patch('codebase.client.logger')
+    def test_failing_listener(self, logger_mock, transport_open_mock):
+        transport_open_mock.return_value = _create_fake_response('[1]')
+        self.auth_client.subscribe(Mock(side_effect=ValueError))
+
+        self.assertEqual(self.auth_client.get('/project/activity'), [1])
+
+        self.assertEqual(logger_mock.exception.call_count, 5)
+        self.assertEqual(len(self.events), 5)
+
+    def test_unsubscribe(self, transport_open_mock):
+        transport_open_mock.return_value = _create_fake_response('[1]')
+        self.auth_client.unsubscribe(self._listener)
+
+        self.auth_client.get('/project/activity')
+
+        self.assertEqual(self.events, [])
+
+    @patch('codebase.client.logger')
+    def test_authorization_not_logged(self, logger_mock, transport_open_mock):
+        transport_open_mock.return_value = _create_fake_response('[1]')
+
+        self.auth_client.get('/project/activity')
+
+        message = logger_mock.info.call_args[0][0]
+        self.assertIn('<redacted>', message)
+        self.assertNotIn(self.auth_client.get_headers('json')['Authorization'], message)
+
+
+@patch('codebase.client.ConnectionPool.open')
+class AuthIterXmlTestCase(TestCase):
+
+    def setUp(self):
+        super(AuthIterXmlTestCase, self).setUp()
+
+        self.events = []
+        self.auth_client = Auth(
+            project='project',
+            username='some/body',
+            apikey='bees',
+            listeners=[lambda event, request_info: self.events.append(event)],
+        )
+        self.content = (
+            '<tickets type="array">'
+            '<ticket><ticket-id type="integer">1</ticket-id></ticket>'
+            '<ticket><ticket-id type="integer">2</ticket-id></ticket>'
+            '</tickets>'
+        )
+
+    def test_iter_xml(self, transport_open_mock):
+        response = _create_fake_response(self.content)
+        transport_open_mock.return_value = response
+
+        tickets = self.auth_client.iter_xml('/project/tickets?query=')
+
+        # Nothing is sent until the iteration starts.
+        transport_open_mock.assert_not_called()
+        self.assertEqual(
+            [ticket['ticket']['ticket-id']['#text'] for ticket in tickets],
+            ['1', '2'],
+        )
+        request = transport_open_mock.call_args[0][0]
+        self.assertEqual(request.get_header('Accept'), 'application/xml')
+        response.close.assert_called_once_with()
+        self.assertEqual(
+            self.events,
+            [
+                'request_started',
+                'first_byte',
+                'body_read',
+                'response_parsed',
+                'request_finished',
+            ],
+        )
+
+    def test_iter_xml_compressed(self, transport_open_mock):
+        compressor = zlib.compressobj(9, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        transport_open_mock.return_value = _create_fake_response(
+            compressor.compress(self.content) + compressor.flush(),
+            headers={'Content-Encoding': 'gzip'},
+        )
+
+        metrics = MetricsCollector()
+        self.auth_client.subscribe(metrics)
+
+        tickets = list(self.auth_client.iter_xml('/project/tickets?query='))
+
+        self.assertEqual(len(tickets), 2)
+        # Parsed as it was read, so the parse time is unknown rather than 0.
+        self.assertIsNone(metrics.summary()['GET /{project}/tickets']['parse_total'])
+
+    def test_iter_xml_closed_early(self, transport_open_mock):
+        response = _create_fake_response(self.content)
+        transport_open_mock.return_value = response
+
+        tickets = self.auth_client.iter_xml('/project/tickets?query=')
+        next(tickets)
+        tickets.close()
+
+        response.close.assert_called_once_with()
+        self.assertEqual(self.events[-1], 'request_finished')
+
+
+@patch('codebase.client.Auth._send_request')
+class AuthCoalescingTestCase(TestCase):
+
+    def setUp(self):
+        super(AuthCoalescingTestCase, self).setUp()
+
+        self.release = threading.Event()
+        self.started = threading.Event()
+
+    def _send_request(self, url, ctype=None):
+        self.started.set()
+        self.release.wait(5)
+        return {'url': url}
+
+    def _get_concurrently(self, clients, url):
+        results = []
+        threads = [
+            threading.Thread(target=lambda client=client: results.append(client.get(url)))
+            for client in clients
+        ]
+        for thread in threads:
+            thread.start()
+        self.started.wait(5)
+        time.sleep(0.1)
+        self.release.set()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def _create_client(self, **kwargs):
+        kwargs.setdefault('username', 'some/body')
+        kwargs.setdefault('apikey', 'bees')
+        return Auth(project='project', coalesce_requests=True, **kwargs)
+
+    def test_coalesced(self, send_request_mock):
+        send_request_mock.side_effect = self._send_request
+        clients = [self._create_client() for i in range(4)]
+
+        results = self._get_concurrently(clients, '/project/tickets/statuses')
+
+        send_request_mock.assert_called_once_with(
+            '/project/tickets/statuses', ctype='json'
+        )
+        self.assertEqual(results, [{'url': '/project/tickets/statuses'}] * 4)
+
+    def test_credentials_not_shared(self, send_request_mock):
+        send_request_mock.side_effect = self._send_request
+        clients = [
+            self._create_client(),
+            self._create_client(username='else/where', apikey='wasps'),
+        ]
+
+        self._get_concurrently(clients, '/project/tickets/statuses')
+
+        self.assertEqual(send_request_mock.call_count, 2)
+
+    def test_decoders_not_shared(self, send_request_mock):
+        send_request_mock.side_effect = self._send_request
+        clients = [
+            self._create_client(),
+            self._create_client(decoders=DecoderRegistry()),
+        ]
+
+        self._get_concurrently(clients, '/project/tickets/statuses')
+
+        self.assertEqual(send_request_mock.call_count, 2)
+
+    def test_revalidation_cache_not_shared(self, send_request_mock):
+        send_request_mock.side_effect = self._send_request
+        clients = [
+            self._create_client(),
+            self._create_client(revalidation_cache=RevalidationCache()),
+        ]
+
+        self._get_concurrently(clients, '/project/tickets/statuses')
+
+        self.assertEqual(send_request_mock.call_count, 2)
+
+    def test_listeners_notified(self, send_request_mock):
+        send_request_mock.side_effect = self._send_request
+        events = []
+        clients = [
+            self._create_client(
+                listeners=[lambda event, request_info: events.append(
+                    (event, request_info.coalesced, request_info.endpoint)
+                )]
+            )
+            for i in range(2)
+        ]
+
+        self._get_concurrently(clients, '/project/tickets/statuses')
+
+        # The request itself is mocked, so only the caller which waited for
+        # it emits events.
+        self.assertEqual(events, [
+            ('request_started', True, 'GET /{project}/tickets/statuses'),
+            ('request_finished', True, 'GET /{project}/tickets/statuses'),
+        ])
+
+    def test_disabled_by_default(self, send_request_mock):
+        send_request_mock.side_effect = self._send_request
+        clients = [
+            Auth(project='project', username='some/body', apikey='bees')
+            for i in range(2)
+        ]
+
+        self._get_concurrently(clients, '/project/tickets/statuses')
+
+        self.assertEqual(send_request_mock.call_count, 2)
+
+
 @patch('codebase.client.CodeBaseAPI.post')
 @patch('codebase.client.CodeBaseAPI.get')
 class CodeBaseAPITestCase(TestCase):
@@ -733,6 +1355,75 @@ class CodeBaseAPISearchTestCase(TestCase):
         post_mock.assert_not_called()
 
 
+@patch('codebase.client.CodeBaseAPI.get')
+class CodeBaseAPICacheTestCase(TestCase):
+
+    def setUp(self):
+        super(CodeBaseAPICacheTestCase, self).setUp()
+
+        self.cache = ResponseCache()
+        self.api_client = CodeBaseAPI(
+            project='project',
+            username='some/body',
+            apikey='bees',
+            cache=self.cache,
+        )
+
+    def test_no_cache(self, get_mock):
+        api_client = CodeBaseAPI(
+            project='project',
+            username='some/body',
+            apikey='bees',
+        )
+
+        api_client.statuses()
+        api_client.statuses()
+
+        self.assertEqual(get_mock.call_count, 2)
+
+    def test_cached_endpoints(self, get_mock):
+        endpoints = (
+            'statuses',
+            'priorities',
+            'categories',
+            'types',
+            'milestones',
+            'roles',
+            'users',
+        )
+        for endpoint in endpoints:
+            get_mock.reset_mock()
+            get_mock.return_value = [endpoint]
+
+            self.assertEqual(getattr(self.api_client, endpoint)(), [endpoint])
+            self.assertEqual(getattr(self.api_client, endpoint)(), [endpoint])
+
+            get_mock.assert_called_once_with(ANY)
+            self.assertEqual(self.cache.get('project', endpoint), [endpoint])
+
+    def test_uncached_endpoints(self, get_mock):
+        self.api_client.projects()
+        self.api_client.projects()
+
+        self.assertEqual(get_mock.call_count, 2)
+        self.assertEqual(len(self.cache), 0)
+
+    def test_failed_response_not_cached(self, get_mock):
+        get_mock.return_value = None
+
+        self.assertIsNone(self.api_client.statuses())
+        self.assertIsNone(self.api_client.statuses())
+
+        self.assertEqual(get_mock.call_count, 2)
+
+    def test_invalidate(self, get_mock):
+        self.api_client.statuses()
+        self.cache.invalidate(project='project', endpoint='statuses')
+        self.api_client.statuses()
+
+        self.assertEqual(get_mock.call_count, 2)
+
+
 @patch('codebase.client.CodeBaseAPI.post')
 @patch('codebase.client.CodeBaseAPI.search')
 class CodeBaseAPISearchAllTestCase(TestCase):
@@ -759,6 +1450,29 @@ class CodeBaseAPISearchAllTestCase(TestCase):
         search_mock.assert_called_once_with(term='title', page=1, status='New')
         post_mock.assert_not_called()
 
+    def test_search_all_server_error(self, search_mock, post_mock):
+        first_page_results = [Mock(pk=i) for i in range(3)]
+        error = urllib2.HTTPError(None, 503, 'Unavailable', None, None)
+        search_mock.side_effect = [first_page_results, error]
+
+        # The results would be incomplete.
+        with self.assertRaises(SearchError) as ctx:
+            self.api_client.search_all(term='title')
+
+        self.assertEqual(ctx.exception.tickets, first_page_results)
+        self.assertEqual(ctx.exception.errors, {2: error})
+
+    def test_search_all_connection_error(self, search_mock, post_mock):
+        first_page_results = [Mock(pk=i) for i in range(3)]
+        error = urllib2.URLError('timed out')
+        search_mock.side_effect = [first_page_results, error]
+
+        with self.assertRaises(SearchError) as ctx:
+            self.api_client.search_all(term='title')
+
+        self.assertEqual(ctx.exception.tickets, first_page_results)
+        self.assertEqual(ctx.exception.errors, {2: error})
+
     def test_search_all(self, search_mock, post_mock):
         search_mock.assert_not_called()
         post_mock.assert_not_called()
@@ -806,3 +1520,567 @@ class CodeBaseAPISearchAllTestCase(TestCase):
             call(term='title', page=2, status='New'),  # this will throw a ValueError
         ])
         post_mock.assert_not_called()
+
+    def _paginate(self, pages, errors=None):
+        errors = errors or {}
+
+        def search(term=None, page=None, **kwargs):
+            if page in errors:
+                raise errors[page]
+            if page > len(pages):
+                raise urllib2.HTTPError(None, 404, 'Not Found', None, None)
+            return list(pages[page - 1])
+
+        return search
+
+    def test_search_all_concurrent(self, search_mock, post_mock):
+        pages = [[Mock(pk=i + 3 * page) for i in range(3)] for page in range(5)]
+        search_mock.side_effect = self._paginate(pages)
+
+        res = self.api_client.search_all(
+            term='title',
+            concurrency=3,
+            status='New',
+        )
+
+        # The tickets are in page order.
+        self.assertEqual(res, [ticket for page in pages for ticket in page])
+        for page in range(1, 7):
+            search_mock.assert_any_call(term='title', page=page, status='New')
+        post_mock.assert_not_called()
+
+    def test_search_all_concurrent_no_res(self, search_mock, post_mock):
+        search_mock.side_effect = self._paginate([])
+
+        res = self.api_client.search_all(term='title', concurrency=3)
+
+        self.assertEqual(res, [])
+        search_mock.assert_called_once_with(term='title', page=1)
+
+    def test_search_all_concurrent_empty_page(self, search_mock, post_mock):
+        pages = [[Mock(pk=1)], []]
+        search_mock.side_effect = self._paginate(pages)
+
+        res = self.api_client.search_all(term='title', concurrency=2)
+
+        self.assertEqual(res, pages[0])
+
+    def test_search_all_concurrent_page_errors(self, search_mock, post_mock):
+        pages = [[Mock(pk=i + 3 * page) for i in range(3)] for page in range(5)]
+        error = urllib2.HTTPError(None, 503, 'Unavailable', None, None)
+        search_mock.side_effect = self._paginate(pages, errors={3: error})
+
+        with self.assertRaises(SearchError) as ctx:
+            self.api_client.search_all(term='title', concurrency=2)
+
+        self.assertEqual(ctx.exception.errors, {3: error})
+        # Only the tickets before the failing page are returned.
+        self.assertEqual(ctx.exception.tickets, pages[0] + pages[1])
+
+    def test_iter_search(self, search_mock, post_mock):
+        pages = [[Mock(pk=i + 3 * page) for i in range(3)] for page in range(3)]
+        search_mock.side_effect = self._paginate(pages)
+
+        res = self.api_client.iter_search(term='title', status='New')
+
+        # Nothing is fetched until the iteration starts.
+        search_mock.assert_not_called()
+        self.assertEqual(list(res), [ticket for page in pages for ticket in page])
+        search_mock.assert_has_calls([
+            call(term='title', page=page, status='New')
+            for page in range(1, 5)
+        ])
+
+    def test_iter_search_stop_early(self, search_mock, post_mock):
+        pages = [[Mock(pk=i + 3 * page) for i in range(3)] for page in range(10)]
+        search_mock.side_effect = self._paginate(pages)
+
+        res = self.api_client.iter_search(term='title')
+        first_tickets = [next(res) for i in range(4)]
+        res.close()
+
+        self.assertEqual(first_tickets, pages[0] + pages[1][:1])
+        # Only the pages needed so far and the prefetched ones were fetched.
+        self.assertLessEqual(search_mock.call_count, 4)
+
+    def test_iter_search_page_error(self, search_mock, post_mock):
+        pages = [[Mock(pk=i + 3 * page) for i in range(3)] for page in range(3)]
+        error = urllib2.HTTPError(None, 500, 'Server Error', None, None)
+        search_mock.side_effect = self._paginate(pages, errors={2: error})
+
+        res = self.api_client.iter_search(term='title')
+
+        self.assertEqual([next(res) for i in range(3)], pages[0])
+        self.assertRaises(urllib2.HTTPError, next, res)
+
+    def test_iter_search_pages(self, search_mock, post_mock):
+        pages = [[Mock(pk=i + 3 * page) for i in range(3)] for page in range(3)]
+        search_mock.side_effect = self._paginate(pages)
+
+        res = self.api_client.iter_search_pages(term='title', first_page=2)
+
+        self.assertEqual(list(res), [(2, pages[1]), (3, pages[2])])
+        search_mock.assert_any_call(term='title', page=2)
+
+
+@patch('codebase.client.ConnectionPool.open')
+class CodeBaseAPISearchAllSharedResponsesTestCase(TestCase):
+    """
+    Coalesced requests and revalidated responses hand the same objects to
+    several callers, which must not modify them.
+    """
+
+    pages = [
+        [{'ticket': {'ticket_id': 1}}, {'ticket': {'ticket_id': 2}}],
+        [{'ticket': {'ticket_id': 3}}],
+    ]
+
+    def setUp(self):
+        super(CodeBaseAPISearchAllSharedResponsesTestCase, self).setUp()
+        self.first_page_delay = 0
+
+    def _open(self, request):
+        url = request.get_full_url()
+        page = int(urlparse.parse_qs(urlparse.urlparse(url).query).get('page', [1])[0])
+        if page > len(self.pages):
+            raise urllib2.HTTPError(url, 404, 'Not Found', None, None)
+        if request.get_header('If-none-match'):
+            return _create_fake_response(code=304)
+        if page == 1:
+            time.sleep(self.first_page_delay)
+        return _create_fake_response(
+            json.dumps(self.pages[page - 1]),
+            headers={'ETag': '"page{}"'.format(page)},
+        )
+
+    def _create_client(self, **kwargs):
+        return CodeBaseAPI(project='project', username='some/body', apikey='bees', **kwargs)
+
+    def test_revalidated(self, transport_open_mock):
+        transport_open_mock.side_effect = self._open
+        client = self._create_client(revalidation_cache=RevalidationCache())
+
+        results = [client.search_all(concurrency=2) for i in range(3)]
+
+        self.assertEqual([len(tickets) for tickets in results], [3, 3, 3])
+
+    def test_coalesced(self, transport_open_mock):
+        transport_open_mock.side_effect = self._open
+        # Long enough for both searches to wait for the same first page.
+        self.first_page_delay = 0.2
+        clients = [self._create_client(coalesce_requests=True) for i in range(2)]
+        results = []
+
+        threads = [
+            threading.Thread(
+                target=lambda client=client: results.append(client.search_all(concurrency=2))
+            )
+            for client in clients
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual([len(tickets) for tickets in results], [3, 3])
+
+
+@patch('codebase.client.CodeBaseAPI.iter_xml')
+class CodeBaseAPIStreamSearchTestCase(TestCase):
+
+    def setUp(self):
+        super(CodeBaseAPIStreamSearchTestCase, self).setUp()
+
+        self.api_client = CodeBaseAPI(
+            project='project',
+            username='some/body',
+            apikey='bees',
+        )
+
+    def _create_pages(self, *pages):
+        pages = list(pages)
+
+        def iter_xml(url):
+            page = pages.pop(0)
+            if isinstance(page, Exception):
+                raise page
+            for ticket in page:
+                yield ticket
+
+        return iter_xml
+
+    def test_stream_search(self, iter_xml_mock):
+        iter_xml_mock.side_effect = self._create_pages(
+            [{'ticket': 1}, {'ticket': 2}],
+            [{'ticket': 3}],
+            urllib2.HTTPError('http://theurl.com', 404, 'Not Found', None, None),
+        )
+
+        tickets = list(self.api_client.stream_search(status='open'))
+
+        self.assertEqual(tickets, [{'ticket': 1}, {'ticket': 2}, {'ticket': 3}])
+        self.assertEqual(
+            [args[0] for args, kwargs in iter_xml_mock.call_args_list],
+            [
+                '/project/tickets?query=status%3A%22open%22',
+                '/project/tickets?query=status%3A%22open%22&page=2',
+                '/project/tickets?query=status%3A%22open%22&page=3',
+            ],
+        )
+
+    def test_stream_search_empty_page(self, iter_xml_mock):
+        iter_xml_mock.side_effect = self._create_pages([{'ticket': 1}], [])
+
+        self.assertEqual(list(self.api_client.stream_search()), [{'ticket': 1}])
+
+    def test_stream_search_error(self, iter_xml_mock):
+        iter_xml_mock.side_effect = self._create_pages(
+            [{'ticket': 1}],
+            urllib2.HTTPError('http://theurl.com', 500, 'Error', None, None),
+        )
+
+        tickets = self.api_client.stream_search()
+
+        self.assertEqual(next(tickets), {'ticket': 1})
+        self.assertRaises(urllib2.HTTPError, next, tickets)
+
+
+@patch('codebase.client.CodeBaseAPI.get')
+class CodeBaseAPITypedTestCase(TestCase):
+
+    def setUp(self):
+        super(CodeBaseAPITypedTestCase, self).setUp()
+
+        self.api_client = CodeBaseAPI(
+            project='project',
+            username='some/body',
+            apikey='bees',
+            typed=True,
+        )
+
+    def test_search(self, get_mock):
+        get_mock.return_value = [{'ticket': {'ticket_id': 1, 'summary': 'A'}}]
+
+        tickets = self.api_client.search(term='something')
+
+        self.assertEqual(tickets, [Ticket(ticket_id=1, summary='A')])
+
+    def test_search_all(self, get_mock):
+        get_mock.side_effect = [
+            [{'ticket': {'ticket_id': 1}}],
+            [{'ticket': {'ticket_id': 2}}],
+            urllib2.HTTPError('http://theurl.com', 404, 'Not Found', None, None),
+        ]
+
+        tickets = self.api_client.search_all()
+
+        self.assertEqual([ticket.ticket_id for ticket in tickets], [1, 2])
+
+    def test_cached_responses_stay_plain(self, get_mock):
+        self.api_client.cache = ResponseCache()
+        get_mock.return_value = [{'ticketing_status': {'id': 1, 'name': 'New'}}]
+
+        statuses = self.api_client.statuses()
+
+        self.assertEqual(statuses, [Status(id=1, name='New')])
+        self.assertEqual(
+            self.api_client.cache.get('project', 'statuses'),
+            [{'ticketing_status': {'id': 1, 'name': 'New'}}],
+        )
+        self.assertEqual(self.api_client.statuses(), statuses)
+        get_mock.assert_called_once_with('/project/tickets/statuses')
+
+    def test_not_typed_by_default(self, get_mock):
+        get_mock.return_value = [{'ticket': {'ticket_id': 1}}]
+        api_client = CodeBaseAPI(project='project', username='some/body', apikey='bees')
+
+        self.assertEqual(api_client.search(), [{'ticket': {'ticket_id': 1}}])
+
+    def test_no_response(self, get_mock):
+        get_mock.return_value = None
+        self.assertIsNone(self.api_client.notes(1))
+
+
+@patch('codebase.client.CodeBaseAPI.get')
+class CodeBaseAPIManyTestCase(TestCase):
+
+    def setUp(self):
+        super(CodeBaseAPIManyTestCase, self).setUp()
+
+        self.api_client = CodeBaseAPI(
+            project='project',
+            username='some/body',
+            apikey='bees',
+        )
+
+    def _get(self, url, ctype=None):
+        ticket_id = int(url.split('/')[3])
+        if ticket_id == 13:
+            raise urllib2.HTTPError(url, 500, 'Error', None, None)
+        return [url]
+
+    def test_notes_many(self, get_mock):
+        get_mock.side_effect = self._get
+        progress = Mock()
+
+        results = dict(self.api_client.notes_many([1, 2, 1, 3], progress=progress))
+
+        self.assertEqual(
+            results,
+            {
+                1: ['/project/tickets/1/notes'],
+                2: ['/project/tickets/2/notes'],
+                3: ['/project/tickets/3/notes'],
+            },
+        )
+        # Duplicates are only fetched once.
+        self.assertEqual(get_mock.call_count, 3)
+        self.assertEqual(
+            progress.call_args_list,
+            [call(1, 3), call(2, 3), call(3, 3)],
+        )
+
+    def test_watchers_many(self, get_mock):
+        get_mock.side_effect = self._get
+
+        results = list(self.api_client.watchers_many([4], workers=1))
+
+        self.assertEqual(results, [(4, ['/project/tickets/4/watchers'])])
+
+    def test_errors_dict(self, get_mock):
+        get_mock.side_effect = self._get
+        errors = {}
+
+        results = dict(self.api_client.notes_many([1, 13, 2], errors=errors))
+
+        self.assertEqual(sorted(results), [1, 2])
+        self.assertEqual(errors.keys(), [13])
+        self.assertEqual(errors[13].code, 500)
+
+    def test_batch_error(self, get_mock):
+        get_mock.side_effect = self._get
+        results = []
+
+        with self.assertRaises(BatchError) as ctx:
+            for ticket_id, notes in self.api_client.notes_many([1, 13, 2]):
+                results.append(ticket_id)
+
+        # The other tickets are yielded before the error is raised.
+        self.assertEqual(sorted(results), [1, 2])
+        self.assertEqual(ctx.exception.errors.keys(), [13])
+
+    def test_closed_early(self, get_mock):
+        get_mock.side_effect = self._get
+
+        results = self.api_client.notes_many(range(100), workers=2)
+        next(results)
+        results.close()
+
+        self.assertLess(get_mock.call_count, 100)
+
+
+@patch('codebase.client.CodeBaseAPI.post')
+class CodeBaseAPICreateTicketsTestCase(TestCase):
+
+    def setUp(self):
+        super(CodeBaseAPICreateTicketsTestCase, self).setUp()
+
+        self.api_client = CodeBaseAPI(
+            project='project',
+            username='some/body',
+            apikey='bees',
+        )
+
+    def _post(self, url, data, ctype=None):
+        summary = data['ticket']['summary']
+        if summary == 'Broken':
+            raise urllib2.HTTPError(url, 422, 'Error', None, None)
+        # Finishes the first tickets last.
+        time.sleep(0.01 / len(summary))
+        return {'ticket': {'summary': summary}}
+
+    def test_create_tickets(self, post_mock):
+        post_mock.side_effect = self._post
+        tickets = [
+            {'ticket': {'summary': 'A' * i}} for i in range(1, 6)
+        ] + [{'ticket': {'summary': 'Broken'}}]
+
+        results = list(self.api_client.create_tickets(tickets, workers=4))
+
+        self.assertEqual([result.item for result in results], tickets)
+        self.assertEqual(
+            [result.value for result in results[:5]],
+            [{'ticket': {'summary': 'A' * i}} for i in range(1, 6)],
+        )
+        self.assertEqual(results[5].value, None)
+        self.assertEqual(results[5].error.code, 422)
+        post_mock.assert_any_call('/project/tickets', tickets[0], ctype='xml')
+
+    def test_lazy_input(self, post_mock):
+        post_mock.side_effect = self._post
+        consumed = []
+
+        def read_tickets():
+            for i in range(1, 1000):
+                consumed.append(i)
+                yield {'ticket': {'summary': 'A' * i}}
+
+        results = self.api_client.create_tickets(read_tickets(), workers=2)
+        next(results)
+        results.close()
+
+        self.assertLess(len(consumed), 10)
+        self.assertLess(post_mock.call_count, 10)
+
+
+def _create_event(event_id, second):
+    return {
+        'event': {
+            'id': event_id,
+            'timestamp': '2016-08-01T10:00:{:02d}+00:00'.format(second),
+        }
+    }
+
+
+class StopPolling(Exception):
+    pass
+
+
+class CodeBaseAPIFollowActivityTestCase(TestCase):
+
+    def setUp(self):
+        super(CodeBaseAPIFollowActivityTestCase, self).setUp()
+
+        self.api_client = CodeBaseAPI(
+            project='project',
+            username='some/body',
+            apikey='bees',
+        )
+        # Most recent first, like the API.
+        self.feed = [_create_event(2, 2), _create_event(1, 1)]
+        self.page_size = 20
+        self.pages = {}
+        self.requests = []
+
+        patcher = patch.object(self.api_client, '_send_request', side_effect=self._send_request)
+        self.send_request_mock = patcher.start()
+        self.addCleanup(patcher.stop)
+
+        # The events added to the feed during each sleep.
+        self.updates = []
+        self.sleep = Mock(side_effect=self._sleep)
+
+    def _send_request(self, url, revalidation_cache=None):
+        self.requests.append(url)
+        self.assertIsNotNone(revalidation_cache)
+
+        page = int(urlparse.parse_qs(urlparse.urlsplit(url).query).get('page', ['1'])[0])
+        start = (page - 1) * self.page_size
+        events = self.feed[start:start + self.page_size]
+        # An unchanged page is revalidated and the cached one returned.
+        if self.pages.get(url) != events:
+            self.pages[url] = events
+        return self.pages[url]
+
+    def _sleep(self, interval):
+        if not self.updates:
+            raise StopPolling()
+        self.feed[:0] = reversed(self.updates.pop(0))
+
+    def _get_ids(self, events, count):
+        return [event['event']['id'] for event in itertools.islice(events, count)]
+
+    def _get_intervals(self):
+        return [args[0] for args, kwargs in self.sleep.call_args_list]
+
+    def test_new_events(self):
+        self.updates = [[_create_event(3, 3), _create_event(4, 4)]]
+        events = self.api_client.follow_activity(sleep=self.sleep)
+
+        self.assertEqual(self._get_ids(events, 2), [3, 4])
+        self.assertEqual(self.requests, ['/activity', '/activity'])
+
+    def test_project_only(self):
+        self.updates = [[_create_event(3, 3)]]
+        events = self.api_client.follow_activity(project_only=True, sleep=self.sleep)
+
+        self.assertEqual(self._get_ids(events, 1), [3])
+        self.assertEqual(self.requests, ['/project/activity', '/project/activity'])
+
+    def test_since(self):
+        self.updates = [[]]
+        events = self.api_client.follow_activity(
+            since='2016-08-01T10:00:02+00:00', sleep=self.sleep
+        )
+        self.assertEqual(self._get_ids(events, 1), [2])
+
+        self.updates = [[]]
+        events = self.api_client.follow_activity(
+            since='2016-08-01T09:00:00+00:00', sleep=self.sleep
+        )
+        self.assertEqual(self._get_ids(events, 2), [1, 2])
+
+    def test_same_timestamp(self):
+        self.updates = [[_create_event(3, 2)]]
+        events = self.api_client.follow_activity(sleep=self.sleep)
+
+        self.assertEqual(self._get_ids(events, 1), [3])
+
+    def test_following_pages(self):
+        self.page_size = 2
+        self.updates = [[_create_event(event_id, event_id) for event_id in range(3, 8)]]
+        events = self.api_client.follow_activity(sleep=self.sleep)
+
+        self.assertEqual(self._get_ids(events, 5), [3, 4, 5, 6, 7])
+        self.assertEqual(
+            self.requests,
+            [
+                '/activity',
+                '/activity',
+                '/activity?page=2',
+                '/activity?page=3',
+            ],
+        )
+
+    def test_quiet_feed(self):
+        self.updates = [[]] * 8
+        events = self.api_client.follow_activity(
+            min_interval=2, max_interval=10, sleep=self.sleep
+        )
+
+        with patch('codebase.client.ActivityCursor.is_new') as is_new_mock:
+            self.assertRaises(StopPolling, next, events)
+
+        # The unchanged feed is not even filtered.
+        is_new_mock.assert_not_called()
+        self.assertEqual(self._get_intervals(), [2, 3, 4.5, 6.75, 10, 10, 10, 10, 10])
+        # One request per poll.
+        self.assertEqual(len(self.requests), 9)
+
+    def test_busy_feed(self):
+        self.updates = [[], [], [_create_event(3, 3)], []]
+        events = self.api_client.follow_activity(
+            min_interval=2, max_interval=10, sleep=self.sleep
+        )
+
+        self.assertEqual(self._get_ids(events, 1), [3])
+        self.assertRaises(StopPolling, next, events)
+        # Back to the shortest interval after an event.
+        self.assertEqual(self._get_intervals(), [2, 3, 4.5, 2, 3])
+
+    @patch('codebase.client.logger')
+    def test_error(self, logger_mock):
+        self.updates = [[], [_create_event(3, 3)]]
+        events = self.api_client.follow_activity(sleep=self.sleep)
+        responses = [None, urllib2.URLError('Timed out'), None]
+
+        def send_request(url, revalidation_cache=None):
+            error = responses.pop(0)
+            if error is not None:
+                raise error
+            return list(self.feed)
+
+        self.send_request_mock.side_effect = send_request
+
+        self.assertEqual(self._get_ids(events, 1), [3])
+        self.assertEqual(logger_mock.warning.call_count, 1)
@@ -0,0 +1,168 @@
+from unittest import TestCase
+import os
+import shutil
+import socket
+import stat
+import tempfile
+import threading
+
+from mock import Mock, patch
+
+from codebase import daemon
+from codebase.daemon import DaemonError, DaemonServer, DaemonUnavailable
+
+
+class DaemonTestCase(TestCase):
+
+    def setUp(self):
+        super(DaemonTestCase, self).setUp()
+
+        self.directory = tempfile.mkdtemp()
+        self.socket_path = os.path.join(self.directory, 'codebase.sock')
+
+        settings_patcher = patch('codebase.daemon.Settings')
+        settings = settings_patcher.start()
+        settings.return_value = Mock(username='foo/bar', apikey='secret')
+        self.addCleanup(settings_patcher.stop)
+
+        client_patcher = patch('codebase.client.CodeBaseAPI')
+        self.client_class = client_patcher.start()
+        self.addCleanup(client_patcher.stop)
+        self.client = self.client_class.return_value
+
+        self.server = DaemonServer(self.socket_path, idle_timeout=None)
+        self.thread = threading.Thread(target=self.server.serve)
+        self.thread.start()
+
+    def tearDown(self):
+        super(DaemonTestCase, self).tearDown()
+        daemon.stop(self.socket_path)
+        self.thread.join(5)
+        shutil.rmtree(self.directory)
+
+    def test_call(self):
+        self.client.statuses.return_value = [{'ticketing_status': {'id': 1}}]
+
+        result = daemon.call('myproject', 'statuses', socket_path=self.socket_path)
+
+        self.assertEqual(result, [{'ticketing_status': {'id': 1}}])
+        self.client_class.assert_called_once_with(
+            project='myproject',
+            username='foo/bar',
+            apikey='secret',
+            cache=self.server.cache,
+        )
+
+    def test_client_reused(self):
+        self.client.search.return_value = []
+
+        daemon.call('myproject', 'search', kwargs={'status': 'open'}, socket_path=self.socket_path)
+        daemon.call('myproject', 'search', kwargs={'status': 'new'}, socket_path=self.socket_path)
+
+        self.assertEqual(self.client_class.call_count, 1)
+        self.client.search.assert_called_with(status='new')
+
+    def test_generator_result(self):
+        self.client.notes_many.return_value = (item for item in [[1, []], [2, []]])
+
+        result = daemon.call(
+            'myproject', 'notes_many', args=[[1, 2]], socket_path=self.socket_path
+        )
+
+        self.assertEqual(result, [[1, []], [2, []]])
+        self.client.notes_many.assert_called_once_with([1, 2])
+
+    def test_unbounded_command(self):
+        with self.assertRaises(DaemonError) as context:
+            daemon.call('myproject', 'follow_activity', socket_path=self.socket_path)
+        self.assertIn('never ends', str(context.exception))
+        self.client.follow_activity.assert_not_called()
+
+    def test_timeout(self):
+        release = threading.Event()
+        self.addCleanup(release.set)
+        self.client.statuses.side_effect = lambda: release.wait(5)
+
+        with self.assertRaises(DaemonError) as context:
+            daemon.call('myproject', 'statuses', socket_path=self.socket_path, timeout=0.1)
+        self.assertIn('No response', str(context.exception))
+
+    def test_running_daemon_kept(self):
+        self.assertRaises(DaemonError, DaemonServer, self.socket_path)
+
+        self.client.statuses.return_value = []
+        self.assertEqual(
+            daemon.call('myproject', 'statuses', socket_path=self.socket_path), []
+        )
+
+    def test_error(self):
+        self.client.statuses.side_effect = ValueError('Boom')
+
+        with self.assertRaises(DaemonError) as context:
+            daemon.call('myproject', 'statuses', socket_path=self.socket_path)
+        self.assertIn('Boom', str(context.exception))
+
+    def test_private_command(self):
+        self.assertRaises(
+            DaemonError,
+            daemon.call, 'myproject', '_send_request', socket_path=self.socket_path,
+        )
+
+    def test_socket_permissions(self):
+        mode = stat.S_IMODE(os.stat(self.socket_path).st_mode)
+        self.assertEqual(mode & 0o077, 0)
+
+    def test_stop(self):
+        daemon.stop(self.socket_path)
+        self.thread.join(5)
+
+        self.assertFalse(self.thread.is_alive())
+        self.assertFalse(os.path.exists(self.socket_path))
+        self.assertRaises(
+            DaemonUnavailable,
+            daemon.call, 'myproject', 'statuses', socket_path=self.socket_path,
+        )
+
+
+class DaemonUnavailableTestCase(TestCase):
+
+    def setUp(self):
+        super(DaemonUnavailableTestCase, self).setUp()
+        self.directory = tempfile.mkdtemp()
+        self.socket_path = os.path.join(self.directory, 'codebase.sock')
+
+    def tearDown(self):
+        super(DaemonUnavailableTestCase, self).tearDown()
+        shutil.rmtree(self.directory)
+
+    def test_no_daemon(self):
+        self.assertRaises(
+            DaemonUnavailable,
+            daemon.call, 'myproject', 'statuses', socket_path=self.socket_path,
+        )
+
+    @patch('codebase.daemon.Settings')
+    def test_stale_socket_replaced(self, settings):
+        settings.return_value = Mock(username='foo/bar', apikey='secret')
+        # Bound but not listening, like the socket of a daemon which was
+        # killed.
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(self.socket_path)
+        sock.close()
+
+        server = DaemonServer(self.socket_path, idle_timeout=None)
+        server.close()
+
+    @patch('codebase.daemon.start')
+    @patch('codebase.daemon._send')
+    def test_autostart(self, send, start):
+        send.side_effect = [DaemonUnavailable(self.socket_path), ['status']]
+
+        result = daemon.call(
+            'myproject', 'statuses', socket_path=self.socket_path, autostart=True,
+            cache_file_path='~/.codebase_cache',
+        )
+
+        self.assertEqual(result, ['status'])
+        start.assert_called_once_with(self.socket_path, cache_file_path='~/.codebase_cache')
+        self.assertEqual(send.call_count, 2)
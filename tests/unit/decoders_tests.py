@@ -0,0 +1,136 @@
+from unittest import TestCase
+import json
+import threading
+import time
+from StringIO import StringIO
+from xml.parsers.expat import ExpatError
+
+from mock import Mock, patch
+
+from codebase.decoders import (
+    Decoder,
+    DecoderRegistry,
+    create_default_registry,
+    find_json_decoder,
+    iter_xml_items,
+)
+
+
+class DecoderTestCase(TestCase):
+
+    def test_decode_string(self):
+        decoder = Decoder('json', json.loads, json.load)
+        self.assertEqual(decoder.decode('[1]'), [1])
+
+    def test_decode_file(self):
+        load = Mock(return_value=[1])
+        decoder = Decoder('json', json.loads, load)
+        fp = StringIO('[1]')
+
+        self.assertEqual(decoder.decode(fp), [1])
+        load.assert_called_once_with(fp)
+
+    def test_decode_file_without_load(self):
+        decoder = Decoder('json', json.loads)
+        self.assertEqual(decoder.decode(StringIO('[1]')), [1])
+
+
+class FindJsonDecoderTestCase(TestCase):
+
+    @patch('codebase.decoders.importlib.import_module')
+    def test_fast_module(self, import_module_mock):
+        module = Mock()
+        import_module_mock.side_effect = [ImportError, module]
+
+        decoder = find_json_decoder(('ujson', 'simplejson'))
+
+        self.assertEqual(decoder.name, 'simplejson')
+        self.assertIs(decoder.loads, module.loads)
+
+    @patch('codebase.decoders.importlib.import_module', side_effect=ImportError)
+    def test_fallback(self, import_module_mock):
+        decoder = find_json_decoder(('ujson', 'simplejson'))
+
+        self.assertEqual(decoder.name, 'json')
+        self.assertIs(decoder.loads, json.loads)
+
+
+class DecoderRegistryTestCase(TestCase):
+
+    def test_default_registry(self):
+        registry = create_default_registry()
+
+        self.assertEqual(registry.decode('json', '{"a": 1}'), {'a': 1})
+        self.assertEqual(
+            registry.decode('xml', '<ticket><id>1</id></ticket>'),
+            {'ticket': {'id': '1'}},
+        )
+
+    def test_register(self):
+        registry = DecoderRegistry()
+        loads = Mock(return_value='decoded')
+
+        registry.register('yaml', loads, name='yaml')
+
+        self.assertEqual(registry.decode('yaml', 'a: 1'), 'decoded')
+        self.assertEqual(registry.get('yaml').name, 'yaml')
+
+    def test_register_decoder(self):
+        registry = DecoderRegistry()
+        decoder = Decoder('json', json.loads)
+
+        registry.register('json', decoder)
+
+        self.assertIs(registry.get('json'), decoder)
+
+    def test_unknown_ctype(self):
+        registry = DecoderRegistry()
+        self.assertIsNone(registry.get('yaml'))
+        self.assertRaises(ValueError, registry.decode, 'yaml', 'a: 1')
+
+
+class IterXmlItemsTestCase(TestCase):
+
+    def setUp(self):
+        super(IterXmlItemsTestCase, self).setUp()
+
+        self.content = '<tickets type="array">{}</tickets>'.format(''.join(
+            '<ticket><ticket-id type="integer">{}</ticket-id></ticket>'.format(i)
+            for i in range(100)
+        ))
+
+    def test_items(self):
+        items = list(iter_xml_items(StringIO(self.content)))
+
+        self.assertEqual(len(items), 100)
+        self.assertEqual(
+            items[3],
+            {'ticket': {'ticket-id': {'@type': 'integer', '#text': '3'}}},
+        )
+
+    def test_item_depth(self):
+        items = list(iter_xml_items(StringIO(self.content), item_depth=3))
+
+        self.assertEqual(len(items), 100)
+        self.assertEqual(items[0].keys(), ['ticket-id'])
+
+    def test_invalid_document(self):
+        items = iter_xml_items(StringIO('<tickets><ticket></tickets>'))
+        self.assertRaises(ExpatError, list, items)
+
+    def test_close(self):
+        items = iter_xml_items(StringIO(self.content), max_pending=2)
+
+        next(items)
+        items.close()
+
+        # The parser stops instead of waiting for the items to be consumed.
+        for i in range(50):
+            if not any(
+                thread.name == 'codebase-xml-parser'
+                for thread in threading.enumerate()
+            ):
+                break
+            time.sleep(0.1)
+        else:
+            self.fail('The parser thread is still running')
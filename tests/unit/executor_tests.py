@@ -0,0 +1,203 @@
+from unittest import TestCase
+import threading
+import time
+
+from codebase.executor import Future, Result, SingleFlight, WorkerPool, imap
+
+
+class FutureTestCase(TestCase):
+
+    def test_result(self):
+        future = Future()
+        self.assertFalse(future.done())
+
+        future._set(value=42)
+
+        self.assertTrue(future.done())
+        self.assertEqual(future.result(), 42)
+        self.assertIsNone(future.exception())
+
+    def test_error(self):
+        future = Future()
+        error = ValueError('boom')
+
+        future._set(error=error)
+
+        self.assertIs(future.exception(), error)
+        self.assertRaises(ValueError, future.result)
+
+    def test_timeout(self):
+        self.assertRaises(RuntimeError, Future().result, timeout=0.01)
+
+    def test_callbacks(self):
+        future = Future()
+        called = []
+
+        future.add_done_callback(called.append)
+        self.assertEqual(called, [])
+
+        future._set(value=1)
+        self.assertEqual(called, [future])
+
+        # Callbacks added once done are called straight away.
+        future.add_done_callback(called.append)
+        self.assertEqual(called, [future, future])
+
+
+class WorkerPoolTestCase(TestCase):
+
+    def test_submit(self):
+        with WorkerPool(workers=2) as pool:
+            futures = [pool.submit(pow, i, 2) for i in range(5)]
+            self.assertEqual(
+                [future.result() for future in futures],
+                [0, 1, 4, 9, 16],
+            )
+
+    def test_workers_limit(self):
+        lock = threading.Lock()
+        running = {'current': 0, 'max': 0}
+
+        def work():
+            with lock:
+                running['current'] += 1
+                running['max'] = max(running['max'], running['current'])
+            time.sleep(0.01)
+            with lock:
+                running['current'] -= 1
+
+        with WorkerPool(workers=3) as pool:
+            futures = [pool.submit(work) for i in range(12)]
+            for future in futures:
+                future.result()
+
+        self.assertEqual(running['max'], 3)
+
+
+class IMapTestCase(TestCase):
+
+    def test_ordered(self):
+        def slow_for_small(i):
+            time.sleep(0.01 * (5 - i))
+            return i * 10
+
+        results = list(imap(slow_for_small, range(5), workers=5))
+
+        self.assertEqual(
+            results,
+            [Result(i, i * 10, None) for i in range(5)],
+        )
+
+    def test_unordered(self):
+        def slow_for_small(i):
+            time.sleep(0.02 * (3 - i))
+            return i
+
+        results = list(imap(slow_for_small, range(3), workers=3, ordered=False))
+
+        self.assertEqual([result.value for result in results], [2, 1, 0])
+
+    def test_errors_returned(self):
+        error = ValueError('boom')
+
+        def fail_on_two(i):
+            if i == 2:
+                raise error
+            return i
+
+        results = list(imap(fail_on_two, range(4), workers=2))
+
+        self.assertEqual(
+            results,
+            [
+                Result(0, 0, None),
+                Result(1, 1, None),
+                Result(2, None, error),
+                Result(3, 3, None),
+            ],
+        )
+
+    def test_bounded_consumption(self):
+        consumed = []
+
+        def items():
+            for i in range(100):
+                consumed.append(i)
+                yield i
+
+        results = imap(lambda i: i, items(), workers=2, max_pending=3)
+        first = next(results)
+        results.close()
+
+        self.assertEqual(first, Result(0, 0, None))
+        # Only the first item and the `max_pending` next ones were taken.
+        self.assertLessEqual(len(consumed), 4)
+
+
+class SingleFlightTestCase(TestCase):
+
+    def setUp(self):
+        super(SingleFlightTestCase, self).setUp()
+
+        self.single_flight = SingleFlight()
+        self.release = threading.Event()
+        self.calls = []
+
+    def _call(self, value):
+        self.calls.append(value)
+        self.release.wait(5)
+        if isinstance(value, Exception):
+            raise value
+        return [value]
+
+    def _run_concurrently(self, key, value, count=5):
+        results = []
+
+        def run():
+            try:
+                results.append(self.single_flight.do(key, self._call, value))
+            except Exception as e:
+                results.append(e)
+
+        threads = [threading.Thread(target=run) for i in range(count)]
+        for thread in threads:
+            thread.start()
+        # Lets every thread reach the in-flight call.
+        while len(self.single_flight._calls) < 1 or not self.calls:
+            time.sleep(0.01)
+        time.sleep(0.1)
+        self.release.set()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_coalesced(self):
+        results = self._run_concurrently('key', 1)
+
+        self.assertEqual(self.calls, [1])
+        self.assertEqual(len(results), 5)
+        # Every caller gets the same object.
+        self.assertEqual(len(set(id(result) for result in results)), 1)
+        self.assertEqual(self.single_flight._calls, {})
+
+    def test_error_shared(self):
+        error = ValueError('boom')
+
+        results = self._run_concurrently('key', error)
+
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(results, [error] * 5)
+
+    def test_sequential_calls_not_coalesced(self):
+        self.release.set()
+
+        self.single_flight.do('key', self._call, 1)
+        self.single_flight.do('key', self._call, 2)
+
+        self.assertEqual(self.calls, [1, 2])
+
+    def test_different_keys(self):
+        self.release.set()
+
+        self.assertEqual(self.single_flight.do('a', self._call, 1), [1])
+        self.assertEqual(self.single_flight.do('b', self._call, 2), [2])
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+from unittest import TestCase
+import csv
+import json
+import os
+import shutil
+import tempfile
+import urllib2
+
+from mock import Mock
+
+from codebase.export import DEFAULT_CSV_COLUMNS, TicketExporter
+
+
+PAGES = [
+    [
+        {'ticket': {'ticket_id': 1, 'summary': u'First', 'status': {'id': 1, 'name': 'New'}}},
+        {'ticket': {'ticket_id': 2, 'summary': u'Caf\xe9', 'status': {'id': 2, 'name': 'Done'}}},
+    ],
+    [
+        {'ticket': {'ticket_id': 3, 'summary': u'Third', 'status': None}},
+    ],
+]
+
+
+class Interrupted(Exception):
+    pass
+
+
+class TicketExporterTestCase(TestCase):
+
+    def setUp(self):
+        super(TicketExporterTestCase, self).setUp()
+        self.directory = tempfile.mkdtemp()
+
+        self.api = Mock(typed=False)
+        self.api.iter_search_pages.side_effect = self._iter_search_pages
+        self.api.notes.side_effect = self._notes
+        self.failing_ticket_id = None
+
+    def tearDown(self):
+        super(TicketExporterTestCase, self).tearDown()
+        shutil.rmtree(self.directory)
+
+    def _iter_search_pages(self, first_page=1, **kwargs):
+        for page, tickets in enumerate(PAGES[first_page - 1:], first_page):
+            yield page, tickets
+
+    def _notes(self, ticket_id):
+        if ticket_id == self.failing_ticket_id:
+            raise urllib2.URLError('Timed out')
+        return [{'ticket_note': {'id': ticket_id * 10, 'content': u'Note'}}]
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _read_ndjson(self, path):
+        with open(path) as f:
+            return [json.loads(line) for line in f]
+
+    def test_typed_client(self):
+        self.assertRaises(ValueError, TicketExporter, Mock(typed=True))
+
+    def test_unknown_format(self):
+        exporter = TicketExporter(self.api)
+        self.assertRaises(ValueError, exporter.export, self._path('tickets.txt'))
+
+    def test_ndjson(self):
+        path = self._path('tickets.ndjson')
+
+        count = TicketExporter(self.api, workers=2, status='open').export(path)
+
+        self.assertEqual(count, 3)
+        rows = self._read_ndjson(path)
+        self.assertEqual([row['ticket_id'] for row in rows], [1, 2, 3])
+        self.assertEqual(rows[1], {
+            'ticket_id': 2,
+            'summary': u'Caf\xe9',
+            'status': {'id': 2, 'name': 'Done'},
+            'notes': [{'id': 20, 'content': u'Note'}],
+        })
+        self.api.iter_search_pages.assert_called_once_with(first_page=1, status='open')
+        self.assertFalse(os.path.exists(path + '.checkpoint'))
+
+    def test_columns_without_notes(self):
+        path = self._path('tickets.ndjson')
+
+        TicketExporter(self.api).export(path, columns=['summary', 'ticket_id'])
+
+        with open(path) as f:
+            self.assertEqual(f.readline(), '{"summary": "First", "ticket_id": 1}\n')
+        self.assertFalse(self.api.notes.called)
+
+    def test_csv(self):
+        path = self._path('export.out')
+
+        TicketExporter(self.api).export(path, format='csv')
+
+        with open(path) as f:
+            rows = list(csv.reader(f))
+        self.assertEqual(rows[0], list(DEFAULT_CSV_COLUMNS))
+        row = dict(zip(rows[0], rows[2]))
+        self.assertEqual(row['ticket_id'], '2')
+        self.assertEqual(row['summary'], 'Caf\xc3\xa9')
+        self.assertEqual(row['status'], 'Done')
+        self.assertEqual(row['assignee'], '')
+        self.assertEqual(json.loads(row['notes']), [{'id': 20, 'content': 'Note'}])
+        self.assertEqual(dict(zip(rows[0], rows[3]))['status'], '')
+
+    def test_resume(self):
+        path = self._path('tickets.csv')
+        exporter = TicketExporter(self.api, workers=1, checkpoint_interval=1)
+        self.failing_ticket_id = 3
+
+        self.assertRaises(urllib2.URLError, exporter.export, path)
+
+        with open(path + '.checkpoint') as f:
+            checkpoint = json.load(f)
+        self.assertEqual((checkpoint['page'], checkpoint['index'], checkpoint['count']), (1, 2, 2))
+
+        # Anything written after the checkpoint is dropped.
+        with open(path, 'a') as f:
+            f.write('partial line')
+        self.failing_ticket_id = None
+        self.api.notes.reset_mock()
+
+        self.assertEqual(exporter.export(path), 3)
+
+        self.api.notes.assert_called_once_with(3)
+        self.api.iter_search_pages.assert_called_with(first_page=1)
+        with open(path) as f:
+            rows = list(csv.reader(f))
+        self.assertEqual([row[0] for row in rows], ['ticket_id', '1', '2', '3'])
+        self.assertFalse(os.path.exists(path + '.checkpoint'))
+
+    def test_resume_next_page(self):
+        path = self._path('tickets.ndjson')
+        exporter = TicketExporter(self.api, checkpoint_interval=2)
+
+        def interrupt(ticket_id):
+            if ticket_id == 3:
+                raise Interrupted()
+            return []
+        self.api.notes.side_effect = interrupt
+
+        self.assertRaises(Interrupted, exporter.export, path)
+        self.api.notes.side_effect = self._notes
+        exporter.export(path)
+
+        self.api.iter_search_pages.assert_called_with(first_page=1)
+        self.assertEqual([row['ticket_id'] for row in self._read_ndjson(path)], [1, 2, 3])
+
+    def test_resume_other_options(self):
+        path = self._path('tickets.ndjson')
+        self.failing_ticket_id = 2
+        self.assertRaises(urllib2.URLError, TicketExporter(self.api).export, path)
+
+        exporter = TicketExporter(self.api, status='open')
+        self.assertRaises(ValueError, exporter.export, path)
+
+    def test_checkpoint_without_output(self):
+        path = self._path('tickets.ndjson')
+        with open(path + '.checkpoint', 'w') as f:
+            json.dump({'page': 2, 'index': 0, 'count': 2, 'offset': 10}, f)
+
+        self.assertEqual(TicketExporter(self.api).export(path), 3)
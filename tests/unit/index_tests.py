@@ -0,0 +1,185 @@
+from unittest import TestCase
+import datetime
+
+from codebase.index import TicketIndex, get_ticket_field
+from codebase.records import Ticket
+
+
+def _create_ticket(ticket_id, status='New', assignee='alice', updated_at=None, milestone=None):
+    ticket = {
+        'ticket_id': ticket_id,
+        'status': {'id': 1, 'name': status},
+        'assignee': assignee,
+        'updated_at': updated_at or '2016-08-{:02d}T10:00:00Z'.format(ticket_id),
+    }
+    if milestone:
+        ticket['milestone'] = {'id': 7, 'name': milestone}
+    return {'ticket': ticket}
+
+
+class GetTicketFieldTestCase(TestCase):
+
+    def test_dict(self):
+        item = _create_ticket(1, milestone='Sprint 7')
+
+        self.assertEqual(get_ticket_field(item, 'ticket_id'), 1)
+        self.assertEqual(get_ticket_field(item, 'status'), 'New')
+        self.assertEqual(get_ticket_field(item, 'milestone'), 'Sprint 7')
+        self.assertEqual(
+            get_ticket_field(item, 'updated_at'),
+            datetime.datetime(2016, 8, 1, 10, 0),
+        )
+        self.assertIsNone(get_ticket_field(item, 'priority'))
+
+    def test_record(self):
+        ticket = Ticket.from_dict(_create_ticket(1))
+
+        self.assertEqual(get_ticket_field(ticket, 'status'), 'New')
+        self.assertEqual(
+            get_ticket_field(ticket, 'updated_at'),
+            datetime.datetime(2016, 8, 1, 10, 0),
+        )
+
+
+class TicketIndexTestCase(TestCase):
+
+    def setUp(self):
+        super(TicketIndexTestCase, self).setUp()
+
+        self.items = [
+            _create_ticket(1),
+            _create_ticket(2, assignee='bob'),
+            _create_ticket(3, status='Completed', milestone='Sprint 7'),
+            _create_ticket(4, status='Completed', assignee='bob', milestone='Sprint 7'),
+            _create_ticket(5, status='In Progress', assignee=None),
+        ]
+        self.index = TicketIndex(self.items)
+
+    def _find_ids(self, **criteria):
+        return [item['ticket']['ticket_id'] for item in self.index.find(**criteria)]
+
+    def test_container(self):
+        self.assertEqual(len(self.index), 5)
+        self.assertIn(3, self.index)
+        self.assertIs(self.index.get(3), self.items[2])
+        self.assertIsNone(self.index.get(42))
+        self.assertEqual(len(list(self.index)), 5)
+
+    def test_find_all(self):
+        self.assertEqual(self._find_ids(order_by='ticket_id'), [1, 2, 3, 4, 5])
+
+    def test_hash_criteria(self):
+        self.assertEqual(sorted(self._find_ids(status='Completed')), [3, 4])
+        self.assertEqual(self._find_ids(status='Completed', assignee='bob'), [4])
+        self.assertEqual(
+            sorted(self._find_ids(status=['New', 'In Progress'])),
+            [1, 2, 5],
+        )
+        self.assertEqual(self._find_ids(assignee=None), [5])
+        self.assertEqual(self._find_ids(status='Unknown'), [])
+        self.assertEqual(self._find_ids(milestone='Sprint 7', assignee='carol'), [])
+
+    def test_range_criteria(self):
+        self.assertEqual(
+            self._find_ids(
+                updated_at__gte='2016-08-02T10:00:00Z',
+                updated_at__lt='2016-08-04T10:00:00Z',
+                order_by='updated_at',
+            ),
+            [2, 3],
+        )
+        self.assertEqual(
+            self._find_ids(ticket_id__gt=3, order_by='ticket_id'),
+            [4, 5],
+        )
+        self.assertEqual(self._find_ids(ticket_id__lte=1), [1])
+        self.assertEqual(self._find_ids(ticket_id=4), [4])
+        self.assertEqual(self._find_ids(ticket_id__gt=4, ticket_id__lt=4), [])
+
+    def test_combined_criteria(self):
+        self.assertEqual(
+            self._find_ids(
+                status='Completed',
+                updated_at__gt=datetime.datetime(2016, 8, 3, 12, 0),
+            ),
+            [4],
+        )
+        # The range is wider than the hash match, so it is used as a filter.
+        self.assertEqual(
+            sorted(self._find_ids(assignee='bob', ticket_id__gte=2, ticket_id__lte=5)),
+            [2, 4],
+        )
+
+    def test_order_and_limit(self):
+        self.assertEqual(
+            self._find_ids(order_by='-updated_at', limit=2),
+            [5, 4],
+        )
+        self.assertEqual(
+            self._find_ids(status='New', order_by='-ticket_id'),
+            [2, 1],
+        )
+        self.assertRaises(ValueError, self.index.find, order_by='status')
+
+    def test_missing_sorted_values(self):
+        self.index.add({'ticket': {'ticket_id': 6, 'status': {'name': 'New'}}})
+
+        # Tickets without a value come last.
+        self.assertEqual(self._find_ids(status='New', order_by='-updated_at'), [2, 1, 6])
+        self.assertEqual(
+            sorted(self._find_ids(updated_at__gte='2016-08-01T00:00:00Z', status='New')),
+            [1, 2],
+        )
+
+    def test_count_and_values(self):
+        self.assertEqual(self.index.count(), 5)
+        self.assertEqual(self.index.count(status='Completed'), 2)
+        self.assertEqual(
+            self.index.values('status'),
+            {'New': 2, 'Completed': 2, 'In Progress': 1},
+        )
+        self.assertRaises(ValueError, self.index.values, 'summary')
+
+    def test_update_existing(self):
+        self.index.update([
+            _create_ticket(2, status='Completed', updated_at='2016-09-01T10:00:00Z'),
+            _create_ticket(6),
+        ])
+
+        self.assertEqual(len(self.index), 6)
+        self.assertEqual(sorted(self._find_ids(status='New')), [1, 6])
+        self.assertEqual(sorted(self._find_ids(status='Completed')), [2, 3, 4])
+        self.assertEqual(self._find_ids(order_by='-updated_at', limit=1), [2])
+        self.assertEqual(
+            self._find_ids(updated_at__lt='2016-08-03T00:00:00Z'),
+            [1],
+        )
+
+    def test_duplicates_in_initial_items(self):
+        index = TicketIndex([_create_ticket(1), _create_ticket(1, status='Completed')])
+
+        self.assertEqual(len(index), 1)
+        self.assertEqual(index.count(status='New'), 0)
+        self.assertEqual(index.count(status='Completed'), 1)
+        self.assertEqual(index.count(ticket_id__gte=0), 1)
+
+    def test_remove(self):
+        self.index.remove(4)
+
+        self.assertNotIn(4, self.index)
+        self.assertEqual(self._find_ids(status='Completed'), [3])
+        self.assertEqual(self.index.count(ticket_id__gt=3), 1)
+        self.assertRaises(KeyError, self.index.remove, 4)
+
+    def test_records(self):
+        index = TicketIndex(Ticket.from_response(self.items))
+
+        self.assertEqual(
+            [ticket.ticket_id for ticket in index.find(status='Completed', assignee='bob')],
+            [4],
+        )
+
+    def test_unknown_criteria(self):
+        self.assertRaises(ValueError, self.index.find, summary='x')
+        self.assertRaises(ValueError, self.index.find, status__gt='x')
+        self.assertRaises(ValueError, self.index.find, updated_at__after='x')
@@ -0,0 +1,128 @@
+from unittest import TestCase
+
+from codebase.metrics import (
+    REQUEST_FINISHED,
+    REQUEST_STARTED,
+    Histogram,
+    MetricsCollector,
+    RequestInfo,
+    get_url_template,
+)
+
+
+class GetUrlTemplateTestCase(TestCase):
+
+    def test_project_and_ids(self):
+        self.assertEqual(
+            get_url_template('/myproject/tickets/12/notes?page=2', 'myproject'),
+            '/{project}/tickets/{id}/notes',
+        )
+
+    def test_no_project(self):
+        self.assertEqual(get_url_template('/projects'), '/projects')
+        self.assertEqual(
+            get_url_template('/myproject/tickets/12', 'other'),
+            '/myproject/tickets/{id}',
+        )
+
+    def test_project_prefix(self):
+        # Only whole path segments are replaced.
+        self.assertEqual(
+            get_url_template('/myproject2/milestones', 'myproject'),
+            '/myproject2/milestones',
+        )
+
+
+class HistogramTestCase(TestCase):
+
+    def test_empty(self):
+        histogram = Histogram()
+
+        self.assertIsNone(histogram.mean)
+        self.assertIsNone(histogram.percentile(50))
+
+    def test_percentiles(self):
+        histogram = Histogram()
+        for i in range(90):
+            histogram.add(0.01)
+        for i in range(10):
+            histogram.add(1.5)
+
+        self.assertEqual(histogram.count, 100)
+        self.assertAlmostEqual(histogram.mean, 0.159)
+        self.assertEqual(histogram.percentile(50), 0.016)
+        self.assertEqual(histogram.percentile(90), 0.016)
+        self.assertEqual(histogram.percentile(99), 1.5)
+        self.assertEqual(histogram.min, 0.01)
+        self.assertEqual(histogram.max, 1.5)
+
+    def test_out_of_bounds(self):
+        histogram = Histogram()
+        histogram.add(1000)
+
+        self.assertEqual(histogram.percentile(50), 1000)
+
+
+class MetricsCollectorTestCase(TestCase):
+
+    def _create_request_info(self, url_template, duration, error=None):
+        request_info = RequestInfo(
+            'GET', 'https://api3.codebasehq.com', url_template, 'json'
+        )
+        request_info.started_at = 10
+        request_info.body_read_at = 10 + duration / 2.0
+        request_info.parsed_at = 10 + duration
+        request_info.finished_at = 10 + duration
+        request_info.bytes_received = 100
+        request_info.error = error
+        return request_info
+
+    def test_summary(self):
+        metrics = MetricsCollector()
+        metrics(REQUEST_FINISHED, self._create_request_info('/{project}/milestones', 0.1))
+        for i in range(2):
+            metrics(
+                REQUEST_FINISHED,
+                self._create_request_info('/{project}/tickets', 0.5),
+            )
+        metrics(
+            REQUEST_FINISHED,
+            self._create_request_info('/{project}/tickets', 0.2, ValueError()),
+        )
+
+        summary = metrics.summary()
+
+        self.assertEqual(
+            summary.keys(),
+            ['GET /{project}/tickets', 'GET /{project}/milestones'],
+        )
+        tickets = summary['GET /{project}/tickets']
+        self.assertEqual(tickets['count'], 3)
+        self.assertEqual(tickets['errors'], 1)
+        self.assertEqual(tickets['bytes_received'], 300)
+        self.assertAlmostEqual(tickets['total'], 1.2)
+        self.assertAlmostEqual(tickets['parse_total'], 0.6)
+        self.assertEqual(tickets['max'], 0.5)
+
+    def test_streamed_parse_time(self):
+        metrics = MetricsCollector()
+        request_info = self._create_request_info('/{project}/tickets', 0.5)
+        request_info.streamed = True
+
+        metrics(REQUEST_FINISHED, request_info)
+
+        self.assertIsNone(metrics.summary()['GET /{project}/tickets']['parse_total'])
+
+    def test_ignores_other_events(self):
+        metrics = MetricsCollector()
+        metrics(REQUEST_STARTED, self._create_request_info('/projects', 0.1))
+
+        self.assertEqual(metrics.summary(), {})
+
+    def test_reset(self):
+        metrics = MetricsCollector()
+        metrics(REQUEST_FINISHED, self._create_request_info('/projects', 0.1))
+
+        metrics.reset()
+
+        self.assertEqual(metrics.summary(), {})
@@ -0,0 +1,221 @@
+from unittest import TestCase
+import os
+import shutil
+import tempfile
+import urllib2
+
+from mock import Mock, call, patch
+
+from codebase.client import SearchError
+from codebase.mirror import TicketMirror
+
+
+def _create_ticket(ticket_id, updated_at, status='New', assignee='alice'):
+    return {
+        'ticket': {
+            'ticket_id': ticket_id,
+            'summary': 'Ticket {}'.format(ticket_id),
+            'status': {'id': 1, 'name': status},
+            'priority': {'id': 2, 'name': 'Normal'},
+            'assignee': assignee,
+            'milestone_id': None,
+            'updated_at': updated_at,
+        }
+    }
+
+
+def _create_note(note_id, created_at='2016-08-01T10:00:00+01:00'):
+    return {'ticket_note': {'id': note_id, 'content': 'Note', 'created_at': created_at}}
+
+
+class TicketMirrorTestCase(TestCase):
+
+    def setUp(self):
+        super(TicketMirrorTestCase, self).setUp()
+
+        self.api = Mock(typed=False)
+        self.api.statuses.return_value = [
+            {'ticketing_status': {'id': 1, 'name': 'New'}},
+        ]
+        self.api.milestones.return_value = [
+            {'ticketing_milestone': {'id': 7, 'name': 'Sprint 7'}},
+        ]
+        self.api.notes.side_effect = lambda ticket_id: [_create_note(ticket_id * 10)]
+        self.tickets = [
+            _create_ticket(1, '2016-08-01T10:00:00+01:00'),
+            _create_ticket(2, '2016-08-02T10:00:00+01:00', assignee='bob'),
+            _create_ticket(3, '2016-08-03T10:00:00+01:00', status='Completed'),
+        ]
+        # The tickets found without the mirror's search terms.
+        self.all_tickets = None
+        self.api.iter_search.side_effect = self._iter_search
+        self.mirror = TicketMirror(self.api, status='open')
+
+    def _iter_search(self, **kwargs):
+        if 'status' in kwargs or self.all_tickets is None:
+            return (ticket for ticket in self.tickets)
+        return (ticket for ticket in self.all_tickets)
+
+    def tearDown(self):
+        super(TicketMirrorTestCase, self).tearDown()
+        self.mirror.close()
+
+    def test_typed_client(self):
+        self.assertRaises(ValueError, TicketMirror, Mock(typed=True))
+
+    def test_first_sync(self):
+        self.assertIsNone(self.mirror.last_updated_at)
+
+        self.assertEqual(sorted(self.mirror.sync()), [1, 2, 3])
+
+        self.api.iter_search.assert_called_once_with(status='open')
+        self.assertEqual(self.mirror.count(), 3)
+        self.assertEqual(self.mirror.last_updated_at, '2016-08-03T09:00:00')
+        self.assertEqual(self.mirror.notes(2), [_create_note(20)])
+        self.assertEqual(self.mirror.statuses(), self.api.statuses.return_value)
+        self.assertEqual(self.mirror.milestones(), self.api.milestones.return_value)
+
+    def test_incremental_sync(self):
+        self.mirror.sync()
+        self.api.notes.reset_mock()
+        self.api.iter_search.reset_mock()
+        self.tickets = [
+            _create_ticket(4, '2016-08-05T10:00:00+01:00'),
+            _create_ticket(2, '2016-08-04T10:00:00+01:00', status='Completed'),
+            _create_ticket(3, '2016-08-03T10:00:00+01:00', status='Completed'),
+            _create_ticket(1, '2016-08-01T10:00:00+01:00'),
+        ]
+
+        updated = self.mirror.sync()
+
+        self.assertEqual(self.api.iter_search.call_args_list, [
+            call(sort='updated', order='desc', status='open'),
+            call(sort='updated', order='desc'),
+        ])
+        # Stops at the first ticket older than the last sync.
+        self.assertEqual(updated, [4, 2, 3])
+        self.assertEqual(
+            sorted(args[0] for args, kwargs in self.api.notes.call_args_list),
+            [2, 3, 4],
+        )
+        self.assertEqual(self.mirror.count(), 4)
+        self.assertEqual(self.mirror.ticket(2)['ticket']['status']['name'], 'Completed')
+        self.assertEqual(self.mirror.last_updated_at, '2016-08-05T09:00:00')
+
+    def test_full_sync_drops_tickets(self):
+        self.mirror.sync()
+        self.tickets = [
+            _create_ticket(1, '2016-08-01T10:00:00+01:00'),
+        ]
+
+        self.mirror.full_sync()
+
+        self.assertEqual(self.mirror.count(), 1)
+        self.assertEqual(self.mirror.notes(2), [])
+
+    def test_full_sync_error(self):
+        self.mirror.sync()
+
+        def iter_search(**kwargs):
+            yield self.tickets[0]
+            raise SearchError('', [], {2: urllib2.URLError('timed out')})
+
+        self.api.iter_search.side_effect = iter_search
+
+        self.assertRaises(SearchError, self.mirror.full_sync)
+        self.assertEqual(self.mirror.count(), 3)
+        self.assertEqual(self.mirror.notes(2), [_create_note(20)])
+
+    def test_incremental_sync_drops_unmatched_tickets(self):
+        self.mirror.sync()
+        self.tickets = [
+            _create_ticket(4, '2016-08-05T10:00:00+01:00'),
+        ]
+        self.all_tickets = [
+            _create_ticket(4, '2016-08-05T10:00:00+01:00'),
+            _create_ticket(2, '2016-08-04T10:00:00+01:00', status='Closed'),
+            _create_ticket(1, '2016-08-01T10:00:00+01:00'),
+        ]
+
+        self.assertEqual(self.mirror.sync(), [4])
+
+        # Ticket 2 was updated and no longer matches `status='open'`.
+        self.assertIsNone(self.mirror.ticket(2))
+        self.assertEqual(self.mirror.notes(2), [])
+        self.assertEqual(self.mirror.count(), 3)
+
+    @patch('codebase.mirror.logger')
+    def test_notes_error(self, logger_mock):
+        self.api.notes.side_effect = urllib2.URLError('timed out')
+
+        self.assertEqual(sorted(self.mirror.sync()), [1, 2, 3])
+
+        self.assertEqual(logger_mock.warning.call_count, 3)
+        self.assertEqual(self.mirror.notes(1), [])
+        self.assertEqual(self.mirror.last_updated_at, '2016-08-03T09:00:00')
+
+        # The notes are fetched again by the next sync, even though the
+        # tickets are up to date.
+        self.api.notes.side_effect = lambda ticket_id: [_create_note(ticket_id * 10)]
+        self.tickets = []
+        self.assertEqual(self.mirror.sync(), [])
+
+        self.assertEqual(self.mirror.notes(1), [_create_note(10)])
+        self.api.notes.reset_mock()
+        self.mirror.sync()
+        self.api.notes.assert_not_called()
+
+    def test_without_notes(self):
+        mirror = TicketMirror(self.api, with_notes=False)
+        mirror.sync()
+
+        self.api.notes.assert_not_called()
+        self.assertEqual(mirror.count(), 3)
+
+    def test_queries(self):
+        self.mirror.sync()
+
+        self.assertEqual(
+            [item['ticket']['ticket_id'] for item in self.mirror.tickets(status='New')],
+            [1, 2],
+        )
+        self.assertEqual(
+            [
+                item['ticket']['ticket_id']
+                for item in self.mirror.tickets(order_by='-updated_at', limit=2)
+            ],
+            [3, 2],
+        )
+        self.assertEqual(
+            [
+                item['ticket']['ticket_id']
+                for item in self.mirror.tickets(assignee=['bob', 'carol'])
+            ],
+            [2],
+        )
+        self.assertEqual(
+            len(self.mirror.tickets(updated_since='2016-08-02T09:00:00Z')),
+            2,
+        )
+        self.assertEqual(self.mirror.count(milestone_id=None), 3)
+        self.assertEqual(self.mirror.count_by('status'), {'New': 2, 'Completed': 1})
+        self.assertIsNone(self.mirror.ticket(42))
+
+    def test_unknown_column(self):
+        self.assertRaises(ValueError, self.mirror.tickets, data='x')
+        self.assertRaises(ValueError, self.mirror.tickets, order_by='data')
+        self.assertRaises(ValueError, self.mirror.count_by, 'data')
+
+    def test_persistent(self):
+        path = self._get_temp_path()
+        with TicketMirror(self.api, path) as mirror:
+            mirror.sync()
+
+        with TicketMirror(self.api, path) as mirror:
+            self.assertEqual(mirror.count(), 3)
+            self.assertEqual(mirror.last_updated_at, '2016-08-03T09:00:00')
+
+    def _get_temp_path(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        return os.path.join(directory, 'tickets.db')
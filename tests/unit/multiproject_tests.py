@@ -0,0 +1,127 @@
+from unittest import TestCase
+import urllib2
+
+from mock import Mock, patch
+
+from codebase.multiproject import (
+    MultiProjectAPI,
+    MultiProjectError,
+    ProjectResult,
+    get_project_name,
+)
+from codebase.ratelimit import RateLimiter
+
+
+def _get(client, url, ctype=None):
+    project = url.split('/')[1]
+    if project == 'broken':
+        raise urllib2.HTTPError(url, 500, 'Error', None, None)
+    return [{'ticketing_milestone': {'id': 1, 'url': url}}, {'ticketing_milestone': {'id': 2}}]
+
+
+@patch('codebase.client.Auth.get', autospec=True, side_effect=_get)
+class MultiProjectAPITestCase(TestCase):
+
+    def _create(self, projects, **kwargs):
+        return MultiProjectAPI(projects, username='some/body', apikey='bees', workers=2, **kwargs)
+
+    def test_get_project_name(self, get_mock):
+        self.assertEqual(get_project_name({'project': {'permalink': 'first'}}), 'first')
+        self.assertEqual(get_project_name('second'), 'second')
+
+    def test_shared_clients(self, get_mock):
+        multi = self._create([{'project': {'permalink': 'first', 'name': 'First'}}, 'second'])
+
+        self.assertEqual(multi.projects, ['first', 'second'])
+        first, second = multi.clients.values()
+        self.assertEqual(first.project, 'first')
+        self.assertEqual(second.project, 'second')
+        self.assertEqual(second.username, 'some/body')
+        self.assertIs(first.transport, second.transport)
+        self.assertIs(first.rate_limiter, second.rate_limiter)
+        self.assertIsInstance(first.rate_limiter, RateLimiter)
+
+    def test_for_all_projects(self, get_mock):
+        api = Mock(username='some/body', apikey='bees')
+        api.projects.return_value = [
+            {'project': {'permalink': 'first'}},
+            {'project': {'permalink': 'second'}},
+        ]
+        rate_limiter = RateLimiter(rate=5)
+
+        multi = MultiProjectAPI.for_all_projects(api, rate_limiter=rate_limiter)
+
+        self.assertEqual(multi.projects, ['first', 'second'])
+        self.assertIs(multi.clients['first'].rate_limiter, rate_limiter)
+        self.assertEqual(multi.clients['first'].apikey, 'bees')
+
+    def test_map(self, get_mock):
+        multi = self._create(['first', 'broken', 'second'])
+
+        results = sorted(multi.map('milestones'))
+
+        self.assertEqual([result.project for result in results], ['broken', 'first', 'second'])
+        self.assertEqual(results[0].value, None)
+        self.assertEqual(results[0].error.code, 500)
+        self.assertEqual(results[1], ProjectResult(
+            'first',
+            [
+                {'ticketing_milestone': {'id': 1, 'url': '/first/milestones'}},
+                {'ticketing_milestone': {'id': 2}},
+            ],
+            None,
+        ))
+
+    def test_map_arguments(self, get_mock):
+        multi = self._create(['first', 'second'])
+
+        results = dict(
+            (project, value) for project, value, error in multi.map('notes', 42)
+        )
+
+        self.assertEqual(
+            results['second'][0]['ticketing_milestone']['url'],
+            '/second/tickets/42/notes',
+        )
+
+    def test_generator_method(self, get_mock):
+        multi = self._create(['first'])
+
+        results = list(multi.map('notes_many', [1, 2]))
+
+        self.assertEqual(results[0].project, 'first')
+        self.assertEqual(sorted(ticket_id for ticket_id, notes in results[0].value), [1, 2])
+
+    def test_iter_items(self, get_mock):
+        multi = self._create(['first', 'second'])
+
+        items = list(multi.iter_items('milestones'))
+
+        self.assertEqual(len(items), 4)
+        self.assertEqual(
+            sorted(
+                (project, item['ticketing_milestone']['id'])
+                for project, item in items
+            ),
+            [('first', 1), ('first', 2), ('second', 1), ('second', 2)],
+        )
+
+    def test_iter_items_errors(self, get_mock):
+        multi = self._create(['first', 'broken'])
+        errors = {}
+
+        items = list(multi.iter_items('milestones', errors=errors))
+
+        self.assertEqual(set(project for project, item in items), set(['first']))
+        self.assertEqual(errors.keys(), ['broken'])
+
+    def test_iter_items_raises(self, get_mock):
+        multi = self._create(['first', 'broken'])
+        items = []
+
+        with self.assertRaises(MultiProjectError) as ctx:
+            for item in multi.iter_items('milestones'):
+                items.append(item)
+
+        self.assertEqual(len(items), 2)
+        self.assertEqual(ctx.exception.errors.keys(), ['broken'])
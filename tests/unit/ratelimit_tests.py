@@ -0,0 +1,78 @@
+from unittest import TestCase
+
+from mock import patch
+
+from codebase.ratelimit import RateLimiter
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class RateLimiterTestCase(TestCase):
+
+    def setUp(self):
+        super(RateLimiterTestCase, self).setUp()
+
+        self.clock = FakeClock()
+        patcher = patch('codebase.ratelimit.time', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.limiter = RateLimiter(rate=10, burst=5)
+
+    def test_burst(self):
+        for i in range(5):
+            self.limiter.acquire()
+
+        self.assertEqual(self.clock.now, 1000)
+
+    def test_rate(self):
+        for i in range(25):
+            self.limiter.acquire()
+
+        # 5 requests in the burst, then 10 per second.
+        self.assertAlmostEqual(self.clock.now, 1002)
+
+    def test_throttled(self):
+        self.limiter.throttled()
+        self.assertEqual(self.limiter.rate, 5)
+
+        self.limiter.throttled()
+        self.assertEqual(self.limiter.rate, 2.5)
+
+        # The burst allowance is gone.
+        self.limiter.acquire()
+        self.assertAlmostEqual(self.clock.now, 1000.4)
+
+    def test_min_rate(self):
+        for i in range(10):
+            self.limiter.throttled()
+
+        self.assertEqual(self.limiter.rate, RateLimiter.DEFAULT_MIN_RATE)
+
+    def test_retry_after(self):
+        self.limiter.throttled(retry_after=30)
+
+        self.limiter.acquire()
+
+        self.assertGreaterEqual(self.clock.now, 1030)
+
+    def test_succeeded(self):
+        self.limiter.throttled()
+        self.assertEqual(self.limiter.rate, 5)
+
+        self.limiter.succeeded()
+        self.assertEqual(self.limiter.rate, 5.5)
+
+        for i in range(20):
+            self.limiter.succeeded()
+        self.assertEqual(self.limiter.rate, 10)
@@ -0,0 +1,137 @@
+from unittest import TestCase
+import datetime
+
+from codebase.records import (
+    Milestone,
+    Status,
+    Ticket,
+    parse_date,
+    parse_datetime,
+)
+
+
+class ParseDatetimeTestCase(TestCase):
+
+    def test_offset(self):
+        self.assertEqual(
+            parse_datetime('2016-08-01T10:00:00+01:00'),
+            datetime.datetime(2016, 8, 1, 9, 0, 0),
+        )
+        self.assertEqual(
+            parse_datetime('2016-08-01T10:00:00-0230'),
+            datetime.datetime(2016, 8, 1, 12, 30, 0),
+        )
+
+    def test_utc(self):
+        self.assertEqual(
+            parse_datetime('2016-08-01T10:00:00Z'),
+            datetime.datetime(2016, 8, 1, 10, 0, 0),
+        )
+        self.assertEqual(
+            parse_datetime('2016-08-01 10:00:00.123'),
+            datetime.datetime(2016, 8, 1, 10, 0, 0),
+        )
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, parse_datetime, 'yesterday')
+
+    def test_parse_date(self):
+        self.assertEqual(parse_date('2016-08-01'), datetime.date(2016, 8, 1))
+        self.assertEqual(
+            parse_date('2016-08-01T23:30:00-01:00'),
+            datetime.date(2016, 8, 2),
+        )
+
+
+class RecordTestCase(TestCase):
+
+    def setUp(self):
+        super(RecordTestCase, self).setUp()
+
+        self.item = {
+            'ticket': {
+                'ticket_id': 12,
+                'summary': 'Something is broken',
+                'status_id': 3,
+                'status': {'id': 3, 'name': 'New', 'colour': 'green'},
+                'assignee': 'alice',
+                'updated_at': '2016-08-01T10:00:00+01:00',
+                'not_a_field': 'dropped',
+            }
+        }
+
+    def test_from_dict(self):
+        ticket = Ticket.from_dict(self.item)
+
+        self.assertEqual(ticket.ticket_id, 12)
+        self.assertEqual(ticket.summary, 'Something is broken')
+        self.assertEqual(ticket.status, 'New')
+        self.assertIsNone(ticket.milestone)
+        self.assertIsNone(ticket.created_at)
+        self.assertFalse(hasattr(ticket, '__dict__'))
+        self.assertFalse(hasattr(ticket, 'not_a_field'))
+
+    def test_from_unwrapped_dict(self):
+        ticket = Ticket.from_dict(self.item['ticket'])
+        self.assertEqual(ticket.ticket_id, 12)
+
+    def test_lazy_decoding(self):
+        ticket = Ticket.from_dict(self.item)
+
+        # Stored as received until first accessed.
+        self.assertEqual(ticket._updated_at, '2016-08-01T10:00:00+01:00')
+        self.assertEqual(ticket.updated_at, datetime.datetime(2016, 8, 1, 9, 0))
+        self.assertEqual(ticket._updated_at, datetime.datetime(2016, 8, 1, 9, 0))
+        # Decoded only once.
+        self.assertEqual(ticket.updated_at, datetime.datetime(2016, 8, 1, 9, 0))
+
+    def test_from_response(self):
+        tickets = Ticket.from_response([self.item, self.item])
+
+        self.assertEqual(len(tickets), 2)
+        self.assertEqual(tickets[0], tickets[1])
+        self.assertIsInstance(Ticket.from_response(self.item), Ticket)
+
+    def test_dict_compatibility(self):
+        ticket = Ticket.from_dict(self.item)
+
+        self.assertEqual(ticket['ticket']['ticket_id'], 12)
+        self.assertEqual(ticket['summary'], 'Something is broken')
+        self.assertRaises(KeyError, ticket.__getitem__, 'not_a_field')
+
+    def test_init(self):
+        status = Status(id=1, name='New')
+
+        self.assertEqual(status.name, 'New')
+        self.assertIsNone(status.colour)
+        self.assertEqual(status, Status.from_dict({'ticketing_status': {'id': 1, 'name': 'New'}}))
+        self.assertRaises(TypeError, Status, colour='red', size=2)
+
+    def test_init_decoded_values(self):
+        deadline = datetime.date(2016, 9, 1)
+        milestone = Milestone(id=1, deadline=deadline)
+
+        self.assertIs(milestone.deadline, deadline)
+
+    def test_to_dict(self):
+        status = Status.from_dict({'ticketing_status': {'id': 1, 'name': 'New'}})
+
+        self.assertEqual(
+            status.to_dict(),
+            {
+                'id': 1,
+                'name': 'New',
+                'colour': None,
+                'order': None,
+                'treat_as_closed': None,
+            },
+        )
+
+    def test_repr(self):
+        self.assertEqual(repr(Status(id=1)), '<Status id=1>')
+
+    def test_fields_order(self):
+        self.assertEqual(
+            [field.name for field in Status.fields],
+            ['id', 'name', 'colour', 'order', 'treat_as_closed'],
+        )
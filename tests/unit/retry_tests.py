@@ -0,0 +1,95 @@
+from unittest import TestCase
+import urllib2
+
+from mock import patch
+
+from codebase.retry import RetryPolicy, get_retry_after
+
+
+def _create_http_error(code, headers=None):
+    return urllib2.HTTPError('http://theurl.com', code, 'Error', headers, None)
+
+
+class GetRetryAfterTestCase(TestCase):
+
+    def test_no_header(self):
+        self.assertIsNone(get_retry_after(_create_http_error(429)))
+        self.assertIsNone(get_retry_after(_create_http_error(429, {})))
+
+    def test_seconds(self):
+        error = _create_http_error(429, {'Retry-After': '12'})
+        self.assertEqual(get_retry_after(error), 12)
+
+    @patch('codebase.retry.time.time', return_value=1470052800)
+    def test_http_date(self, time_mock):
+        # Mon, 01 Aug 2016 12:00:00 GMT is 1470052800.
+        error = _create_http_error(
+            503, {'Retry-After': 'Mon, 01 Aug 2016 12:00:30 GMT'}
+        )
+        self.assertEqual(get_retry_after(error), 30)
+
+    def test_invalid(self):
+        error = _create_http_error(503, {'Retry-After': 'soon'})
+        self.assertIsNone(get_retry_after(error))
+
+
+@patch('codebase.retry.random.uniform', side_effect=lambda low, high: high)
+class RetryPolicyTestCase(TestCase):
+
+    def setUp(self):
+        super(RetryPolicyTestCase, self).setUp()
+
+        self.policy = RetryPolicy(max_retries=3, backoff=1, max_backoff=3)
+
+    def test_exponential_backoff(self, uniform_mock):
+        error = _create_http_error(502)
+
+        self.assertEqual(self.policy.get_delay(0, 'GET', error), 1)
+        self.assertEqual(self.policy.get_delay(1, 'GET', error), 2)
+        # Capped to `max_backoff`.
+        self.assertEqual(self.policy.get_delay(2, 'GET', error), 3)
+        # Out of retries.
+        self.assertIsNone(self.policy.get_delay(3, 'GET', error))
+
+    def test_jitter(self, uniform_mock):
+        self.policy.get_delay(1, 'GET', _create_http_error(500))
+        uniform_mock.assert_called_once_with(0, 2)
+
+    def test_retry_after(self, uniform_mock):
+        error = _create_http_error(429, {'Retry-After': '7'})
+
+        self.assertEqual(self.policy.get_delay(0, 'GET', error), 7)
+        uniform_mock.assert_not_called()
+
+    def test_retry_after_too_long(self, uniform_mock):
+        error = _create_http_error(429, {'Retry-After': '3600'})
+        self.assertIsNone(self.policy.get_delay(0, 'GET', error))
+
+    def test_not_retried_statuses(self, uniform_mock):
+        for code in (400, 401, 403, 404, 422):
+            error = _create_http_error(code)
+            self.assertIsNone(self.policy.get_delay(0, 'GET', error))
+
+    def test_post(self, uniform_mock):
+        for code in (429, 503):
+            error = _create_http_error(code)
+            self.assertIsNotNone(self.policy.get_delay(0, 'POST', error))
+
+        # The server may have processed the request.
+        for code in (500, 502, 504):
+            error = _create_http_error(code)
+            self.assertIsNone(self.policy.get_delay(0, 'POST', error))
+
+        error = urllib2.URLError('connection reset')
+        self.assertIsNone(self.policy.get_delay(0, 'POST', error))
+
+    def test_connection_error(self, uniform_mock):
+        error = urllib2.URLError('connection refused')
+        self.assertEqual(self.policy.get_delay(0, 'GET', error), 1)
+
+    def test_other_errors(self, uniform_mock):
+        self.assertIsNone(self.policy.get_delay(0, 'GET', ValueError()))
+
+    def test_no_retries(self, uniform_mock):
+        policy = RetryPolicy(max_retries=0)
+        self.assertIsNone(policy.get_delay(0, 'GET', _create_http_error(503)))
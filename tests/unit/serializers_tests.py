@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+from unittest import TestCase
+from collections import OrderedDict
+
+from mock import patch
+import xmltodict
+
+from codebase.serializers import XmlSerializer
+
+
+class XmlSerializerTestCase(TestCase):
+
+    def setUp(self):
+        super(XmlSerializerTestCase, self).setUp()
+        self.serializer = XmlSerializer(max_templates=2)
+
+    def assertSerialized(self, data):
+        self.assertEqual(self.serializer.serialize(data), xmltodict.unparse(data))
+
+    def test_flat_object(self):
+        self.assertSerialized(OrderedDict([('ticket', OrderedDict([
+            ('summary', u'Crash <on> save & "quit" é'),
+            ('ticket-type', 'Bug'),
+            ('status-id', 1631923),
+            ('estimated-time', 1.5),
+            ('assignee', None),
+            ('private', True),
+            ('tags', ''),
+        ]))]))
+
+    def test_empty_object(self):
+        self.assertSerialized({'ticket': {}})
+
+    def test_template_reused(self):
+        self.serializer.serialize({'ticket': {'summary': 'One'}})
+        self.serializer.serialize({'ticket': {'summary': 'Two'}})
+
+        with patch('codebase.serializers.xmltodict.unparse') as unparse:
+            self.assertIn(u'<summary>Three</summary>', self.serializer.serialize(
+                {'ticket': {'summary': 'Three'}}
+            ))
+        unparse.assert_not_called()
+        self.assertEqual(len(self.serializer._templates), 1)
+
+    def test_templates_bounded(self):
+        for name in ('a', 'b', 'c'):
+            self.assertSerialized({'ticket': {name: 'value'}})
+        self.assertLessEqual(len(self.serializer._templates), 2)
+
+    def test_percent_in_names(self):
+        self.assertSerialized({'ticket%s': {'a%sb': '%s'}})
+
+    def test_fallback(self):
+        self.assertSerialized({'ticket': {'summary': 'A', 'tags': {'tag': ['a', 'b']}}})
+        self.assertSerialized({'ticket': {'@id': '1', 'summary': 'A'}})
+        self.assertSerialized({'ticket': {'#text': 'A'}})
+        self.assertSerialized({'ticket': 'A'})
+        self.assertSerialized({'ticket': None})
+        self.assertEqual(self.serializer._templates, {})
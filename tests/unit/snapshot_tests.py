@@ -0,0 +1,142 @@
+from unittest import TestCase
+import os
+import shutil
+import tempfile
+
+from codebase.records import Ticket
+from codebase.snapshot import (
+    FORMAT_VERSION,
+    Snapshot,
+    SnapshotDiff,
+    SnapshotFile,
+)
+
+
+def _ticket(ticket_id, **fields):
+    ticket = {'ticket_id': ticket_id, 'summary': u'Ticket {}'.format(ticket_id), 'status_id': 1}
+    ticket.update(fields)
+    return {'ticket': ticket}
+
+
+class SnapshotTestCase(TestCase):
+
+    def test_entries(self):
+        snapshot = Snapshot([_ticket(1), _ticket(2)])
+
+        self.assertEqual(len(snapshot), 2)
+        self.assertIn(1, snapshot)
+        ticket_hash, field_hashes = snapshot.entries[1]
+        self.assertEqual(len(ticket_hash), 16)
+        self.assertEqual(sorted(field_hashes), ['status_id', 'summary', 'ticket_id'])
+        self.assertNotEqual(snapshot.entries[2][0], ticket_hash)
+
+    def test_same_content_same_hashes(self):
+        first = Snapshot([_ticket(1, tags=['a', 'b'], custom={'x': 1, 'y': 2})])
+        second = Snapshot([_ticket(1, custom={'y': 2, 'x': 1}, tags=['a', 'b'])])
+
+        self.assertEqual(first.entries, second.entries)
+
+    def test_diff(self):
+        snapshot = Snapshot([_ticket(1), _ticket(2), _ticket(3)])
+
+        diff = snapshot.diff([
+            _ticket(1),
+            _ticket(3, status_id=2, summary=u'Renamed'),
+            _ticket(4),
+        ])
+
+        self.assertEqual(diff, SnapshotDiff(
+            added=[4],
+            removed=[2],
+            changed={3: {'status_id': 2, 'summary': u'Renamed'}},
+        ))
+
+    def test_diff_added_and_removed_fields(self):
+        snapshot = Snapshot([_ticket(1, assignee=u'someone')])
+
+        diff = snapshot.diff([_ticket(1, milestone_id=5)])
+
+        self.assertEqual(diff.changed, {1: {'assignee': None, 'milestone_id': 5}})
+
+    def test_diff_unchanged(self):
+        snapshot = Snapshot([_ticket(1), _ticket(2)])
+
+        self.assertEqual(snapshot.diff([_ticket(2), _ticket(1)]), SnapshotDiff([], [], {}))
+
+    def test_string_ids(self):
+        snapshot = Snapshot([_ticket('1'), _ticket('ABC')])
+
+        self.assertIn(1, snapshot)
+        self.assertIn('1', snapshot)
+        self.assertEqual(
+            snapshot.diff([_ticket('1', summary=u'Renamed'), _ticket('ABC')]),
+            SnapshotDiff([], [], {1: {'summary': u'Renamed'}}),
+        )
+
+    def test_records(self):
+        snapshot = Snapshot([Ticket.from_dict(_ticket(1))])
+
+        diff = snapshot.diff([Ticket.from_dict(_ticket(1, summary=u'Renamed'))])
+
+        self.assertEqual(diff.changed, {1: {'summary': u'Renamed'}})
+
+
+class SnapshotFileTestCase(TestCase):
+
+    def setUp(self):
+        super(SnapshotFileTestCase, self).setUp()
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'tickets.snapshot')
+        self.snapshots = SnapshotFile(self.path)
+
+    def tearDown(self):
+        super(SnapshotFileTestCase, self).tearDown()
+        shutil.rmtree(self.directory)
+
+    def test_missing_file(self):
+        self.assertEqual(list(self.snapshots), [])
+        self.assertEqual(self.snapshots.diff([_ticket(1)]), SnapshotDiff([1], [], {}))
+
+    def test_write(self):
+        self.snapshots.write([_ticket(2), _ticket(1, assignee=u'someone')])
+
+        with open(self.path) as f:
+            lines = f.read().splitlines()
+        self.assertEqual(lines[0], FORMAT_VERSION)
+        self.assertEqual(lines[1].split('\t'), ['assignee', 'status_id', 'summary', 'ticket_id'])
+        self.assertEqual([line.split('\t')[0] for line in lines[2:]], ['1', '2'])
+        # No hash for the missing field.
+        self.assertEqual(lines[3].split('\t')[2], '')
+        self.assertEqual(os.listdir(self.directory), ['tickets.snapshot'])
+
+    def test_round_trip(self):
+        items = [_ticket(1, assignee=u'someone'), _ticket(2), _ticket(3, tags=[u'\xe9t\xe9'])]
+        self.snapshots.write(items)
+
+        self.assertEqual(dict(self.snapshots), Snapshot(items).entries)
+
+    def test_update_string_ids(self):
+        items = [_ticket('1'), _ticket('2'), _ticket('ABC-3')]
+        self.snapshots.update(items)
+
+        # Not every ticket removed and added again.
+        self.assertEqual(self.snapshots.update(items), SnapshotDiff([], [], {}))
+        self.assertEqual(sorted(dict(self.snapshots)), [1, 2, 'ABC-3'])
+
+    def test_update(self):
+        self.assertEqual(
+            self.snapshots.update([_ticket(1), _ticket(2)]),
+            SnapshotDiff([1, 2], [], {}),
+        )
+
+        diff = self.snapshots.update([_ticket(2, status_id=3), _ticket(3)])
+
+        self.assertEqual(diff, SnapshotDiff([3], [1], {2: {'status_id': 3}}))
+        self.assertEqual(sorted(dict(self.snapshots)), [2, 3])
+        self.assertEqual(self.snapshots.diff([_ticket(2, status_id=3), _ticket(3)]), SnapshotDiff([], [], {}))
+
+    def test_not_a_snapshot(self):
+        with open(self.path, 'w') as f:
+            f.write('something else\n')
+
+        self.assertRaises(ValueError, self.snapshots.diff, [_ticket(1)])
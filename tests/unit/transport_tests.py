@@ -0,0 +1,407 @@
+from unittest import TestCase
+import httplib
+import socket
+import threading
+import urllib2
+import zlib
+from StringIO import StringIO
+
+from mock import Mock, patch
+
+from codebase.transport import (
+    ConnectionPool,
+    DecompressingReader,
+    PooledResponse,
+)
+
+
+def _create_fake_http_response(content='{}', status=200, will_close=False):
+    chunks = [content, '']
+
+    response = Mock(
+        status=status,
+        reason='OK',
+        msg={'content-type': 'application/json'},
+        will_close=will_close,
+    )
+    response.read.side_effect = lambda amt=None: chunks.pop(0)
+    response.isclosed.side_effect = lambda: not chunks[0]
+    return response
+
+
+class ConnectionPoolTestCase(TestCase):
+
+    def setUp(self):
+        super(ConnectionPoolTestCase, self).setUp()
+
+        # Whatever proxies the environment configures.
+        getproxies_patcher = patch('codebase.transport.urllib.getproxies', return_value={})
+        self.getproxies_mock = getproxies_patcher.start()
+        self.addCleanup(getproxies_patcher.stop)
+
+        self.pool = ConnectionPool(pool_size=2)
+        self.request = urllib2.Request(
+            url='https://api3.codebasehq.com/project/tickets',
+            headers={'Accept': 'application/json'},
+        )
+
+    @patch('codebase.transport.httplib.HTTPSConnection')
+    def test_open(self, connection_class_mock):
+        connection = connection_class_mock.return_value
+        connection.getresponse.return_value = _create_fake_http_response('[1]')
+
+        response = self.pool.open(self.request)
+
+        connection_class_mock.assert_called_once_with(
+            'api3.codebasehq.com',
+            timeout=ConnectionPool.DEFAULT_TIMEOUT,
+        )
+        connection.request.assert_called_once_with(
+            'GET',
+            '/project/tickets',
+            None,
+            {'Accept': 'application/json', 'Connection': 'keep-alive'},
+        )
+        self.assertEqual(response.getcode(), 200)
+        self.assertEqual(response.url, self.request.get_full_url())
+        self.assertEqual(response.read(), '[1]')
+
+    @patch('codebase.transport.httplib.HTTPSConnection')
+    def test_connection_reused(self, connection_class_mock):
+        connection = connection_class_mock.return_value
+        connection.getresponse.side_effect = [
+            _create_fake_http_response(),
+            _create_fake_http_response(),
+        ]
+
+        self.pool.open(self.request).read()
+        self.pool.open(self.request).read()
+
+        # Only one connection was opened for both requests.
+        connection_class_mock.assert_called_once_with(
+            'api3.codebasehq.com',
+            timeout=ConnectionPool.DEFAULT_TIMEOUT,
+        )
+        self.assertEqual(connection.request.call_count, 2)
+        connection.close.assert_not_called()
+
+    @patch('codebase.transport.httplib.HTTPSConnection')
+    def test_connection_not_reused_if_server_closes(self, connection_class_mock):
+        connections = [Mock(), Mock()]
+        for connection in connections:
+            connection.getresponse.return_value = _create_fake_http_response(
+                will_close=True
+            )
+        connection_class_mock.side_effect = connections
+
+        self.pool.open(self.request).read()
+        self.pool.open(self.request).read()
+
+        self.assertEqual(connection_class_mock.call_count, 2)
+        connections[0].close.assert_called_once_with()
+
+    @patch('codebase.transport.httplib.HTTPSConnection')
+    def test_stale_connection_retried(self, connection_class_mock):
+        stale_connection = Mock()
+        stale_connection.request.side_effect = socket.error('broken pipe')
+        fresh_connection = Mock()
+        fresh_connection.getresponse.return_value = _create_fake_http_response(
+            '[2]'
+        )
+        connection_class_mock.return_value = fresh_connection
+        self.pool._release_connection(
+            ('https', 'api3.codebasehq.com'),
+            stale_connection,
+        )
+
+        response = self.pool.open(self.request)
+
+        self.assertEqual(response.read(), '[2]')
+        stale_connection.close.assert_called_once_with()
+        connection_class_mock.assert_called_once_with(
+            'api3.codebasehq.com',
+            timeout=ConnectionPool.DEFAULT_TIMEOUT,
+        )
+
+    @patch('codebase.transport.httplib.HTTPSConnection')
+    def test_stale_connection_retried_after_response_error(self, connection_class_mock):
+        stale_connection = Mock()
+        stale_connection.getresponse.side_effect = httplib.BadStatusLine('')
+        fresh_connection = connection_class_mock.return_value
+        fresh_connection.getresponse.return_value = _create_fake_http_response('[2]')
+        self.pool._release_connection(('https', 'api3.codebasehq.com'), stale_connection)
+
+        self.assertEqual(self.pool.open(self.request).read(), '[2]')
+
+    @patch('codebase.transport.httplib.HTTPSConnection')
+    def test_post_not_resent_after_response_error(self, connection_class_mock):
+        stale_connection = Mock()
+        stale_connection.getresponse.side_effect = httplib.BadStatusLine('')
+        self.pool._release_connection(('https', 'api3.codebasehq.com'), stale_connection)
+        request = urllib2.Request(url=self.request.get_full_url(), data='<note/>')
+
+        # The server may have processed the request already.
+        self.assertRaises(urllib2.URLError, self.pool.open, request)
+        self.assertEqual(stale_connection.request.call_count, 1)
+        connection_class_mock.assert_not_called()
+
+    @patch('codebase.transport.httplib.HTTPSConnection')
+    def test_post_resent_after_send_error(self, connection_class_mock):
+        stale_connection = Mock()
+        stale_connection.request.side_effect = socket.error('broken pipe')
+        fresh_connection = connection_class_mock.return_value
+        fresh_connection.getresponse.return_value = _create_fake_http_response('[2]')
+        self.pool._release_connection(('https', 'api3.codebasehq.com'), stale_connection)
+        request = urllib2.Request(url=self.request.get_full_url(), data='<note/>')
+
+        self.assertEqual(self.pool.open(request).read(), '[2]')
+
+    @patch('codebase.transport.httplib.HTTPSConnection')
+    def test_new_connection_error(self, connection_class_mock):
+        connection = connection_class_mock.return_value
+        connection.getresponse.side_effect = httplib.BadStatusLine('')
+
+        self.assertRaises(urllib2.URLError, self.pool.open, self.request)
+        connection.close.assert_called_once_with()
+
+    @patch('codebase.transport.httplib.HTTPSConnection')
+    def test_http_error(self, connection_class_mock):
+        connection = connection_class_mock.return_value
+        connection.getresponse.return_value = _create_fake_http_response(
+            'not found', status=404
+        )
+
+        with self.assertRaises(urllib2.HTTPError) as ctx:
+            self.pool.open(self.request)
+
+        self.assertEqual(ctx.exception.code, 404)
+        self.assertEqual(ctx.exception.read(), 'not found')
+        # The body was consumed so the connection went back to the pool.
+        self.assertEqual(
+            self.pool._get_pool(('https', 'api3.codebasehq.com')).qsize(),
+            1,
+        )
+
+    def _create_redirect(self, location, status=302):
+        response = _create_fake_http_response('', status=status)
+        response.msg = Mock(getheader={'location': location}.get)
+        return response
+
+    @patch('codebase.transport.httplib.HTTPSConnection')
+    def test_redirect_followed(self, connection_class_mock):
+        connection = connection_class_mock.return_value
+        connection.getresponse.side_effect = [
+            self._create_redirect('/project/tickets?page=1'),
+            _create_fake_http_response('[1]'),
+        ]
+
+        response = self.pool.open(self.request)
+
+        self.assertEqual(response.read(), '[1]')
+        self.assertEqual(
+            response.url, 'https://api3.codebasehq.com/project/tickets?page=1'
+        )
+        self.assertEqual(
+            connection.request.call_args_list[1][0][3]['Accept'],
+            'application/json',
+        )
+
+    @patch('codebase.transport.httplib.HTTPSConnection')
+    def test_too_many_redirects(self, connection_class_mock):
+        connection = connection_class_mock.return_value
+        connection.getresponse.side_effect = lambda: self._create_redirect('/loop')
+
+        with self.assertRaises(urllib2.HTTPError) as ctx:
+            self.pool.open(self.request)
+
+        self.assertEqual(ctx.exception.code, 302)
+        self.assertEqual(
+            connection.request.call_count, ConnectionPool.MAX_REDIRECTS + 1
+        )
+
+    @patch('codebase.transport.httplib.HTTPSConnection')
+    def test_post_not_redirected(self, connection_class_mock):
+        connection = connection_class_mock.return_value
+        connection.getresponse.return_value = self._create_redirect('/elsewhere', 301)
+        request = urllib2.Request(url=self.request.get_full_url(), data='<note/>')
+
+        with self.assertRaises(urllib2.HTTPError) as ctx:
+            self.pool.open(request)
+
+        self.assertEqual(ctx.exception.code, 301)
+        self.assertEqual(connection.request.call_count, 1)
+
+    @patch('codebase.transport.urllib2.urlopen')
+    @patch('codebase.transport.httplib.HTTPSConnection')
+    def test_proxy(self, connection_class_mock, urlopen_mock):
+        self.getproxies_mock.return_value = {'https': 'http://proxy:3128'}
+
+        response = self.pool.open(self.request)
+
+        self.assertEqual(response, urlopen_mock.return_value)
+        urlopen_mock.assert_called_once_with(
+            self.request, timeout=ConnectionPool.DEFAULT_TIMEOUT
+        )
+        connection_class_mock.assert_not_called()
+
+    def test_unknown_scheme(self):
+        request = urllib2.Request(url='ftp://api3.codebasehq.com/project')
+        self.assertRaises(urllib2.URLError, self.pool.open, request)
+
+    def test_pool_size(self):
+        key = ('https', 'api3.codebasehq.com')
+        connections = [Mock() for i in range(3)]
+
+        for connection in connections:
+            self.pool._release_connection(key, connection)
+
+        # Only `pool_size` idle connections are kept.
+        self.assertEqual(self.pool._get_pool(key).qsize(), 2)
+        connections[2].close.assert_called_once_with()
+
+    def test_get_pool_thread_safe(self):
+        key = ('https', 'api3.codebasehq.com')
+        pools = []
+
+        threads = [
+            threading.Thread(target=lambda: pools.append(self.pool._get_pool(key)))
+            for i in range(10)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(set(id(pool) for pool in pools)), 1)
+
+    def test_close(self):
+        key = ('https', 'api3.codebasehq.com')
+        connection = Mock()
+        self.pool._release_connection(key, connection)
+
+        self.pool.close()
+
+        connection.close.assert_called_once_with()
+        self.assertEqual(self.pool._pools, {})
+
+
+class PooledResponseTestCase(TestCase):
+
+    def setUp(self):
+        super(PooledResponseTestCase, self).setUp()
+
+        self.pool = Mock()
+        self.connection = Mock()
+        self.key = ('https', 'api3.codebasehq.com')
+
+    def _create_response(self, http_response):
+        return PooledResponse(
+            self.pool,
+            self.key,
+            self.connection,
+            http_response,
+            'https://api3.codebasehq.com/project',
+        )
+
+    def test_read_releases_connection(self):
+        response = self._create_response(_create_fake_http_response('[]'))
+
+        self.assertEqual(response.read(), '[]')
+        self.pool._release_connection.assert_called_once_with(
+            self.key,
+            self.connection,
+        )
+        # Reading again is harmless.
+        self.assertEqual(response.read(), '')
+        self.assertEqual(self.pool._release_connection.call_count, 1)
+
+    def test_partial_read_keeps_connection(self):
+        response = self._create_response(_create_fake_http_response('[]'))
+
+        self.assertEqual(response.read(1024), '[]')
+        self.pool._release_connection.assert_called_once_with(
+            self.key,
+            self.connection,
+        )
+
+    def test_close_before_read(self):
+        response = self._create_response(_create_fake_http_response('[]'))
+
+        response.close()
+
+        self.connection.close.assert_called_once_with()
+        self.pool._release_connection.assert_not_called()
+
+    def test_close_without_body_keeps_connection(self):
+        http_response = _create_fake_http_response('', status=304)
+        # httplib only marks bodiless responses closed once they are read.
+        http_response.isclosed.side_effect = None
+        http_response.isclosed.return_value = False
+        http_response.length = 0
+        response = self._create_response(http_response)
+
+        response.close()
+
+        self.connection.close.assert_not_called()
+        self.pool._release_connection.assert_called_once_with(
+            self.key,
+            self.connection,
+        )
+
+
+class DecompressingReaderTestCase(TestCase):
+
+    def setUp(self):
+        super(DecompressingReaderTestCase, self).setUp()
+
+        # Large enough to span several chunks once compressed.
+        self.content = ''.join(
+            '<ticket><ticket-id>{}</ticket-id></ticket>'.format(i)
+            for i in range(20000)
+        )
+
+    def _compress(self, wbits):
+        compressor = zlib.compressobj(9, zlib.DEFLATED, wbits)
+        return StringIO(compressor.compress(self.content) + compressor.flush())
+
+    def test_gzip(self):
+        reader = DecompressingReader(self._compress(16 + zlib.MAX_WBITS), 'gzip')
+        self.assertEqual(reader.read(), self.content)
+
+    def test_deflate(self):
+        reader = DecompressingReader(self._compress(zlib.MAX_WBITS), 'deflate')
+        self.assertEqual(reader.read(), self.content)
+
+    def test_raw_deflate(self):
+        reader = DecompressingReader(self._compress(-zlib.MAX_WBITS), 'deflate')
+        self.assertEqual(reader.read(), self.content)
+
+    def test_read_size(self):
+        reader = DecompressingReader(self._compress(16 + zlib.MAX_WBITS), 'gzip')
+
+        chunks = []
+        while True:
+            chunk = reader.read(1000)
+            if not chunk:
+                break
+            self.assertLessEqual(len(chunk), 1000)
+            chunks.append(chunk)
+
+        self.assertEqual(''.join(chunks), self.content)
+
+    def test_read_rest(self):
+        reader = DecompressingReader(self._compress(-zlib.MAX_WBITS), 'deflate')
+
+        start = reader.read(1000)
+
+        self.assertEqual(start + reader.read(), self.content)
+        self.assertEqual(reader.read(), '')
+
+    def test_read_all_at_once(self):
+        compressed = self._compress(16 + zlib.MAX_WBITS)
+        fp = Mock(read=Mock(side_effect=compressed.read))
+        reader = DecompressingReader(fp, 'gzip')
+
+        self.assertEqual(reader.read(), self.content)
+        # The compressed body is decompressed in one go, not chunk by chunk.
+        fp.read.assert_called_once_with()
@@ -1,8 +1,9 @@
 from unittest import TestCase
+import urllib2
 
 from mock import call, patch
 
-from codebase.utils import CodeBaseAPIUtils
+from codebase.utils import BulkUpdateSummary, CodeBaseAPIUtils
 
 
 @patch('codebase.client.CodeBaseAPI.post')
@@ -96,3 +97,119 @@ class CodeBaseAPIUtilsTestCase(TestCase):
             u'Status "Not a valid status" not found in project statuses. '
             u'Options are: {}'.format(available_statuses)
         )
+
+
+@patch('codebase.client.CodeBaseAPI.post')
+@patch('codebase.client.CodeBaseAPI.get')
+@patch('codebase.client.CodeBaseAPI.search_all')
+class CodeBaseAPIUtilsConcurrentTestCase(TestCase):
+
+    def setUp(self):
+        super(CodeBaseAPIUtilsConcurrentTestCase, self).setUp()
+
+        self.api_client = CodeBaseAPIUtils(
+            project='project',
+            username='some/body',
+            apikey='bees',
+        )
+
+        self.statuses = [
+            {'ticketing_status': {'name': 'New', 'id': 1}},
+            {'ticketing_status': {'name': 'Completed', 'id': 4}},
+        ]
+        self.ticket_ids = [12, 34, 56, 78, 90]
+        self.tickets_found = [
+            {'ticket': {'ticket_id': ticket_id, 'summary': 'ticket'}}
+            for ticket_id in self.ticket_ids
+        ]
+        self.note = {'ticket_note': {'changes': {'status_id': u'4'}}}
+
+    def test_update_ticket_statuses(self, search_all_mock, get_mock, post_mock):
+        search_all_mock.return_value = self.tickets_found
+        get_mock.return_value = self.statuses
+
+        summary = self.api_client.update_ticket_statuses(
+            'New', 'Completed', workers=3
+        )
+
+        self.assertTrue(summary.ok)
+        self.assertFalse(summary.dry_run)
+        self.assertEqual(summary.planned, self.ticket_ids)
+        self.assertEqual(sorted(summary.succeeded), self.ticket_ids)
+        self.assertEqual(summary.failed, {})
+        self.assertEqual(summary.skipped, [])
+        search_all_mock.assert_called_once_with(status='New')
+        post_mock.assert_has_calls(
+            [
+                call('/project/tickets/{}/notes'.format(ticket_id), self.note)
+                for ticket_id in self.ticket_ids
+            ],
+            any_order=True,
+        )
+
+    def test_update_ticket_statuses_dry_run(
+        self, search_all_mock, get_mock, post_mock
+    ):
+        search_all_mock.return_value = self.tickets_found
+        get_mock.return_value = self.statuses
+
+        summary = self.api_client.update_ticket_statuses(
+            'New', 'Completed', dry_run=True
+        )
+
+        self.assertTrue(summary.dry_run)
+        self.assertEqual(summary.planned, self.ticket_ids)
+        self.assertEqual(summary.succeeded, [])
+        post_mock.assert_not_called()
+
+    @patch('codebase.utils.logger')
+    def test_update_ticket_statuses_no_status_found(
+        self, logger_mock, search_all_mock, get_mock, post_mock
+    ):
+        get_mock.return_value = self.statuses
+
+        summary = self.api_client.update_ticket_statuses('New', 'Nope')
+
+        self.assertIsNone(summary)
+        search_all_mock.assert_not_called()
+        post_mock.assert_not_called()
+        self.assertEqual(logger_mock.info.call_count, 1)
+
+    def test_bulk_add_notes_partial_failure(
+        self, search_all_mock, get_mock, post_mock
+    ):
+        error = urllib2.HTTPError(None, 500, 'Server Error', None, None)
+
+        def post(url, data):
+            if url == '/project/tickets/56/notes':
+                raise error
+
+        post_mock.side_effect = post
+
+        summary = self.api_client.bulk_add_notes(self.ticket_ids, self.note)
+
+        self.assertFalse(summary.ok)
+        self.assertEqual(summary.failed, {56: error})
+        self.assertEqual(sorted(summary.succeeded), [12, 34, 78, 90])
+
+    def test_bulk_add_notes_resume(self, search_all_mock, get_mock, post_mock):
+        previous = BulkUpdateSummary()
+        previous.succeeded = [12, 34]
+        previous.failed = {56: ValueError()}
+
+        summary = self.api_client.bulk_add_notes(
+            self.ticket_ids,
+            self.note,
+            resume=previous,
+        )
+
+        self.assertTrue(summary.ok)
+        self.assertEqual(summary.skipped, [12, 34])
+        self.assertEqual(summary.planned, [56, 78, 90])
+        self.assertEqual(sorted(summary.succeeded), self.ticket_ids)
+        self.assertEqual(post_mock.call_count, 3)
+        for ticket_id in (12, 34):
+            self.assertNotIn(
+                call('/project/tickets/{}/notes'.format(ticket_id), self.note),
+                post_mock.call_args_list,
+            )